@@ -0,0 +1,244 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, time as dt_time
+from typing import Any, List, NamedTuple, Optional, Protocol
+
+from app.database import settings
+from app.metricas import registrar_recolector
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend(Protocol):
+    """Interfaz mínima que debe cumplir un backend de cache"""
+
+    def get(self, clave: str) -> Optional[Any]: ...
+
+    def set(self, clave: str, valor: Any, ttl_segundos: int) -> None: ...
+
+    def delete(self, clave: str) -> None: ...
+
+class BackendMemoria:
+    """LRU con expiración por entrada, protegido con un lock (el threadpool de FastAPI es concurrente)"""
+
+    def __init__(self, max_entradas: int = 10000):
+        self.max_entradas = max_entradas
+        self._datos: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave: str) -> Optional[Any]:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            expira, valor = entrada
+            if expira <= time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave: str, valor: Any, ttl_segundos: int) -> None:
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + ttl_segundos, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def delete(self, clave: str) -> None:
+        with self._lock:
+            self._datos.pop(clave, None)
+
+class RedisLocal:
+    """
+    Sustituto en proceso de un cliente Redis (subconjunto get/set/delete de redis-py)
+    Permite probar BackendRedis sin levantar un servidor
+    """
+
+    def __init__(self):
+        self._datos: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            entrada = self._datos.get(name)
+            if entrada is None:
+                return None
+            expira, valor = entrada
+            if expira is not None and expira <= time.monotonic():
+                del self._datos[name]
+                return None
+            return valor
+
+    def set(self, name: str, value, ex: Optional[int] = None) -> bool:
+        if isinstance(value, str):
+            value = value.encode()
+        with self._lock:
+            self._datos[name] = (time.monotonic() + ex if ex else None, value)
+        return True
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(1 for name in names if self._datos.pop(name, None) is not None)
+
+class BackendRedis:
+    """Backend sobre cualquier cliente compatible con Redis; los valores se guardan como JSON"""
+
+    def __init__(self, cliente, prefijo: str = "gym:"):
+        self.cliente = cliente
+        self.prefijo = prefijo
+
+    def get(self, clave: str) -> Optional[Any]:
+        valor = self.cliente.get(self.prefijo + clave)
+        return json.loads(valor) if valor is not None else None
+
+    def set(self, clave: str, valor: Any, ttl_segundos: int) -> None:
+        self.cliente.set(self.prefijo + clave, json.dumps(valor), ex=ttl_segundos)
+
+    def delete(self, clave: str) -> None:
+        self.cliente.delete(self.prefijo + clave)
+
+class CachePlanActivo:
+    """
+    Plan activo (payload de plan-actual) por cliente_id
+    Se invalida al crear/editar planes y al completar ejercicios; además
+    expira como tarde al terminar el día de fecha_fin (cambio de semana)
+    """
+
+    def __init__(self, backend: CacheBackend, ttl_segundos: int = 300):
+        self.backend = backend
+        self.ttl_segundos = ttl_segundos
+        self.hits = 0
+        self.misses = 0
+        self.invalidaciones = 0
+
+    @staticmethod
+    def _clave(cliente_id: int) -> str:
+        return f"plan_activo:{cliente_id}"
+
+    def obtener(self, cliente_id: int) -> Optional[dict]:
+        """Entrada {'payload': ..., 'etag': ...} si el plan cacheado sigue vigente hoy"""
+        entrada = self.backend.get(self._clave(cliente_id))
+        hoy = date.today()
+        if entrada is not None:
+            payload = entrada["payload"]
+            if date.fromisoformat(str(payload["fecha_inicio"])) <= hoy <= date.fromisoformat(str(payload["fecha_fin"])):
+                self.hits += 1
+                return entrada
+        self.misses += 1
+        return None
+
+    def guardar(self, cliente_id: int, payload: dict, etag: str) -> None:
+        fin_semana = datetime.combine(date.fromisoformat(str(payload["fecha_fin"])), dt_time.max)
+        restante = int((fin_semana - datetime.now()).total_seconds())
+        ttl = min(self.ttl_segundos, restante)
+        if ttl > 0:
+            self.backend.set(self._clave(cliente_id), {"payload": payload, "etag": etag}, ttl)
+
+    def invalidar(self, cliente_id: int) -> None:
+        self.invalidaciones += 1
+        self.backend.delete(self._clave(cliente_id))
+
+    def metricas(self) -> List[str]:
+        """Contadores en formato Prometheus (para /metrics)"""
+        lineas = []
+        for nombre, valor in (("hits", self.hits), ("misses", self.misses), ("invalidaciones", self.invalidaciones)):
+            metrica = f"cache_plan_activo_{nombre}_total"
+            lineas += [f"# TYPE {metrica} counter", f"{metrica} {valor}"]
+        return lineas
+
+    def estadisticas(self) -> dict:
+        consultas = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidaciones": self.invalidaciones,
+            "hit_ratio": round(self.hits / consultas, 4) if consultas else 0.0
+        }
+
+class Snapshot(NamedTuple):
+    contenido: bytes
+    etag: str
+
+def calcular_etag(*partes) -> str:
+    """ETag fuerte a partir de los valores que determinan una respuesta"""
+    huella = hashlib.blake2b("|".join(str(parte) for parte in partes).encode(), digest_size=8).hexdigest()
+    return f'"{huella}"'
+
+class SnapshotCatalogo:
+    """
+    Catálogo de ejercicios ya serializado a JSON, servido sin tocar la DB
+    crear_ejercicio_catalogo sube la versión; el TTL acota lo que puede
+    tardar en verse un alta hecha en otro worker
+    """
+
+    def __init__(self, ttl_segundos: int = 300):
+        self.ttl_segundos = ttl_segundos
+        self.version = 0
+        self._snapshot: Optional[Snapshot] = None
+        self._expira = 0.0
+        self._lock = threading.Lock()
+
+    def obtener(self) -> Optional[Snapshot]:
+        with self._lock:
+            if self._snapshot is None or self._expira <= time.monotonic():
+                return None
+            return self._snapshot
+
+    def guardar(self, ejercicios: List[dict], version: int) -> Snapshot:
+        """Guarda el snapshot leído con la versión indicada (se descarta si hubo un alta entretanto)"""
+        contenido = json.dumps(ejercicios, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        huella = hashlib.blake2b(contenido, digest_size=8).hexdigest()
+        # El ETag sale solo del contenido: igual en todos los workers para el mismo catálogo
+        snapshot = Snapshot(contenido, f'"{huella}"')
+        with self._lock:
+            if version == self.version:
+                self._snapshot = snapshot
+                self._expira = time.monotonic() + self.ttl_segundos
+        return snapshot
+
+    def nueva_version(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._snapshot = None
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (admite listas, W/ y '*')"""
+    if not if_none_match:
+        return False
+    etiquetas = [etiqueta.strip() for etiqueta in if_none_match.split(",")]
+    return "*" in etiquetas or etag.removeprefix("W/") in [e.removeprefix("W/") for e in etiquetas]
+
+def _nombre_backend() -> str:
+    if settings.cache_plan_backend is not None:
+        return settings.cache_plan_backend
+    # Con varios workers solo una cache compartida ve las invalidaciones de todos
+    return "redis" if settings.web_concurrency > 1 and settings.redis_url else "memoria"
+
+def _crear_backend() -> CacheBackend:
+    backend = _nombre_backend()
+    if backend == "redis":
+        import redis  # Dependencia opcional, solo si se configura este backend
+        return BackendRedis(redis.Redis.from_url(settings.redis_url))
+    if backend == "redis_local":
+        return BackendRedis(RedisLocal())
+    if settings.web_concurrency > 1:
+        logger.warning(
+            "Cache del plan activo en memoria con %d workers: tras editar un plan los demás "
+            "workers pueden servir el anterior hasta %d s (CACHE_PLAN_TTL_SEGUNDOS); usar "
+            "CACHE_PLAN_BACKEND=redis",
+            settings.web_concurrency, settings.cache_plan_ttl_segundos
+        )
+    return BackendMemoria(max_entradas=settings.cache_plan_max_entradas)
+
+cache_plan_activo = CachePlanActivo(_crear_backend(), ttl_segundos=settings.cache_plan_ttl_segundos)
+registrar_recolector(cache_plan_activo.metricas)
+
+snapshot_catalogo = SnapshotCatalogo(ttl_segundos=settings.catalogo_ttl_segundos)
+
+# Totales estimados de listados (clave -> entero), con TTL corto
+conteos_estimados = BackendMemoria(max_entradas=1000)
@@ -0,0 +1,218 @@
+from datetime import date
+from sqlalchemy import and_, func, insert, select
+from sqlalchemy.orm import Session
+from typing import Callable, Dict, List, Optional, Tuple
+from app.motor_progresiones import Regla, aplicar_progresiones_cohorte
+from app.resumenes import refrescar_resumenes
+from app.volumen import refrescar_volumen
+from app import models, schemas
+
+NOTAS_PLAN_GENERADO = "Plan generado con progresiones automáticas"
+
+class ProgresionNoAplicable(ValueError):
+    """Alguna regla no se puede aplicar al plan de partida de estos clientes (ondulante_series sin series)"""
+
+    def __init__(self, cliente_ids: List[int]):
+        self.cliente_ids = cliente_ids
+        super().__init__(f"ondulante_series no se puede aplicar a un ejercicio sin series (clientes {cliente_ids})")
+
+def _consulta_ultimos_planes(filtro_clientes):
+    """Último plan de cada cliente con sus ejercicios, en una sola sentencia"""
+    ultima_semana = select(
+        models.PlanSemanal.cliente_id,
+        func.max(models.PlanSemanal.numero_semana).label("numero_semana")
+    ).where(
+        models.PlanSemanal.cliente_id.in_(filtro_clientes)
+    ).group_by(
+        models.PlanSemanal.cliente_id
+    ).subquery()
+
+    return select(
+        models.PlanSemanal.id.label("plan_id"),
+        models.PlanSemanal.cliente_id,
+        models.PlanSemanal.numero_semana,
+        models.PlanSemanal.fecha_inicio,
+        models.EjercicioPlan.id.label("ejercicio_id"),
+        models.EjercicioPlan.ejercicio_catalogo_id,
+        models.EjercicioPlan.orden,
+        models.EjercicioPlan.series_config,
+        models.EjercicioPlan.tiempo_ejercicio_segundos,
+        models.EjercicioPlan.tiempo_descanso_segundos,
+        models.EjercicioPlan.notas_ejercicio
+    ).join(
+        ultima_semana,
+        and_(
+            models.PlanSemanal.cliente_id == ultima_semana.c.cliente_id,
+            models.PlanSemanal.numero_semana == ultima_semana.c.numero_semana
+        )
+    ).outerjoin(
+        models.EjercicioPlan, models.EjercicioPlan.plan_semanal_id == models.PlanSemanal.id
+    ).order_by(
+        models.PlanSemanal.cliente_id,
+        models.EjercicioPlan.orden
+    )
+
+def info_progresion(tipos_progresion: List[str], valores: dict) -> Tuple[str, int]:
+    """tipo_progresion / valor_progresion que se guardan en el ejercicio (para tracking)"""
+    tipo = ', '.join(tipos_progresion) if tipos_progresion else 'ninguna'
+    valor = sum(valores.values()) if valores else 0
+    return tipo, valor
+
+def generar_semana_siguiente(
+    db: Session,
+    fecha_inicio: date,
+    fecha_fin: date,
+    progresiones: List[schemas.ReglaProgresion],
+    cliente_ids: Optional[List[int]] = None,
+    reglas_cliente: Optional[Dict[Tuple[int, int], Regla]] = None,
+    calcular: Callable[..., List[List[int]]] = aplicar_progresiones_cohorte
+) -> Tuple[schemas.ResumenRollover, List[int]]:
+    """
+    Crea la semana siguiente al último plan de cada cliente aplicando progresiones
+    Lee todos los planes de partida en una consulta y escribe planes y
+    ejercicios con INSERTs masivos; no hace commit. Devuelve el resumen y los
+    clientes con plan nuevo (para invalidar su cache). Si alguna regla no se
+    puede aplicar lanza ProgresionNoAplicable sin haber escrito nada
+    reglas_cliente: reglas guardadas por (cliente_id, ejercicio_catalogo_id),
+    tienen prioridad sobre las progresiones comunes de la cohorte
+    calcular: motor de progresiones (mismo contrato que aplicar_progresiones_cohorte)
+    """
+    activos = select(models.Cliente.id).where(models.Cliente.activo == True)
+    # Sin cliente_ids los activos van como subconsulta: la lista no pasa por Python
+    filas = db.execute(_consulta_ultimos_planes(activos if cliente_ids is None else cliente_ids)).all()
+
+    # Los clientes cuyo último plan ya empieza en fecha_inicio se saltan (reintentos)
+    ya_generados = sorted({fila.cliente_id for fila in filas if fila.fecha_inicio >= fecha_inicio})
+    omitidos = set(ya_generados)
+    filas = [fila for fila in filas if fila.cliente_id not in omitidos]
+
+    planes_origen = {}
+    for fila in filas:
+        planes_origen.setdefault(fila.cliente_id, fila.numero_semana)
+    if cliente_ids is None:
+        sin_plan = list(db.scalars(activos.where(~models.Cliente.planes_semanales.any()).order_by(models.Cliente.id)))
+    else:
+        sin_plan = sorted(set(cliente_ids) - planes_origen.keys() - omitidos)
+
+    if not planes_origen:
+        return schemas.ResumenRollover(
+            planes_creados=0,
+            ejercicios_creados=0,
+            clientes_sin_plan=sin_plan,
+            clientes_ya_generados=ya_generados
+        ), []
+
+    # Regla de cada ejercicio de partida (índice en la tabla del motor, -1 = ninguna)
+    ejercicios = [fila for fila in filas if fila.ejercicio_id is not None]
+    indice_regla = {
+        progresion.ejercicio_catalogo_id: i for i, progresion in enumerate(progresiones)
+    }
+    reglas = [(progresion.tipos_progresion, progresion.valores) for progresion in progresiones]
+
+    # Reglas por cliente: las repetidas se comparten para que la tabla del motor siga siendo pequeña
+    indice_cliente = {}
+    if reglas_cliente:
+        repetidas = {}
+        for clave, (tipos, valores) in reglas_cliente.items():
+            firma = (tuple(tipos), tuple(sorted(valores.items())))
+            if firma not in repetidas:
+                repetidas[firma] = len(reglas)
+                reglas.append((tipos, valores))
+            indice_cliente[clave] = repetidas[firma]
+
+    info_reglas = [info_progresion(*regla) for regla in reglas]
+    regla_por_fila = [
+        indice_cliente.get((fila.cliente_id, fila.ejercicio_catalogo_id), indice_regla.get(fila.ejercicio_catalogo_id, -1))
+        for fila in ejercicios
+    ]
+
+    # Validación previa (antes de escribir nada): el motor falla con estas filas
+    invalidos = sorted({
+        fila.cliente_id for fila, regla in zip(ejercicios, regla_por_fila)
+        if regla >= 0 and not fila.series_config and 'ondulante_series' in reglas[regla][0]
+    })
+    if invalidos:
+        raise ProgresionNoAplicable(invalidos)
+
+    nuevos_planes = db.execute(
+        # El cliente_id devuelto identifica cada plan: no hace falta orden de parámetros
+        insert(models.PlanSemanal).returning(models.PlanSemanal.id, models.PlanSemanal.cliente_id),
+        [
+            {
+                "cliente_id": cliente_id,
+                "numero_semana": numero_semana + 1,
+                "fecha_inicio": fecha_inicio,
+                "fecha_fin": fecha_fin,
+                "notas": NOTAS_PLAN_GENERADO
+            }
+            for cliente_id, numero_semana in planes_origen.items()
+        ]
+    ).all()
+    plan_de_cliente = {cliente_id: plan_id for plan_id, cliente_id in nuevos_planes}
+
+    # Progresiones de toda la cohorte en una pasada del motor vectorizado
+    nuevas_configs = calcular(
+        [fila.series_config for fila in ejercicios], reglas, regla_por_fila
+    )
+
+    filas_ejercicios = []
+    for fila, series_config, regla in zip(ejercicios, nuevas_configs, regla_por_fila):
+        tipo_progresion, valor_progresion = info_reglas[regla] if regla >= 0 else ('ninguna', 0)
+        filas_ejercicios.append({
+            "plan_semanal_id": plan_de_cliente[fila.cliente_id],
+            "ejercicio_catalogo_id": fila.ejercicio_catalogo_id,
+            "orden": fila.orden,
+            "series_config": series_config,
+            "tiempo_ejercicio_segundos": fila.tiempo_ejercicio_segundos,
+            "tiempo_descanso_segundos": fila.tiempo_descanso_segundos,
+            "tipo_progresion": tipo_progresion,
+            "valor_progresion": valor_progresion,
+            "notas_ejercicio": fila.notas_ejercicio
+        })
+
+    if filas_ejercicios:
+        db.execute(insert(models.EjercicioPlan), filas_ejercicios)
+
+    db.execute(refrescar_resumenes(db.get_bind().dialect.name, list(plan_de_cliente.values())))
+    db.execute(refrescar_volumen(db.get_bind().dialect.name, list(plan_de_cliente.values())))
+
+    return schemas.ResumenRollover(
+        planes_creados=len(nuevos_planes),
+        ejercicios_creados=len(filas_ejercicios),
+        clientes_sin_plan=sin_plan,
+        clientes_ya_generados=ya_generados
+    ), list(plan_de_cliente)
+
+def guardar_proyeccion(db: Session, cliente_id: int, proyeccion: List[schemas.SemanaProyectada]) -> None:
+    """
+    Inserta todas las semanas proyectadas con INSERTs masivos y asigna plan_id
+    a cada semana; no hace commit
+    """
+    plan_ids = db.execute(
+        insert(models.PlanSemanal).returning(models.PlanSemanal.id, models.PlanSemanal.numero_semana),
+        [
+            {
+                "cliente_id": cliente_id,
+                "numero_semana": semana.numero_semana,
+                "fecha_inicio": semana.fecha_inicio,
+                "fecha_fin": semana.fecha_fin,
+                "notas": NOTAS_PLAN_GENERADO
+            }
+            for semana in proyeccion
+        ]
+    ).all()
+    plan_de_semana = {numero_semana: plan_id for plan_id, numero_semana in plan_ids}
+
+    filas_ejercicios = []
+    for semana in proyeccion:
+        semana.plan_id = plan_de_semana[semana.numero_semana]
+        filas_ejercicios.extend(
+            {"plan_semanal_id": semana.plan_id, **ejercicio.model_dump()}
+            for ejercicio in semana.ejercicios
+        )
+
+    if filas_ejercicios:
+        db.execute(insert(models.EjercicioPlan), filas_ejercicios)
+
+    db.execute(refrescar_resumenes(db.get_bind().dialect.name, list(plan_de_semana.values())))
+    db.execute(refrescar_volumen(db.get_bind().dialect.name, list(plan_de_semana.values())))
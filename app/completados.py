@@ -0,0 +1,89 @@
+from sqlalchemy import JSON, Boolean, Integer, Text, literal, literal_column, select
+from typing import List
+from app.database import ahora_servidor, insert_upsert
+from app import models, schemas
+
+# Columnas que reemplaza un nuevo envío del mismo ejercicio
+COLUMNAS_ACTUALIZABLES = (
+    "series_completadas",
+    "tiempo_ejercicio_real_segundos",
+    "tiempo_descanso_real_segundos",
+    "completado_totalmente",
+    "notas_cliente",
+)
+
+def valores_completado(data: schemas.EjercicioCompletadoCreate) -> dict:
+    """Fila de ejercicios_completados a partir del payload de la app"""
+    return {
+        "ejercicio_plan_id": data.ejercicio_plan_id,
+        "series_completadas": [s.model_dump() for s in data.series_completadas],
+        "tiempo_ejercicio_real_segundos": data.tiempo_ejercicio_real_segundos,
+        "tiempo_descanso_real_segundos": data.tiempo_descanso_real_segundos,
+        "completado_totalmente": data.completado_totalmente,
+        "notas_cliente": data.notas_cliente
+    }
+
+def _columna_insertado(dialecto: str):
+    """True si el upsert insertó la fila, False si actualizó una existente"""
+    if dialecto == "postgresql":
+        return literal_column("xmax = 0", Boolean).label("insertado")
+    # Fuera de Postgres: al actualizar, fecha_completado pasa a una marca con milisegundos
+    # (ver ahora_servidor) y deja de coincidir con created_at
+    return (models.EjercicioCompletado.created_at == models.EjercicioCompletado.fecha_completado).label("insertado")
+
+# Cliente dueño de la fila escrita, para invalidar su cache. Va como SQL literal
+# porque SQLAlchemy quita los prefijos de tabla de todo lo que hay en RETURNING
+_CLIENTE_DEL_EJERCICIO = literal_column(
+    "(SELECT p.cliente_id FROM planes_semanales p"
+    " JOIN ejercicios_plan e ON e.plan_semanal_id = p.id"
+    " WHERE e.id = ejercicios_completados.ejercicio_plan_id)",
+    Integer
+).label("cliente_id")
+
+def _on_conflict(stmt, dialecto: str):
+    return stmt.on_conflict_do_update(
+        index_elements=[models.EjercicioCompletado.ejercicio_plan_id],
+        set_={
+            **{columna: stmt.excluded[columna] for columna in COLUMNAS_ACTUALIZABLES},
+            "fecha_completado": ahora_servidor(dialecto)
+        }
+    )
+
+def upsert_completado(dialecto: str, data: schemas.EjercicioCompletadoCreate):
+    """
+    INSERT ... SELECT ... ON CONFLICT ... RETURNING en una sola sentencia
+    No devuelve filas si el ejercicio_plan_id no existe
+    """
+    valores = valores_completado(data)
+    origen = select(
+        models.EjercicioPlan.id,
+        literal(valores["series_completadas"], JSON),
+        literal(valores["tiempo_ejercicio_real_segundos"], Integer),
+        literal(valores["tiempo_descanso_real_segundos"], Integer),
+        literal(valores["completado_totalmente"], Boolean),
+        literal(valores["notas_cliente"], Text)
+    ).where(
+        models.EjercicioPlan.id == data.ejercicio_plan_id
+    )
+
+    stmt = _on_conflict(
+        insert_upsert(dialecto)(models.EjercicioCompletado).from_select(
+            ["ejercicio_plan_id", *COLUMNAS_ACTUALIZABLES], origen
+        ),
+        dialecto
+    )
+
+    return stmt.returning(
+        models.EjercicioCompletado.id,
+        _columna_insertado(dialecto),
+        _CLIENTE_DEL_EJERCICIO
+    )
+
+def upsert_completados(dialecto: str, filas: List[dict]):
+    """Upsert multi-fila en una sentencia; las filas no deben repetir ejercicio_plan_id"""
+    stmt = _on_conflict(insert_upsert(dialecto)(models.EjercicioCompletado).values(filas), dialecto)
+    return stmt.returning(
+        models.EjercicioCompletado.id,
+        models.EjercicioCompletado.ejercicio_plan_id,
+        _columna_insertado(dialecto)
+    )
@@ -0,0 +1,174 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.database import settings
+from app.metricas import registrar_recolector
+
+TIPOS = ("ejercicio", "descanso")
+
+class SesionCronometro:
+    """
+    Cronómetro de un ejercicio en curso: segundos de ejercicio y descanso
+    acumulados por tramos (como mucho uno corriendo) y las series marcadas
+    """
+
+    def __init__(self, cliente_id: int, ejercicio_plan_id: int, series_config: List[int]):
+        self.cliente_id = cliente_id
+        self.ejercicio_plan_id = ejercicio_plan_id
+        self.series_config = list(series_config)
+        self.acumulado = {tipo: 0.0 for tipo in TIPOS}
+        self.series: Dict[int, dict] = {}
+        self.corriendo: Optional[str] = None
+        self._desde = 0.0
+        self.ultima_actividad = time.monotonic()
+
+    def _cerrar_tramo(self, ahora: float) -> None:
+        if self.corriendo is not None:
+            self.acumulado[self.corriendo] += ahora - self._desde
+            self.corriendo = None
+        self.ultima_actividad = ahora
+
+    def iniciar(self, tipo: str) -> None:
+        """Empieza un tramo; si había otro corriendo se cierra (ejercicio -> descanso)"""
+        ahora = time.monotonic()
+        self._cerrar_tramo(ahora)
+        self.corriendo = tipo
+        self._desde = ahora
+
+    def pausar(self) -> None:
+        self._cerrar_tramo(time.monotonic())
+
+    def registrar(self, tipo: str, segundos: int) -> None:
+        """El tiempo medido en el dispositivo reemplaza al del servidor (p. ej. tras reconectar)"""
+        ahora = time.monotonic()
+        if self.corriendo == tipo:
+            self._desde = ahora
+        self.acumulado[tipo] = float(segundos)
+        self.ultima_actividad = ahora
+
+    def marcar_serie(self, serie: int, reps_realizadas: int, completada: bool, reps_objetivo: Optional[int] = None) -> None:
+        if reps_objetivo is None:
+            reps_objetivo = self.series_config[serie - 1] if serie <= len(self.series_config) else reps_realizadas
+        self.series[serie] = {
+            "serie": serie,
+            "reps_objetivo": reps_objetivo,
+            "reps_realizadas": reps_realizadas,
+            "completada": completada
+        }
+        self.ultima_actividad = time.monotonic()
+
+    def segundos(self) -> Dict[str, int]:
+        totales = dict(self.acumulado)
+        if self.corriendo is not None:
+            totales[self.corriendo] += time.monotonic() - self._desde
+        return {tipo: int(round(valor)) for tipo, valor in totales.items()}
+
+    def series_completadas(self) -> List[dict]:
+        return [self.series[numero] for numero in sorted(self.series)]
+
+    def estado(self) -> dict:
+        return {
+            "cliente_id": self.cliente_id,
+            "ejercicio_plan_id": self.ejercicio_plan_id,
+            "corriendo": self.corriendo,
+            "segundos": self.segundos(),
+            "series_config": self.series_config,
+            "series_completadas": self.series_completadas()
+        }
+
+class CentroCronometros:
+    """
+    Sesiones de cronómetro en curso y paneles de entrenadores suscritos
+    Vive en memoria del proceso y solo se usa desde el event loop (sin locks).
+    Cada evento lleva el estado completo de la sesión: si un panel lento pierde
+    eventos (cola llena), el siguiente lo pone al día
+    """
+
+    def __init__(self, max_cola: int = 256, inactividad_segundos: int = 4 * 3600):
+        self.max_cola = max_cola
+        self.inactividad_segundos = inactividad_segundos
+        self._sesiones: Dict[Tuple[int, int], SesionCronometro] = {}
+        # cola del panel -> clientes que sigue (None = todos)
+        self._paneles: Dict[asyncio.Queue, Optional[Set[int]]] = {}
+        self.conexiones_miembros = 0
+        self.eventos_publicados = 0
+        self.eventos_descartados = 0
+
+    def sesion(self, cliente_id: int, ejercicio_plan_id: int) -> Optional[SesionCronometro]:
+        return self._sesiones.get((cliente_id, ejercicio_plan_id))
+
+    def abrir(self, cliente_id: int, ejercicio_plan_id: int, series_config: List[int]) -> SesionCronometro:
+        sesion = SesionCronometro(cliente_id, ejercicio_plan_id, series_config)
+        self._sesiones[(cliente_id, ejercicio_plan_id)] = sesion
+        return sesion
+
+    def cerrar(self, sesion: SesionCronometro) -> None:
+        self._sesiones.pop((sesion.cliente_id, sesion.ejercicio_plan_id), None)
+
+    def sesiones_de(self, cliente_id: int) -> List[SesionCronometro]:
+        return [sesion for (cliente, _), sesion in self._sesiones.items() if cliente == cliente_id]
+
+    def purgar_inactivas(self) -> int:
+        """Descarta sesiones abandonadas (la app se cerró sin finalizar)"""
+        limite = time.monotonic() - self.inactividad_segundos
+        inactivas = [clave for clave, sesion in self._sesiones.items() if sesion.ultima_actividad < limite]
+        for clave in inactivas:
+            del self._sesiones[clave]
+        return len(inactivas)
+
+    def instantanea(self, cliente_ids: Optional[Set[int]] = None) -> List[dict]:
+        return [
+            sesion.estado() for (cliente_id, _), sesion in self._sesiones.items()
+            if cliente_ids is None or cliente_id in cliente_ids
+        ]
+
+    def suscribir(self, cliente_ids: Optional[Set[int]] = None) -> asyncio.Queue:
+        cola = asyncio.Queue(maxsize=self.max_cola)
+        self._paneles[cola] = cliente_ids
+        return cola
+
+    def desuscribir(self, cola: asyncio.Queue) -> None:
+        self._paneles.pop(cola, None)
+
+    def publicar(self, evento: str, cliente_id: int, **datos) -> dict:
+        """Difunde el evento a los paneles que siguen al cliente y lo devuelve"""
+        mensaje = {
+            "evento": evento,
+            "cliente_id": cliente_id,
+            **datos,
+            "ts": datetime.now(timezone.utc).isoformat()
+        }
+        self.eventos_publicados += 1
+        for cola, cliente_ids in self._paneles.items():
+            if cliente_ids is not None and cliente_id not in cliente_ids:
+                continue
+            try:
+                cola.put_nowait(mensaje)
+            except asyncio.QueueFull:
+                # Un panel lento no frena a los miembros
+                self.eventos_descartados += 1
+        return mensaje
+
+    def publicar_sesion(self, evento: str, sesion: SesionCronometro, **datos) -> dict:
+        return self.publicar(evento, **sesion.estado(), **datos)
+
+    def metricas(self) -> List[str]:
+        """Gauges y contadores en formato Prometheus (para /metrics)"""
+        lineas = []
+        for nombre, tipo, valor in (
+            ("cronometro_sesiones_activas", "gauge", len(self._sesiones)),
+            ("cronometro_conexiones_miembros", "gauge", self.conexiones_miembros),
+            ("cronometro_paneles_entrenador", "gauge", len(self._paneles)),
+            ("cronometro_eventos_publicados_total", "counter", self.eventos_publicados),
+            ("cronometro_eventos_descartados_total", "counter", self.eventos_descartados),
+        ):
+            lineas += [f"# TYPE {nombre} {tipo}", f"{nombre} {valor}"]
+        return lineas
+
+centro_cronometros = CentroCronometros(
+    max_cola=settings.cronometro_cola_entrenador,
+    inactividad_segundos=settings.cronometro_inactividad_segundos
+)
+registrar_recolector(centro_cronometros.metricas)
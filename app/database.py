@@ -1,8 +1,16 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
+from starlette.concurrency import run_in_threadpool
 from pydantic_settings import BaseSettings
+from contextlib import asynccontextmanager
 from functools import lru_cache
+from typing import AsyncIterator, Optional
+from uuid import uuid4
+from app.metricas import AsyncQueuePoolMedido, QueuePoolMedido, instrumentar_engine, registrar_recolector
 
 class Settings(BaseSettings):
     database_url: str
@@ -10,6 +18,52 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
 
+    # Procesos de uvicorn (la misma variable que lee uvicorn para --workers)
+    web_concurrency: int = 1
+
+    # Log de cada sentencia SQL (solo para depurar: cuesta rendimiento)
+    db_echo: bool = False
+
+    # Pool de conexiones (por proceso; con N workers el máximo es N * (size + overflow))
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30  # Segundos esperando una conexión libre antes de fallar
+    db_pool_recycle: int = 1800  # Reabrir conexiones más viejas que esto (-1 = nunca)
+    # Sin pool propio (NullPool): para usar detrás de PgBouncer en modo transacción
+    db_sin_pool: bool = False
+    # statement_timeout del servidor en milisegundos (solo PostgreSQL)
+    db_statement_timeout_ms: Optional[int] = None
+
+    # Modo de acceso a DB: 'sync' (psycopg2 en el threadpool) o 'async' (asyncpg)
+    db_modo: str = "sync"
+    # URL para el modo async; si se omite se deriva de database_url
+    database_url_async: Optional[str] = None
+
+    # Cache del plan activo por cliente: 'memoria', 'redis_local' o 'redis'. La de
+    # memoria es por proceso: con varios workers una edición solo invalida la del
+    # worker que la atendió y los demás sirven el plan anterior hasta el TTL. Sin
+    # indicar, 'redis' si hay varios workers y REDIS_URL; si no, 'memoria'
+    cache_plan_backend: Optional[str] = None
+    cache_plan_max_entradas: int = 10000
+    cache_plan_ttl_segundos: int = 300
+    redis_url: Optional[str] = None
+
+    # Vigencia máxima del snapshot del catálogo de ejercicios
+    catalogo_ttl_segundos: int = 300
+
+    # Vigencia del total estimado de clientes (cabecera X-Total-Estimado)
+    conteo_clientes_ttl_segundos: int = 60
+
+    # Cronómetros en vivo (WebSocket): sesiones sin actividad que se descartan
+    # y eventos pendientes por panel de entrenador antes de descartar
+    cronometro_inactividad_segundos: int = 4 * 3600
+    cronometro_cola_entrenador: int = 256
+    # Escritura por lotes de eventos_cronometro: filas por INSERT, espera máxima
+    # para completar un lote y eventos en memoria antes de frenar a los miembros
+    eventos_cronometro_lote: int = 500
+    eventos_cronometro_intervalo_segundos: float = 1.0
+    eventos_cronometro_max_cola: int = 10000
+
     class Config:
         env_file = ".env"
         extra = "ignore"  # Ignorar campos extra del .env
@@ -20,19 +74,171 @@ def get_settings():
 
 settings = get_settings()
 
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    echo=True  # Para debug, quitar en producción
-)
+def _url_async(url: str) -> str:
+    """Cambia el driver de la URL sync por su equivalente async"""
+    esquema, resto = url.split("://", 1)
+    dialecto = esquema.split("+", 1)[0]
+    if dialecto in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg://{resto}"
+    if dialecto == "sqlite":
+        return f"sqlite+aiosqlite://{resto}"
+    return url
+
+def _opciones_engine(url: str, modo_async: bool) -> dict:
+    """Argumentos de create_engine según el perfil de pool de Settings"""
+    opciones = {"pool_pre_ping": True, "echo": settings.db_echo}
+    connect_args = {}
+    es_postgres = url.split("://", 1)[0].split("+", 1)[0] in ("postgres", "postgresql")
+
+    if settings.db_sin_pool:
+        opciones["poolclass"] = NullPool
+        if modo_async and es_postgres:
+            # PgBouncer en modo transacción no admite sentencias preparadas con nombre fijo
+            connect_args.update(
+                statement_cache_size=0,
+                prepared_statement_cache_size=0,
+                prepared_statement_name_func=lambda: f"__asyncpg_{uuid4()}__"
+            )
+    else:
+        opciones.update(
+            poolclass=AsyncQueuePoolMedido if modo_async else QueuePoolMedido,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle
+        )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    if settings.db_statement_timeout_ms and es_postgres:
+        if modo_async:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.db_statement_timeout_ms)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+
+    if connect_args:
+        opciones["connect_args"] = connect_args
+    return opciones
+
+engine = create_engine(settings.database_url, **_opciones_engine(settings.database_url, modo_async=False))
+instrumentar_engine(engine)
+
+# expire_on_commit=False: tras el commit los objetos siguen legibles sin
+# volver a la DB (en los endpoints async no puede haber cargas implícitas)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.db_modo == "async":
+    url_async = settings.database_url_async or _url_async(settings.database_url)
+    async_engine = create_async_engine(url_async, **_opciones_engine(url_async, modo_async=True))
+    instrumentar_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+def estado_pool() -> dict:
+    """Ocupación actual del pool del engine que usan las peticiones"""
+    pool = (async_engine or engine).pool
+    estado = {"clase": type(pool).__name__, "detalle": pool.status()}
+    if isinstance(pool, QueuePool):
+        estado.update(
+            tamano=pool.size(),
+            max_overflow=settings.db_max_overflow,
+            en_uso=pool.checkedout(),
+            libres=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            esperando=getattr(pool, "esperando", 0),
+            timeout_segundos=pool.timeout()
+        )
+    return estado
+
+def _metricas_pool() -> list:
+    estado = estado_pool()
+    lineas = []
+    for clave in ("en_uso", "libres", "overflow", "esperando"):
+        if clave in estado:
+            metrica = f"db_pool_{clave}"
+            lineas += [f"# TYPE {metrica} gauge", f"{metrica} {estado[clave]}"]
+    return lineas
+
+registrar_recolector(_metricas_pool)
+
+def insert_upsert(dialecto: str):
+    """Construcción insert() con soporte ON CONFLICT para el dialecto en uso"""
+    if dialecto == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+def ahora_servidor(dialecto: str):
+    """now() del servidor; en SQLite con milisegundos (CURRENT_TIMESTAMP solo tiene segundos)"""
+    if dialecto == "postgresql":
+        return func.now()
+    return func.strftime("%Y-%m-%d %H:%M:%f", "now")
+
+class SesionSync:
+    """
+    Expone una Session síncrona con la interfaz de AsyncSession
+    Cada operación con I/O se ejecuta en el threadpool, así los routers
+    (todos async def) funcionan igual en modo 'sync' y 'async'
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    def get_bind(self):
+        return self.sync_session.get_bind()
+
+    async def execute(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, params, **kwargs)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params, **kwargs)
+
+    async def scalars(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalars, statement, params, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self, objects=None) -> None:
+        await run_in_threadpool(self.sync_session.flush, objects)
+
+    async def refresh(self, instance, attribute_names=None) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    db = SesionSync(SessionLocal())
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
+
+# Sesión fuera de una petición (p. ej. WebSockets de larga duración: se abre solo
+# para cada escritura en vez de retener una conexión del pool toda la conexión)
+sesion_db = asynccontextmanager(get_db)
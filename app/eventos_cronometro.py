@@ -0,0 +1,160 @@
+"""
+Registro write-behind de los eventos del cronómetro en vivo (tabla eventos_cronometro)
+
+Los WebSockets encolan cada evento en memoria y una tarea los escribe por
+lotes (al juntar `lote` filas o pasados `intervalo_segundos` desde la primera)
+con un único INSERT multi-fila por lote, en vez de un commit por evento.
+Si la cola se llena, encolar() espera: la presión llega a la conexión del
+miembro en lugar de crecer la memoria. Al apagar la app se vacía la cola.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert
+from app.database import sesion_db, settings
+from app.metricas import Contador, Histograma, registrar_recolector
+from app import models
+
+logger = logging.getLogger(__name__)
+
+# Eventos del cronómetro que se guardan (conexiones y errores no)
+EVENTOS_REGISTRADOS = ("iniciado", "pausado", "tiempo", "serie", "finalizado")
+
+REINTENTOS = 3
+
+filas_escritas = Contador("eventos_cronometro_filas_total", "Eventos de cronómetro escritos en la DB")
+filas_descartadas = Contador("eventos_cronometro_descartados_total", "Eventos de cronómetro perdidos tras agotar los reintentos")
+duracion_escritura = Histograma("eventos_cronometro_escritura_segundos", "Latencia de cada escritura por lotes")
+tamano_lote = Histograma(
+    "eventos_cronometro_filas_por_lote", "Filas por escritura",
+    (1, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+)
+
+def fila_evento(mensaje: dict) -> dict:
+    """Fila de eventos_cronometro a partir de un evento publicado por el centro de cronómetros"""
+    return {
+        "cliente_id": mensaje["cliente_id"],
+        "ejercicio_plan_id": mensaje["ejercicio_plan_id"],
+        "evento": mensaje["evento"],
+        "tipo": mensaje["corriendo"],
+        "segundos_ejercicio": mensaje["segundos"]["ejercicio"],
+        "segundos_descanso": mensaje["segundos"]["descanso"],
+        "series_completadas": len(mensaje["series_completadas"]),
+        "registrado_en": datetime.fromisoformat(mensaje["ts"])
+    }
+
+class BufferEventos:
+    """Cola acotada en el event loop más una tarea que la vuelca por lotes"""
+
+    def __init__(self, max_cola: int = 10000, lote: int = 500, intervalo_segundos: float = 1.0):
+        self.max_cola = max_cola
+        self.lote = lote
+        self.intervalo_segundos = intervalo_segundos
+        self._cola: Optional[asyncio.Queue] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self._cerrando = False
+
+    def iniciar(self) -> None:
+        """Arranca la tarea de escritura en el loop actual (lifespan de la app)"""
+        if self._tarea is None or self._tarea.done():
+            self._cerrando = False
+            self._cola = asyncio.Queue(maxsize=self.max_cola)
+            self._tarea = asyncio.create_task(self._bucle())
+
+    async def encolar(self, mensaje: dict) -> None:
+        if mensaje["evento"] not in EVENTOS_REGISTRADOS:
+            return
+        if self._tarea is None:
+            # Sin lifespan (p. ej. scripts): se arranca con el primer evento
+            self.iniciar()
+        # Con la cola llena espera a que la tarea escriba (contrapresión)
+        await self._cola.put(fila_evento(mensaje))
+
+    async def detener(self) -> None:
+        """Escribe lo pendiente y termina la tarea"""
+        if self._tarea is None:
+            return
+        self._cerrando = True
+        # None despierta a la tarea si está esperando filas: no se espera al intervalo
+        await self._cola.put(None)
+        await self._tarea
+        self._tarea = None
+
+    def profundidad(self) -> int:
+        return self._cola.qsize() if self._cola is not None else 0
+
+    async def _siguiente_lote(self) -> List[dict]:
+        """Espera la primera fila y junta más hasta llenar el lote o agotar el intervalo"""
+        filas = []
+        limite = None
+        while len(filas) < self.lote:
+            if self._cerrando:
+                # Al apagar no se espera a completar el lote: se toma lo que quede
+                while len(filas) < self.lote and not self._cola.empty():
+                    filas.append(self._cola.get_nowait())
+                break
+            if not filas:
+                espera = self.intervalo_segundos
+            else:
+                espera = limite - time.monotonic()
+                if espera <= 0:
+                    break
+            try:
+                filas.append(await asyncio.wait_for(self._cola.get(), espera))
+            except asyncio.TimeoutError:
+                if filas:
+                    break
+                continue
+            if limite is None:
+                limite = time.monotonic() + self.intervalo_segundos
+            # Lo que ya está en la cola se toma sin esperar
+            while len(filas) < self.lote and not self._cola.empty():
+                filas.append(self._cola.get_nowait())
+        # El None de detener() no es un evento
+        return [fila for fila in filas if fila is not None]
+
+    async def _bucle(self) -> None:
+        while True:
+            filas = await self._siguiente_lote()
+            if filas:
+                await self._escribir(filas)
+            elif self._cerrando and self._cola.empty():
+                return
+
+    async def _escribir(self, filas: List[dict]) -> None:
+        for intento in range(1, REINTENTOS + 1):
+            inicio = time.perf_counter()
+            try:
+                async with sesion_db() as db:
+                    # executemany de un insert(): INSERT ... VALUES multi-fila (insertmanyvalues)
+                    await db.execute(insert(models.EventoCronometro), filas)
+                    await db.commit()
+            except Exception:
+                logger.exception("Error escribiendo %d eventos de cronómetro (intento %d)", len(filas), intento)
+                if intento < REINTENTOS:
+                    await asyncio.sleep(intento)
+                continue
+            duracion_escritura.observar(time.perf_counter() - inicio)
+            tamano_lote.observar(len(filas))
+            filas_escritas.incrementar(len(filas))
+            return
+        filas_descartadas.incrementar(len(filas))
+
+    def metricas(self) -> List[str]:
+        lineas = [
+            "# TYPE eventos_cronometro_cola gauge", f"eventos_cronometro_cola {self.profundidad()}",
+            "# TYPE eventos_cronometro_cola_max gauge", f"eventos_cronometro_cola_max {self.max_cola}",
+        ]
+        for metrica in (filas_escritas, filas_descartadas, duracion_escritura, tamano_lote):
+            lineas.extend(metrica.exportar())
+        return lineas
+
+buffer_eventos = BufferEventos(
+    max_cola=settings.eventos_cronometro_max_cola,
+    lote=settings.eventos_cronometro_lote,
+    intervalo_segundos=settings.eventos_cronometro_intervalo_segundos
+)
+registrar_recolector(buffer_eventos.metricas)
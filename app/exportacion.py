@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import AsyncIterator, Callable, Iterator, Optional, Sequence, Tuple, Union
+from sqlalchemy import Text, cast, select
+from app.database import AsyncSessionLocal, SessionLocal
+from app import models
+
+# Filas por trozo: la memoria del export depende de esto, no del historial
+FILAS_POR_LOTE = 1000
+
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+def consulta_historial(cliente_id: Optional[int] = None, json_como_texto: bool = False):
+    """
+    Una fila por ejercicio de cada plan con su registro de completado (si lo hay)
+    Los planes sin ejercicios salen una vez con las columnas del ejercicio vacías
+    json_como_texto: las columnas JSON llegan sin decodificar (para CSV)
+    """
+    def columna_json(columna):
+        return cast(columna, Text).label(columna.key) if json_como_texto else columna
+
+    stmt = select(
+        models.PlanSemanal.cliente_id,
+        models.Cliente.nombre.label("cliente_nombre"),
+        models.PlanSemanal.id.label("plan_id"),
+        models.PlanSemanal.numero_semana,
+        models.PlanSemanal.fecha_inicio,
+        models.PlanSemanal.fecha_fin,
+        models.EjercicioPlan.id.label("ejercicio_plan_id"),
+        models.EjercicioPlan.orden,
+        models.EjercicioCatalogo.nombre.label("ejercicio"),
+        columna_json(models.EjercicioPlan.series_config),
+        models.EjercicioPlan.tiempo_ejercicio_segundos,
+        models.EjercicioPlan.tiempo_descanso_segundos,
+        models.EjercicioPlan.tipo_progresion,
+        models.EjercicioPlan.valor_progresion,
+        models.EjercicioCompletado.fecha_completado,
+        columna_json(models.EjercicioCompletado.series_completadas),
+        models.EjercicioCompletado.tiempo_ejercicio_real_segundos,
+        models.EjercicioCompletado.tiempo_descanso_real_segundos,
+        models.EjercicioCompletado.completado_totalmente
+    ).join(
+        models.Cliente, models.Cliente.id == models.PlanSemanal.cliente_id
+    ).outerjoin(
+        models.EjercicioPlan, models.EjercicioPlan.plan_semanal_id == models.PlanSemanal.id
+    ).outerjoin(
+        models.EjercicioCatalogo, models.EjercicioCatalogo.id == models.EjercicioPlan.ejercicio_catalogo_id
+    ).outerjoin(
+        models.EjercicioCompletado, models.EjercicioCompletado.ejercicio_plan_id == models.EjercicioPlan.id
+    )
+
+    if cliente_id is not None:
+        stmt = stmt.where(models.PlanSemanal.cliente_id == cliente_id)
+
+    # yield_per: cursor del lado del servidor, las filas llegan por lotes
+    return stmt.order_by(
+        models.PlanSemanal.cliente_id,
+        models.PlanSemanal.numero_semana,
+        models.EjercicioPlan.orden
+    ).execution_options(yield_per=FILAS_POR_LOTE)
+
+COLUMNAS = tuple(consulta_historial().selected_columns.keys())
+
+def _json_por_defecto(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+def _serializador(formato: str) -> Tuple[str, Callable[[Sequence], str]]:
+    """(cabecera, función que convierte un lote de filas en texto)"""
+    if formato == "csv":
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        escritor.writerow(COLUMNAS)
+        cabecera = buffer.getvalue()
+
+        def lote(filas: Sequence) -> str:
+            buffer.seek(0)
+            buffer.truncate()
+            # JSON ya en texto y fechas en ISO con str(): las filas van tal cual
+            escritor.writerows(filas)
+            return buffer.getvalue()
+
+        return cabecera, lote
+
+    def lote(filas: Sequence) -> str:
+        return "".join(
+            json.dumps(dict(zip(COLUMNAS, fila)), default=_json_por_defecto, ensure_ascii=False) + "\n"
+            for fila in filas
+        )
+
+    return "", lote
+
+def _exportar_sync(cliente_id: Optional[int], formato: str) -> Iterator[str]:
+    cabecera, lote = _serializador(formato)
+    if cabecera:
+        yield cabecera
+    with SessionLocal() as db:
+        for particion in db.execute(consulta_historial(cliente_id, formato == "csv")).partitions():
+            yield lote(particion)
+
+async def _exportar_async(cliente_id: Optional[int], formato: str) -> AsyncIterator[str]:
+    cabecera, lote = _serializador(formato)
+    if cabecera:
+        yield cabecera
+    async with AsyncSessionLocal() as db:
+        resultado = await db.stream(consulta_historial(cliente_id, formato == "csv"))
+        async for particion in resultado.partitions():
+            yield lote(particion)
+
+def exportar_historial(cliente_id: Optional[int] = None, formato: str = "ndjson") -> Union[Iterator[str], AsyncIterator[str]]:
+    """
+    Trozos de texto del historial (de un cliente o de todo el gimnasio)
+    Abre su propia sesión: la de la petición se cierra antes de que termine
+    el streaming. En modo sync StreamingResponse itera en el threadpool
+    """
+    if AsyncSessionLocal is not None:
+        return _exportar_async(cliente_id, formato)
+    return _exportar_sync(cliente_id, formato)
@@ -1,16 +1,28 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from app import metricas
 from app.database import engine, Base
+from app.eventos_cronometro import buffer_eventos
 from app.routers import admin, mobile, progresiones
 
 # Crear tablas (en producción usar Alembic)
 # NOTA: Las tablas ya existen en la DB (creadas con init.sql), comentado para evitar conflictos
 # Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Escritura por lotes de eventos del cronómetro; al apagar se vacía la cola
+    buffer_eventos.iniciar()
+    yield
+    await buffer_eventos.detener()
+
 app = FastAPI(
     title="Gym Training App API",
     description="API para gestión de planes de entrenamiento con cronómetros",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS para desarrollo
@@ -22,6 +34,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas por petición (latencia, sentencias y tiempo SQL); ver GET /metrics
+app.add_middleware(metricas.MiddlewareMetricas)
+
 # Incluir routers
 app.include_router(admin.router, prefix="/api/admin", tags=["Admin Web"])
 app.include_router(mobile.router, prefix="/api/mobile", tags=["Mobile App"])
@@ -38,3 +53,8 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+def exportar_metricas():
+    """Métricas en formato texto de Prometheus"""
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,197 @@
+"""
+Métricas de la API en formato texto de Prometheus
+
+- Middleware ASGI: latencia por ruta, sentencias SQL y tiempo SQL por petición
+- Eventos de SQLAlchemy: cuentan y cronometran cada sentencia
+- Pools medidos: tiempo de espera al pedir una conexión
+Se exponen en GET /metrics
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_SENTENCIAS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+
+def _formatear_etiquetas(etiquetas: Etiquetas) -> str:
+    if not etiquetas:
+        return ""
+    pares = ",".join(
+        '{}="{}"'.format(nombre, str(valor).replace("\\", "\\\\").replace('"', '\\"'))
+        for nombre, valor in etiquetas
+    )
+    return "{" + pares + "}"
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self._valores: Dict[Etiquetas, float] = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, valor: float = 1, **etiquetas) -> None:
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + valor
+
+    def exportar(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            for etiquetas, valor in sorted(self._valores.items()):
+                lineas.append(f"{self.nombre}{_formatear_etiquetas(etiquetas)} {valor:g}")
+        return lineas
+
+class Histograma:
+    def __init__(self, nombre: str, ayuda: str, buckets: Tuple[float, ...] = BUCKETS_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = buckets
+        # etiquetas -> [conteo por bucket..., +Inf, suma]
+        self._series: Dict[Etiquetas, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, **etiquetas) -> None:
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [0] * (len(self.buckets) + 2)
+            serie[bisect.bisect_left(self.buckets, valor)] += 1
+            serie[-1] += valor
+
+    def exportar(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            for etiquetas, serie in sorted(self._series.items()):
+                acumulado = 0
+                for limite, conteo in zip((*self.buckets, "+Inf"), serie):
+                    acumulado += conteo
+                    le = etiquetas + (("le", limite if limite == "+Inf" else f"{limite:g}"),)
+                    lineas.append(f"{self.nombre}_bucket{_formatear_etiquetas(le)} {acumulado}")
+                lineas.append(f"{self.nombre}_sum{_formatear_etiquetas(etiquetas)} {serie[-1]:g}")
+                lineas.append(f"{self.nombre}_count{_formatear_etiquetas(etiquetas)} {acumulado}")
+        return lineas
+
+peticiones = Contador("http_peticiones_total", "Peticiones HTTP por método, ruta y estado")
+duracion_peticion = Histograma("http_peticion_duracion_segundos", "Latencia de las peticiones HTTP")
+sentencias_por_peticion = Histograma(
+    "sql_sentencias_por_peticion", "Sentencias SQL ejecutadas por petición", BUCKETS_SENTENCIAS
+)
+tiempo_sql_por_peticion = Histograma("sql_tiempo_por_peticion_segundos", "Tiempo en SQL por petición")
+sentencias_sql = Contador("sql_sentencias_total", "Sentencias SQL ejecutadas (dentro y fuera de peticiones)")
+espera_pool = Histograma("db_pool_espera_segundos", "Tiempo para obtener una conexión del pool")
+
+# Fuentes externas (p. ej. la cache) que aportan líneas al exportar
+_recolectores: List[Callable[[], Iterable[str]]] = []
+
+def registrar_recolector(recolector: Callable[[], Iterable[str]]) -> None:
+    _recolectores.append(recolector)
+
+def exportar() -> str:
+    lineas = []
+    for metrica in (peticiones, duracion_peticion, sentencias_por_peticion, tiempo_sql_por_peticion, sentencias_sql, espera_pool):
+        lineas.extend(metrica.exportar())
+    for recolector in _recolectores:
+        lineas.extend(recolector())
+    return "\n".join(lineas) + "\n"
+
+# ============================================
+# SQL POR PETICIÓN
+# ============================================
+
+# [sentencias, segundos] de la petición en curso; el threadpool copia el
+# contexto, así que las sentencias del modo sync también se suman aquí
+_sql_peticion: ContextVar[Optional[List[float]]] = ContextVar("sql_peticion", default=None)
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicio_sentencia", []).append(time.perf_counter())
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    duracion = time.perf_counter() - conn.info["inicio_sentencia"].pop()
+    sentencias_sql.incrementar()
+    acumulado = _sql_peticion.get()
+    if acumulado is not None:
+        acumulado[0] += 1
+        acumulado[1] += duracion
+
+def _error_sql(contexto):
+    # after_cursor_execute no llega si la sentencia falla
+    if contexto.connection is not None:
+        pila = contexto.connection.info.get("inicio_sentencia")
+        if pila:
+            pila.pop()
+
+def instrumentar_engine(engine) -> None:
+    """Registra los eventos de conteo/tiempo SQL en un Engine (sync)"""
+    event.listen(engine, "before_cursor_execute", _antes_de_ejecutar)
+    event.listen(engine, "after_cursor_execute", _despues_de_ejecutar)
+    event.listen(engine, "handle_error", _error_sql)
+
+_lock_esperando = threading.Lock()
+
+class _EsperaMedida:
+    """Mide cuánto tarda _do_get (espera en la cola o apertura de conexión)"""
+
+    esperando = 0  # Peticiones esperando una conexión de este pool ahora mismo
+
+    def _do_get(self):
+        with _lock_esperando:
+            self.esperando += 1
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            espera_pool.observar(time.perf_counter() - inicio)
+            with _lock_esperando:
+                self.esperando -= 1
+
+class QueuePoolMedido(_EsperaMedida, QueuePool):
+    pass
+
+class AsyncQueuePoolMedido(_EsperaMedida, AsyncAdaptedQueuePool):
+    pass
+
+# ============================================
+# MIDDLEWARE
+# ============================================
+
+class MiddlewareMetricas:
+    """Middleware ASGI puro (sin BaseHTTPMiddleware, que añade una tarea por petición)"""
+
+    def __init__(self, app, excluir: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.excluir = excluir
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluir:
+            await self.app(scope, receive, send)
+            return
+
+        estado = [500]
+        acumulado = [0, 0.0]
+        token = _sql_peticion.set(acumulado)
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado[0] = mensaje["status"]
+            await send(mensaje)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracion = time.perf_counter() - inicio
+            _sql_peticion.reset(token)
+            # Plantilla de la ruta (/cliente/{cliente_id}/...) para no crear una serie por id
+            ruta = getattr(scope.get("route"), "path", "sin_ruta")
+            metodo = scope["method"]
+            peticiones.incrementar(metodo=metodo, ruta=ruta, estado=estado[0])
+            duracion_peticion.observar(duracion, metodo=metodo, ruta=ruta)
+            sentencias_por_peticion.observar(acumulado[0], ruta=ruta)
+            tiempo_sql_por_peticion.observar(acumulado[1], ruta=ruta)
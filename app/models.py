@@ -1,8 +1,15 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Text, ForeignKey, ARRAY, JSON, UniqueConstraint
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, Date, DateTime, Text, ForeignKey, ARRAY, JSON, Index, UniqueConstraint, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
+# Los índices gin_trgm_ops de clientes necesitan la extensión: create_all la crea
+# primero en PostgreSQL (las migraciones lo hacen en 0003)
+event.listen(
+    Base.metadata, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
 class EjercicioCatalogo(Base):
     __tablename__ = "ejercicios_catalogo"
 
@@ -17,6 +24,11 @@ class EjercicioCatalogo(Base):
 
 class Cliente(Base):
     __tablename__ = "clientes"
+    __table_args__ = (
+        # Búsqueda por prefijo/contenido (ILIKE) con pg_trgm; en otros motores son índices normales
+        Index("ix_clientes_nombre_trgm", "nombre", postgresql_using="gin", postgresql_ops={"nombre": "gin_trgm_ops"}),
+        Index("ix_clientes_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nombre = Column(String(100), nullable=False)
@@ -26,13 +38,23 @@ class Cliente(Base):
     activo = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Plan vigente, lo mantiene app.plan_actual (puede quedar desactualizado: se valida al leer)
+    plan_actual_id = Column(Integer, ForeignKey("planes_semanales.id", ondelete="SET NULL", use_alter=True, name="fk_clientes_plan_actual"))
+
     # Relaciones
-    planes_semanales = relationship("PlanSemanal", back_populates="cliente", cascade="all, delete-orphan")
+    planes_semanales = relationship(
+        "PlanSemanal",
+        back_populates="cliente",
+        cascade="all, delete-orphan",
+        foreign_keys="PlanSemanal.cliente_id"
+    )
 
 class PlanSemanal(Base):
     __tablename__ = "planes_semanales"
     __table_args__ = (
         UniqueConstraint('cliente_id', 'numero_semana', name='uq_cliente_semana'),
+        # Plan activo por fechas: cliente_id y fecha_fin >= hoy solo recorre los planes vigentes y futuros
+        Index("ix_planes_cliente_fechas", "cliente_id", "fecha_fin", "fecha_inicio"),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -45,8 +67,13 @@ class PlanSemanal(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Relaciones
-    cliente = relationship("Cliente", back_populates="planes_semanales")
-    ejercicios = relationship("EjercicioPlan", back_populates="plan_semanal", cascade="all, delete-orphan")
+    cliente = relationship("Cliente", back_populates="planes_semanales", foreign_keys=[cliente_id])
+    ejercicios = relationship(
+        "EjercicioPlan",
+        back_populates="plan_semanal",
+        cascade="all, delete-orphan",
+        order_by="EjercicioPlan.orden"
+    )
 
 class EjercicioPlan(Base):
     __tablename__ = "ejercicios_plan"
@@ -80,6 +107,9 @@ class EjercicioPlan(Base):
 
 class EjercicioCompletado(Base):
     __tablename__ = "ejercicios_completados"
+    __table_args__ = (
+        UniqueConstraint('ejercicio_plan_id', name='uq_completado_ejercicio_plan'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     ejercicio_plan_id = Column(Integer, ForeignKey("ejercicios_plan.id", ondelete="CASCADE"), nullable=False)
@@ -102,3 +132,87 @@ class EjercicioCompletado(Base):
 
     # Relaciones
     ejercicio_plan = relationship("EjercicioPlan", back_populates="completados")
+
+class ResumenPlan(Base):
+    """Totales de un plan mantenidos en cada escritura (estadísticas sin agregar al leer)"""
+    __tablename__ = "resumenes_plan"
+
+    plan_semanal_id = Column(Integer, ForeignKey("planes_semanales.id", ondelete="CASCADE"), primary_key=True)
+    total_ejercicios = Column(Integer, nullable=False, default=0)
+    ejercicios_completados = Column(Integer, nullable=False, default=0)
+    tiempo_total_segundos = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class VolumenSemanal(Base):
+    """
+    Volumen por cliente × ejercicio del catálogo × semana (un plan), mantenido en cada escritura
+    cliente_id y fecha_inicio se copian del plan para que una serie temporal
+    sea un rango sobre ix_volumen_cliente_ejercicio_fecha
+    """
+    __tablename__ = "volumen_semanal"
+    __table_args__ = (
+        Index("ix_volumen_cliente_ejercicio_fecha", "cliente_id", "ejercicio_catalogo_id", "fecha_inicio"),
+    )
+
+    plan_semanal_id = Column(Integer, ForeignKey("planes_semanales.id", ondelete="CASCADE"), primary_key=True)
+    ejercicio_catalogo_id = Column(Integer, ForeignKey("ejercicios_catalogo.id"), primary_key=True)
+    cliente_id = Column(Integer, ForeignKey("clientes.id", ondelete="CASCADE"), nullable=False)
+    fecha_inicio = Column(Date, nullable=False)
+    series_objetivo = Column(Integer, nullable=False, default=0)
+    series_completadas = Column(Integer, nullable=False, default=0)
+    reps_objetivo = Column(Integer, nullable=False, default=0)
+    reps_realizadas = Column(Integer, nullable=False, default=0)
+    tiempo_real_segundos = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class EventoCronometro(Base):
+    """
+    Registro append-only del cronómetro en vivo (se escribe por lotes, ver app.eventos_cronometro)
+    Sin claves foráneas: no frena las inserciones ni impide borrar planes
+    """
+    __tablename__ = "eventos_cronometro"
+    __table_args__ = (
+        Index("ix_eventos_cronometro_cliente_fecha", "cliente_id", "registrado_en"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    cliente_id = Column(Integer, nullable=False)
+    ejercicio_plan_id = Column(Integer, nullable=False)
+    evento = Column(String(20), nullable=False)  # 'iniciado', 'pausado', 'tiempo', 'serie', 'finalizado'
+    tipo = Column(String(20))  # Tramo corriendo tras el evento: 'ejercicio', 'descanso' o NULL
+    segundos_ejercicio = Column(Integer, nullable=False)
+    segundos_descanso = Column(Integer, nullable=False)
+    series_completadas = Column(Integer, nullable=False)
+    registrado_en = Column(DateTime(timezone=True), nullable=False)
+
+class ReglaProgresionCliente(Base):
+    """Progresión guardada por cliente y ejercicio del catálogo; la aplica el rollover semanal (app.worker)"""
+    __tablename__ = "reglas_progresion"
+
+    cliente_id = Column(Integer, ForeignKey("clientes.id", ondelete="CASCADE"), primary_key=True)
+    ejercicio_catalogo_id = Column(Integer, ForeignKey("ejercicios_catalogo.id"), primary_key=True)
+    tipos_progresion = Column(JSON, nullable=False)  # Ej: ["lineal_reps", "lineal_series"]
+    valores = Column(JSON, nullable=False)  # Ej: {"lineal_reps": 2, "lineal_series": 1}
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class EjecucionRollover(Base):
+    """
+    Una ejecución del rollover semanal por semana destino (reanudable)
+    ultimo_cliente_id avanza en la misma transacción que cada lote de planes
+    """
+    __tablename__ = "ejecuciones_rollover"
+
+    id = Column(Integer, primary_key=True)
+    fecha_inicio = Column(Date, nullable=False, unique=True)
+    fecha_fin = Column(Date, nullable=False)
+    estado = Column(String(20), nullable=False)  # 'en_curso', 'completada', 'fallida'
+    total_clientes = Column(Integer, nullable=False, default=0)
+    clientes_procesados = Column(Integer, nullable=False, default=0)
+    planes_creados = Column(Integer, nullable=False, default=0)
+    ejercicios_creados = Column(Integer, nullable=False, default=0)
+    ultimo_cliente_id = Column(Integer, nullable=False, default=0)
+    clientes_fallidos = Column(JSON, nullable=False, default=list)
+    error = Column(Text)
+    iniciada_en = Column(DateTime(timezone=True), server_default=func.now())
+    actualizada_en = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    terminada_en = Column(DateTime(timezone=True))
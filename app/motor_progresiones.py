@@ -0,0 +1,108 @@
+import numpy as np
+from itertools import chain
+from typing import List, Sequence, Tuple
+
+# Mismo orden que aplicar_multiples_progresiones: primero reps, luego series
+ORDEN_APLICACION = ('lineal_reps', 'ondulante_reps', 'lineal_series', 'ondulante_series')
+
+# (tipos_progresion, valores), igual que en AplicarProgresion
+Regla = Tuple[Sequence[str], dict]
+
+def _empaquetar(configs: Sequence[List[int]], largos: np.ndarray, ancho: int) -> np.ndarray:
+    """Matriz (n, ancho) con cada series_config alineado a la izquierda y relleno con ceros"""
+    matriz = np.zeros((len(configs), ancho), dtype=np.int64)
+    matriz[np.arange(ancho) < largos[:, None]] = np.fromiter(
+        chain.from_iterable(configs), dtype=np.int64, count=int(largos.sum())
+    )
+    return matriz
+
+def _desempaquetar(matriz: np.ndarray, largos: np.ndarray) -> List[List[int]]:
+    planos = matriz[np.arange(matriz.shape[1]) < largos[:, None]].tolist()
+    limites = np.concatenate(([0], np.cumsum(largos))).tolist()
+    return [planos[inicio:fin] for inicio, fin in zip(limites, limites[1:])]
+
+def _repetir_primera(matriz: np.ndarray, largos: np.ndarray, cantidad: np.ndarray) -> None:
+    """Añade `cantidad` copias de la primera serie a cada fila (in situ)"""
+    if not cantidad.any():
+        return
+    columnas = np.arange(matriz.shape[1])
+    nuevas = (columnas >= largos[:, None]) & (columnas < (largos + cantidad)[:, None])
+    np.copyto(matriz, matriz[:, :1], where=nuevas)
+    largos += cantidad
+
+def aplicar_progresiones_cohorte(
+    configs: Sequence[List[int]],
+    reglas: Sequence[Regla],
+    regla_por_fila: Sequence[int]
+) -> List[List[int]]:
+    """
+    Versión vectorizada de aplicar_multiples_progresiones para toda una cohorte
+    Cada fila i usa reglas[regla_por_fila[i]] (-1 = sin progresión); el
+    resultado es idéntico a llamar a la función por lista fila a fila
+    """
+    n = len(configs)
+    if n == 0:
+        return []
+
+    # Las reglas son pocas (una por ejercicio del catálogo): se codifican una
+    # vez y se reparten a las filas por indexado
+    indices = np.asarray(regla_por_fila, dtype=np.int64)
+    con_regla = indices >= 0
+    indices = np.where(con_regla, indices, 0)
+
+    def por_fila(valores_por_regla, dtype):
+        tabla = np.fromiter(valores_por_regla, dtype=dtype, count=len(reglas)) if reglas else np.zeros(1, dtype)
+        return np.where(con_regla, tabla[indices], 0).astype(dtype)
+
+    aplica = {
+        tipo: por_fila((tipo in tipos for tipos, _ in reglas), bool)
+        for tipo in ORDEN_APLICACION
+    }
+    valor = {
+        tipo: por_fila((valores.get(tipo, 0) for _, valores in reglas), np.int64)
+        for tipo in ('lineal_reps', 'lineal_series', 'ondulante_series')
+    }
+
+    largos = np.fromiter(map(len, configs), dtype=np.int64, count=n)
+    if (aplica['ondulante_series'] & (largos == 0)).any():
+        # aplicar_progresion_ondulante_series falla igual con una lista vacía
+        raise IndexError("ondulante_series requiere al menos una serie")
+
+    # Cota superior del largo final, para no redimensionar la matriz; al menos
+    # 3 columnas para que ondulante_reps pueda escribir [base, base + 4, base + 2]
+    crecimiento = (
+        np.where(aplica['lineal_series'], np.maximum(valor['lineal_series'], 0), 0)
+        + np.where(aplica['ondulante_series'], np.maximum(valor['ondulante_series'], 1), 0)
+    )
+    matriz = _empaquetar(configs, largos, max(int((largos + crecimiento).max()), 3))
+    columnas = np.arange(matriz.shape[1])
+
+    # lineal_reps: +valor a todas las series existentes
+    filas = aplica['lineal_reps'] & (valor['lineal_reps'] != 0)
+    if filas.any():
+        matriz += np.where(filas[:, None] & (columnas < largos[:, None]), valor['lineal_reps'][:, None], 0)
+
+    # ondulante_reps: con 3 o más series queda [base, base + 4, base + 2]
+    filas = aplica['ondulante_reps'] & (largos >= 3)
+    if filas.any():
+        base = matriz[filas, 0]
+        matriz[filas] = 0
+        matriz[filas, :3] = base[:, None] + np.array([0, 4, 2])
+        largos[filas] = 3
+
+    # lineal_series: añade `valor` series iguales a la primera (nada si está vacío)
+    filas = aplica['lineal_series'] & (largos > 0)
+    _repetir_primera(matriz, largos, np.where(filas, np.maximum(valor['lineal_series'], 0), 0))
+
+    # ondulante_series: con 2 o más series añade promedio + valor * 2, si no repite la primera
+    filas = aplica['ondulante_series'] & (largos >= 2)
+    cortas = aplica['ondulante_series'] & (largos < 2)
+    suma = matriz.sum(axis=1)  # El relleno siempre queda en cero
+    pico = suma // np.maximum(largos, 1) + valor['ondulante_series'] * 2
+    filas = np.flatnonzero(filas)
+    matriz[filas, largos[filas]] = pico[filas]
+    largos[filas] += 1
+
+    _repetir_primera(matriz, largos, np.where(cortas, np.maximum(valor['ondulante_series'], 0), 0))
+
+    return _desempaquetar(matriz, largos)
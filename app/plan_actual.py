@@ -0,0 +1,86 @@
+"""
+Puntero al plan activo de cada cliente (clientes.plan_actual_id)
+
+Un trabajo diario lo apunta al plan vigente; la app móvil lo lee por clave
+primaria y, si está vacío o el plan ya no cubre la fecha de hoy, cae a la
+búsqueda por rango de fechas (índice ix_planes_cliente_fechas). Un puntero
+desactualizado solo cuesta esa consulta, nunca un plan equivocado.
+
+Uso desde consola (cron / programador de tareas, una vez al día pasada la medianoche):
+    python -m app.plan_actual refrescar [--lote 5000]
+"""
+import argparse
+from datetime import date
+from typing import Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app import models
+
+CLIENTES_POR_LOTE = 5000
+
+def _cubre(hoy: date):
+    return (
+        models.PlanSemanal.fecha_inicio <= hoy,
+        models.PlanSemanal.fecha_fin >= hoy
+    )
+
+def _buscar_por_fechas(cliente_id, hoy: date):
+    """Primer plan (menor id) del cliente que cubre la fecha"""
+    return select(
+        func.min(models.PlanSemanal.id)
+    ).where(
+        models.PlanSemanal.cliente_id == cliente_id,
+        *_cubre(hoy)
+    ).correlate_except(models.PlanSemanal).scalar_subquery()
+
+def plan_activo_id(cliente_id: int, hoy: Optional[date] = None):
+    """
+    Subconsulta con el id del plan activo: el puntero si sigue vigente, si no
+    la búsqueda por fechas (COALESCE solo evalúa la segunda si la primera es NULL)
+    """
+    hoy = hoy or date.today()
+    por_puntero = select(
+        models.PlanSemanal.id
+    ).join(
+        models.Cliente, models.Cliente.plan_actual_id == models.PlanSemanal.id
+    ).where(
+        models.Cliente.id == cliente_id,
+        *_cubre(hoy)
+    ).correlate(None).scalar_subquery()
+    return func.coalesce(por_puntero, _buscar_por_fechas(cliente_id, hoy))
+
+def refrescar_plan_actual(cliente_ids=None, hoy: Optional[date] = None):
+    """
+    Sentencia que apunta plan_actual_id al plan vigente (NULL si no hay)
+    Solo escribe las filas que cambian. cliente_ids: lista o select de ids (todos si se omite)
+    """
+    vigente = _buscar_por_fechas(models.Cliente.id, hoy or date.today())
+    stmt = update(models.Cliente).where(
+        models.Cliente.plan_actual_id.is_distinct_from(vigente)
+    ).values(
+        plan_actual_id=vigente
+    ).execution_options(synchronize_session=False)
+    if cliente_ids is not None:
+        stmt = stmt.where(models.Cliente.id.in_(cliente_ids))
+    return stmt
+
+def refrescar_todos(db: Session, lote: int = CLIENTES_POR_LOTE, hoy: Optional[date] = None) -> int:
+    """Trabajo diario: recorre los clientes por rangos de id con un commit por rango; devuelve filas cambiadas"""
+    minimo, maximo = db.execute(select(func.min(models.Cliente.id), func.max(models.Cliente.id))).one()
+    cambiados = 0
+    if minimo is not None:
+        for desde in range(minimo, maximo + 1, lote):
+            clientes = select(models.Cliente.id).where(models.Cliente.id.between(desde, desde + lote - 1))
+            cambiados += db.execute(refrescar_plan_actual(clientes, hoy)).rowcount
+            db.commit()
+    return cambiados
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantenimiento del plan activo de cada cliente")
+    parser.add_argument("accion", choices=["refrescar"])
+    parser.add_argument("--lote", type=int, default=CLIENTES_POR_LOTE, help="Clientes por transacción")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        print(f"Clientes con plan activo actualizado: {refrescar_todos(db, args.lote)}")
@@ -0,0 +1,18 @@
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+def _por_defecto(valor):
+    if isinstance(valor, BaseModel):
+        return valor.model_dump()
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+class RespuestaORJSON(ORJSONResponse):
+    """
+    JSON con orjson para modelos ya validados al construirlos
+    Al devolver una Response, FastAPI no vuelve a validar contra response_model
+    (que queda solo para la documentación) ni pasa por jsonable_encoder
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS)
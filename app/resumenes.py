@@ -0,0 +1,109 @@
+"""
+Resúmenes por plan (total de ejercicios, completados y tiempo real)
+
+Cada escritura que afecta a un plan refresca solo la fila de ese plan con una
+sentencia; las estadísticas del cliente son una lectura por clave primaria.
+
+Uso desde consola:
+    python -m app.resumenes verificar    # compara con un recálculo completo
+    python -m app.resumenes reconstruir  # recalcula todos los resúmenes
+"""
+import argparse
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, insert_upsert
+from app import models
+
+def _totales_por_plan():
+    """Totales calculados desde las tablas de origen, una fila por plan"""
+    plan_id = models.PlanSemanal.id
+
+    total = select(
+        func.count(models.EjercicioPlan.id)
+    ).where(
+        models.EjercicioPlan.plan_semanal_id == plan_id
+    ).scalar_subquery()
+
+    completados = select(
+        func.count(models.EjercicioCompletado.id)
+    ).join(
+        models.EjercicioPlan
+    ).where(
+        models.EjercicioPlan.plan_semanal_id == plan_id
+    ).scalar_subquery()
+
+    tiempo = select(
+        func.coalesce(func.sum(models.EjercicioCompletado.tiempo_ejercicio_real_segundos), 0)
+    ).join(
+        models.EjercicioPlan
+    ).where(
+        models.EjercicioPlan.plan_semanal_id == plan_id
+    ).scalar_subquery()
+
+    return select(
+        plan_id.label("plan_semanal_id"),
+        total.label("total_ejercicios"),
+        completados.label("ejercicios_completados"),
+        tiempo.label("tiempo_total_segundos")
+    )
+
+def refrescar_resumenes(dialecto: str, plan_ids):
+    """
+    Sentencia única que recalcula y guarda el resumen de los planes indicados
+    plan_ids puede ser una lista o un select que devuelva ids de plan
+    """
+    stmt = insert_upsert(dialecto)(models.ResumenPlan).from_select(
+        ["plan_semanal_id", "total_ejercicios", "ejercicios_completados", "tiempo_total_segundos"],
+        _totales_por_plan().where(models.PlanSemanal.id.in_(plan_ids))
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[models.ResumenPlan.plan_semanal_id],
+        set_={
+            "total_ejercicios": stmt.excluded.total_ejercicios,
+            "ejercicios_completados": stmt.excluded.ejercicios_completados,
+            "tiempo_total_segundos": stmt.excluded.tiempo_total_segundos,
+            "updated_at": func.now()
+        }
+    )
+
+def planes_de_ejercicios(ejercicio_plan_ids):
+    """Select de los planes a los que pertenecen unos ejercicios"""
+    return select(models.EjercicioPlan.plan_semanal_id).where(
+        models.EjercicioPlan.id.in_(ejercicio_plan_ids)
+    )
+
+def verificar(db: Session) -> list:
+    """Planes cuyo resumen guardado no coincide con un recálculo completo"""
+    recalculados = _totales_por_plan().subquery()
+    guardados = models.ResumenPlan
+    return list(db.scalars(
+        select(recalculados.c.plan_semanal_id).outerjoin(
+            guardados, guardados.plan_semanal_id == recalculados.c.plan_semanal_id
+        ).where(
+            (guardados.plan_semanal_id.is_(None))
+            | (guardados.total_ejercicios != recalculados.c.total_ejercicios)
+            | (guardados.ejercicios_completados != recalculados.c.ejercicios_completados)
+            | (guardados.tiempo_total_segundos != recalculados.c.tiempo_total_segundos)
+        ).order_by(recalculados.c.plan_semanal_id)
+    ))
+
+def reconstruir(db: Session) -> int:
+    """Recalcula todos los resúmenes; devuelve el número de planes"""
+    db.execute(refrescar_resumenes(db.get_bind().dialect.name, select(models.PlanSemanal.id)))
+    db.commit()
+    return db.scalar(select(func.count(models.ResumenPlan.plan_semanal_id)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantenimiento de resúmenes por plan")
+    parser.add_argument("accion", choices=["verificar", "reconstruir"])
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.accion == "verificar":
+            inconsistentes = verificar(db)
+            print(f"Planes con resumen inconsistente: {len(inconsistentes)}")
+            if inconsistentes:
+                print(", ".join(str(plan_id) for plan_id in inconsistentes))
+                raise SystemExit(1)
+        else:
+            print(f"Resúmenes reconstruidos: {reconstruir(db)}")
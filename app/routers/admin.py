@@ -1,18 +1,99 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+import asyncio
+import json
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, func, insert, or_, select, text, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+from app.database import ahora_servidor, estado_pool, get_db, settings
+from app.cache import cache_plan_activo, conteos_estimados, etag_coincide, snapshot_catalogo
+from app.cronometros import centro_cronometros
+from app.exportacion import FORMATOS, exportar_historial
+from app.plan_actual import refrescar_plan_actual
+from app.respuestas import RespuestaORJSON
+from app.resumenes import refrescar_resumenes
+from app.volumen import borrar_volumen_sobrante, refrescar_volumen
 from app import models, schemas
 
 router = APIRouter()
 
+def _patron_busqueda(texto: str, contiene: bool) -> str:
+    """Patrón LIKE con los comodines del texto escapados"""
+    escapado = texto.replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return f"%{escapado}%" if contiene else f"{escapado}%"
+
+def _explain(consulta):
+    """EXPLAIN (FORMAT JSON) de la consulta con sus valores como parámetros (nunca pegados al SQL)"""
+    sql = consulta.compile(dialect=postgresql.dialect(paramstyle="named"))
+    return text(f"EXPLAIN (FORMAT JSON) {sql}").bindparams(**sql.params)
+
+async def _total_estimado(db: AsyncSession, consulta, clave: str) -> int:
+    """
+    Total aproximado de filas de una consulta, cacheado unos segundos
+    En PostgreSQL sale de la estimación del planificador (EXPLAIN), sin COUNT(*)
+    """
+    total = conteos_estimados.get(clave)
+    if total is not None:
+        return total
+
+    dialecto = db.get_bind().dialect
+    if dialecto.name == "postgresql":
+        plan = await db.scalar(_explain(consulta))
+        if isinstance(plan, str):  # asyncpg no decodifica el json
+            plan = json.loads(plan)
+        total = int(plan[0]["Plan"]["Plan Rows"])
+    else:
+        total = await db.scalar(select(func.count()).select_from(consulta.subquery()))
+
+    conteos_estimados.set(clave, total, settings.conteo_clientes_ttl_segundos)
+    return total
+
 @router.get("/clientes", response_model=List[schemas.Cliente])
-def listar_clientes(db: Session = Depends(get_db)):
-    """Lista todos los clientes activos"""
-    return db.query(models.Cliente).filter(models.Cliente.activo == True).all()
+async def listar_clientes(
+    response: Response,
+    cursor: Optional[int] = Query(None, description="id del último cliente recibido"),
+    limit: int = Query(50, ge=1, le=500, description="Clientes por página"),
+    q: Optional[str] = Query(None, min_length=1, max_length=100, description="Texto a buscar en nombre o email"),
+    contiene: bool = Query(False, description="Buscar q en cualquier posición (por defecto, como prefijo)"),
+    con_total: bool = Query(False, description="Añadir la cabecera X-Total-Estimado"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Lista los clientes activos ordenados por id
+    Paginación keyset: la siguiente página se pide con el valor de la
+    cabecera X-Siguiente-Cursor
+    """
+    query = select(models.Cliente).where(models.Cliente.activo == True)
+
+    if q:
+        patron = _patron_busqueda(q, contiene)
+        query = query.where(or_(
+            models.Cliente.nombre.ilike(patron, escape="/"),
+            models.Cliente.email.ilike(patron, escape="/")
+        ))
+
+    if con_total:
+        total = await _total_estimado(db, query, f"clientes:{q or ''}:{contiene}")
+        response.headers["X-Total-Estimado"] = str(total)
+
+    if cursor is not None:
+        query = query.where(models.Cliente.id > cursor)
+
+    query = query.order_by(models.Cliente.id)
+
+    # Pedimos uno de más para saber si existe otra página
+    clientes = (await db.scalars(query.limit(limit + 1))).all()
+    if len(clientes) > limit:
+        clientes = clientes[:limit]
+        response.headers["X-Siguiente-Cursor"] = str(clientes[-1].id)
+
+    return clientes
 
 @router.post("/clientes", response_model=schemas.Cliente)
-def crear_cliente(cliente: schemas.ClienteCreate, db: Session = Depends(get_db)):
+async def crear_cliente(cliente: schemas.ClienteCreate, db: AsyncSession = Depends(get_db)):
     """Crea un nuevo cliente"""
     nuevo_cliente = models.Cliente(
         nombre=cliente.nombre,
@@ -20,75 +101,199 @@ def crear_cliente(cliente: schemas.ClienteCreate, db: Session = Depends(get_db))
         telefono=cliente.telefono
     )
     db.add(nuevo_cliente)
-    db.commit()
-    db.refresh(nuevo_cliente)
+    await db.commit()
+    await db.refresh(nuevo_cliente)
     return nuevo_cliente
 
+# Columnas de schemas.EjercicioPlan: se valida directamente desde las filas (sin ORM)
+_COLUMNAS_EJERCICIO_PLAN = (
+    models.EjercicioPlan.id,
+    models.EjercicioPlan.plan_semanal_id,
+    models.EjercicioPlan.ejercicio_catalogo_id,
+    models.EjercicioPlan.orden,
+    models.EjercicioPlan.series_config,
+    models.EjercicioPlan.tiempo_ejercicio_segundos,
+    models.EjercicioPlan.tiempo_descanso_segundos,
+    models.EjercicioPlan.notas_ejercicio,
+    models.EjercicioPlan.tipo_progresion,
+    models.EjercicioPlan.valor_progresion,
+    models.EjercicioCatalogo.nombre.label("ejercicio_nombre")
+)
+
+_COLUMNAS_PLAN = (
+    models.PlanSemanal.id,
+    models.PlanSemanal.cliente_id,
+    models.PlanSemanal.numero_semana,
+    models.PlanSemanal.fecha_inicio,
+    models.PlanSemanal.fecha_fin,
+    models.PlanSemanal.notas
+)
+
+def _consulta_ejercicios_plan(*condiciones):
+    return select(*_COLUMNAS_EJERCICIO_PLAN).join(
+        models.EjercicioCatalogo, models.EjercicioCatalogo.id == models.EjercicioPlan.ejercicio_catalogo_id
+    ).where(
+        *condiciones
+    ).order_by(
+        models.EjercicioPlan.plan_semanal_id,
+        models.EjercicioPlan.orden
+    )
+
+async def _obtener_plan_con_ejercicios(db: AsyncSession, plan_id: int) -> models.PlanSemanal:
+    """Recarga un plan con sus ejercicios (en async no hay lazy loading)"""
+    return await db.scalar(
+        select(models.PlanSemanal).options(
+            selectinload(models.PlanSemanal.ejercicios)
+        ).where(
+            models.PlanSemanal.id == plan_id
+        ).execution_options(populate_existing=True)
+    )
+
 @router.get("/cliente/{cliente_id}/planes", response_model=List[schemas.PlanSemanal])
-def listar_planes_cliente(cliente_id: int, db: Session = Depends(get_db)):
-    """Lista todos los planes de un cliente"""
-    planes = db.query(models.PlanSemanal).filter(
+async def listar_planes_cliente(
+    cliente_id: int,
+    cursor: Optional[int] = Query(None, description="numero_semana del último plan recibido"),
+    limit: int = Query(20, ge=1, le=200, description="Planes por página"),
+    solo_encabezados: bool = Query(False, description="Omitir ejercicios (cargar luego con /plan/{plan_id}/ejercicios)"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Lista los planes de un cliente (más recientes primero)
+    Paginación keyset sobre numero_semana: la siguiente página se pide con
+    el valor de la cabecera X-Siguiente-Cursor
+    """
+    query = select(*_COLUMNAS_PLAN).where(
         models.PlanSemanal.cliente_id == cliente_id
-    ).order_by(
-        models.PlanSemanal.numero_semana.desc()
-    ).all()
-
-    # Construir respuesta con ejercicios
-    resultado = []
-    for plan in planes:
-        ejercicios = db.query(
-            models.EjercicioPlan,
-            models.EjercicioCatalogo.nombre
+    )
+
+    if cursor is not None:
+        query = query.where(models.PlanSemanal.numero_semana < cursor)
+
+    query = query.order_by(models.PlanSemanal.numero_semana.desc())
+
+    headers = {}
+    # Pedimos uno de más para saber si existe otra página
+    planes = (await db.execute(query.limit(limit + 1))).all()
+    if len(planes) > limit:
+        planes = planes[:limit]
+        headers["X-Siguiente-Cursor"] = str(planes[-1].numero_semana)
+
+    ejercicios = {}
+    if planes and not solo_encabezados:
+        # Una sola consulta extra para todos los ejercicios de la página (evita N+1)
+        filas = await db.execute(_consulta_ejercicios_plan(
+            models.EjercicioPlan.plan_semanal_id.in_([plan.id for plan in planes])
+        ))
+        for fila in filas:
+            ejercicios.setdefault(fila.plan_semanal_id, []).append(schemas.EjercicioPlan.model_validate(fila))
+
+    # Modelos validados una vez al construirlos; RespuestaORJSON evita la segunda pasada
+    return RespuestaORJSON(
+        [schemas.PlanSemanal(**plan._mapping, ejercicios=ejercicios.get(plan.id, [])) for plan in planes],
+        headers=headers
+    )
+
+@router.get("/cliente/{cliente_id}/plan/{plan_id}/ejercicios", response_model=List[schemas.EjercicioPlan])
+async def listar_ejercicios_plan(cliente_id: int, plan_id: int, db: AsyncSession = Depends(get_db)):
+    """Ejercicios de un plan, para completar páginas pedidas con solo_encabezados"""
+    filas = await db.execute(
+        _consulta_ejercicios_plan(
+            models.EjercicioPlan.plan_semanal_id == plan_id,
+            models.PlanSemanal.cliente_id == cliente_id
         ).join(
-            models.EjercicioCatalogo
-        ).filter(
-            models.EjercicioPlan.plan_semanal_id == plan.id
-        ).order_by(
-            models.EjercicioPlan.orden
-        ).all()
-
-        ejercicios_lista = []
-        for ejercicio_plan, ejercicio_nombre in ejercicios:
-            ejercicio_dict = {
-                'id': ejercicio_plan.id,
-                'plan_semanal_id': ejercicio_plan.plan_semanal_id,
-                'ejercicio_catalogo_id': ejercicio_plan.ejercicio_catalogo_id,
-                'orden': ejercicio_plan.orden,
-                'series_config': ejercicio_plan.series_config,
-                'tiempo_ejercicio_segundos': ejercicio_plan.tiempo_ejercicio_segundos,
-                'tiempo_descanso_segundos': ejercicio_plan.tiempo_descanso_segundos,
-                'notas_ejercicio': ejercicio_plan.notas_ejercicio,
-                'tipo_progresion': ejercicio_plan.tipo_progresion,
-                'valor_progresion': ejercicio_plan.valor_progresion,
-                'ejercicio_nombre': ejercicio_nombre
-            }
-            ejercicios_lista.append(ejercicio_dict)
-
-        plan_dict = {
-            'id': plan.id,
-            'cliente_id': plan.cliente_id,
-            'numero_semana': plan.numero_semana,
-            'fecha_inicio': plan.fecha_inicio,
-            'fecha_fin': plan.fecha_fin,
-            'notas': plan.notas,
-            'ejercicios': ejercicios_lista
-        }
-        resultado.append(plan_dict)
-
-    return resultado
+            models.PlanSemanal, models.PlanSemanal.id == models.EjercicioPlan.plan_semanal_id
+        )
+    )
+
+    return RespuestaORJSON([schemas.EjercicioPlan.model_validate(fila) for fila in filas])
+
+def _respuesta_exportacion(cliente_id: Optional[int], formato: str, nombre: str) -> StreamingResponse:
+    return StreamingResponse(
+        exportar_historial(cliente_id, formato),
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'}
+    )
+
+@router.get("/cliente/{cliente_id}/exportar")
+async def exportar_historial_cliente(
+    cliente_id: int,
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson o csv"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Historial completo del cliente (planes, ejercicios y completados) en streaming
+    Una fila por ejercicio; la memoria no crece con los años de historial
+    """
+    if await db.get(models.Cliente, cliente_id) is None:
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+
+    return _respuesta_exportacion(cliente_id, formato, f"historial_cliente_{cliente_id}")
+
+@router.get("/exportar")
+async def exportar_historial_gimnasio(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson o csv")
+):
+    """Historial de todos los clientes en streaming, ordenado por cliente y semana"""
+    return _respuesta_exportacion(None, formato, "historial_gimnasio")
+
+@router.get("/cliente/{cliente_id}/volumen", response_model=List[schemas.VolumenSemanal])
+async def obtener_volumen_cliente(
+    cliente_id: int,
+    ejercicio_catalogo_id: Optional[int] = Query(None, description="Solo este ejercicio del catálogo"),
+    desde: Optional[date] = Query(None, description="Semanas que empiezan en esta fecha o después"),
+    hasta: Optional[date] = Query(None, description="Semanas que empiezan en esta fecha o antes"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Reps y series objetivo vs realizadas por ejercicio y semana, para gráficos
+    Lee la tabla volumen_semanal (mantenida al escribir): un rango sobre su índice
+    """
+    volumen = models.VolumenSemanal
+    query = select(
+        volumen,
+        models.EjercicioCatalogo.nombre.label("ejercicio_nombre")
+    ).join(
+        models.EjercicioCatalogo, models.EjercicioCatalogo.id == volumen.ejercicio_catalogo_id
+    ).where(
+        volumen.cliente_id == cliente_id
+    )
+
+    if ejercicio_catalogo_id is not None:
+        query = query.where(volumen.ejercicio_catalogo_id == ejercicio_catalogo_id)
+    if desde is not None:
+        query = query.where(volumen.fecha_inicio >= desde)
+    if hasta is not None:
+        query = query.where(volumen.fecha_inicio <= hasta)
+
+    filas = await db.execute(query.order_by(volumen.fecha_inicio, volumen.ejercicio_catalogo_id))
+
+    return [
+        schemas.VolumenSemanal(
+            fecha_inicio=fila.fecha_inicio,
+            plan_semanal_id=fila.plan_semanal_id,
+            ejercicio_catalogo_id=fila.ejercicio_catalogo_id,
+            ejercicio_nombre=nombre,
+            series_objetivo=fila.series_objetivo,
+            series_completadas=fila.series_completadas,
+            reps_objetivo=fila.reps_objetivo,
+            reps_realizadas=fila.reps_realizadas,
+            tiempo_real_segundos=fila.tiempo_real_segundos
+        )
+        for fila, nombre in filas
+    ]
 
 @router.post("/cliente/{cliente_id}/plan", response_model=schemas.PlanSemanal)
-def crear_plan_semanal(
+async def crear_plan_semanal(
     cliente_id: int,
     plan: schemas.PlanSemanalCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Crea un nuevo plan semanal para un cliente
     Usado cuando el cliente no tiene historial (Semana 1)
     """
     # Verificar que el cliente existe
-    cliente = db.query(models.Cliente).filter(models.Cliente.id == cliente_id).first()
+    cliente = await db.get(models.Cliente, cliente_id)
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
 
@@ -102,7 +307,7 @@ def crear_plan_semanal(
     )
 
     db.add(nuevo_plan)
-    db.flush()  # Para obtener el ID
+    await db.flush()  # Para obtener el ID
 
     # Agregar ejercicios
     for ejercicio_data in plan.ejercicios:
@@ -119,32 +324,83 @@ def crear_plan_semanal(
         )
         db.add(nuevo_ejercicio)
 
-    db.commit()
-    db.refresh(nuevo_plan)
+    await db.flush()
+    await db.execute(refrescar_resumenes(db.get_bind().dialect.name, [nuevo_plan.id]))
+    await db.execute(refrescar_volumen(db.get_bind().dialect.name, [nuevo_plan.id]))
+    await db.execute(refrescar_plan_actual([cliente_id]))
+    await db.commit()
+    cache_plan_activo.invalidar(cliente_id)
+
+    return await _obtener_plan_con_ejercicios(db, nuevo_plan.id)
+
+# Campos de EjercicioPlan que se pueden editar desde EjercicioPlanUpdate
+_CAMPOS_EDITABLES = ("orden", "series_config", "tiempo_ejercicio_segundos", "tiempo_descanso_segundos", "notas_ejercicio")
+
+_COLUMNAS_DIFF = (
+    models.EjercicioPlan.id,
+    models.EjercicioPlan.ejercicio_catalogo_id,
+    *(getattr(models.EjercicioPlan, campo) for campo in _CAMPOS_EDITABLES)
+)
+
+def _diferencias_ejercicios(existentes, nuevos: List[schemas.EjercicioPlanUpdate]):
+    """
+    Empareja los ejercicios recibidos con los existentes, primero por
+    (orden, ejercicio_catalogo_id) y luego solo por ejercicio_catalogo_id
+    Devuelve (ids a borrar, ids que cambian de orden, filas a actualizar por id, filas a insertar)
+    """
+    libres = {fila.id: fila for fila in existentes}
+    por_posicion = {(fila.orden, fila.ejercicio_catalogo_id): fila.id for fila in existentes}
+
+    pares = [None] * len(nuevos)
+    for i, nuevo in enumerate(nuevos):
+        fila_id = por_posicion.get((nuevo.orden, nuevo.ejercicio_catalogo_id))
+        if fila_id in libres:
+            pares[i] = libres.pop(fila_id)
+
+    for i, nuevo in enumerate(nuevos):
+        if pares[i] is None:
+            fila = next((f for f in libres.values() if f.ejercicio_catalogo_id == nuevo.ejercicio_catalogo_id), None)
+            if fila is not None:
+                pares[i] = libres.pop(fila.id)
 
-    return nuevo_plan
+    mover, actualizar, insertar = [], [], []
+    for nuevo, fila in zip(nuevos, pares):
+        datos = nuevo.model_dump(include=set(_CAMPOS_EDITABLES))
+        if fila is None:
+            insertar.append({"ejercicio_catalogo_id": nuevo.ejercicio_catalogo_id, **datos})
+            continue
+        cambios = {campo: valor for campo, valor in datos.items() if getattr(fila, campo) != valor}
+        if "orden" in cambios:
+            mover.append(fila.id)
+        if cambios:
+            actualizar.append({"id": fila.id, **cambios})
+
+    return list(libres), mover, actualizar, insertar
 
 @router.put("/cliente/{cliente_id}/plan/{plan_id}", response_model=schemas.PlanSemanal)
-def actualizar_plan_semanal(
+async def actualizar_plan_semanal(
     cliente_id: int,
     plan_id: int,
     plan_update: schemas.PlanSemanalUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Actualiza un plan semanal completo (fechas, notas y ejercicios)
     Permite editar TODO del plan activo
+    Los ejercicios se comparan con los existentes y solo se escriben los cambios
     """
     # Verificar que el cliente existe
-    cliente = db.query(models.Cliente).filter(models.Cliente.id == cliente_id).first()
+    cliente = await db.get(models.Cliente, cliente_id)
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
 
     # Obtener el plan
-    plan = db.query(models.PlanSemanal).filter(
-        models.PlanSemanal.id == plan_id,
-        models.PlanSemanal.cliente_id == cliente_id
-    ).first()
+    plan = await db.scalar(
+        select(models.PlanSemanal).where(
+            models.PlanSemanal.id == plan_id,
+            models.PlanSemanal.cliente_id == cliente_id
+        )
+    )
 
     if not plan:
         raise HTTPException(status_code=404, detail="Plan no encontrado")
@@ -153,39 +409,113 @@ def actualizar_plan_semanal(
     plan.fecha_inicio = plan_update.fecha_inicio
     plan.fecha_fin = plan_update.fecha_fin
     plan.notas = plan_update.notas
+    # Marca explícita: cambia el ETag del plan aunque solo se editen ejercicios
+    plan.updated_at = ahora_servidor(db.get_bind().dialect.name)
 
-    # Eliminar todos los ejercicios existentes del plan
-    db.query(models.EjercicioPlan).filter(
-        models.EjercicioPlan.plan_semanal_id == plan.id
-    ).delete()
+    existentes = (await db.execute(
+        select(*_COLUMNAS_DIFF).where(
+            models.EjercicioPlan.plan_semanal_id == plan.id
+        )
+    )).all()
+    borrar, mover, actualizar, insertar = _diferencias_ejercicios(existentes, plan_update.ejercicios)
 
-    # Crear nuevos ejercicios según el payload
-    for ejercicio_data in plan_update.ejercicios:
-        nuevo_ejercicio = models.EjercicioPlan(
-            plan_semanal_id=plan.id,
-            ejercicio_catalogo_id=ejercicio_data.ejercicio_catalogo_id,
-            orden=ejercicio_data.orden,
-            series_config=ejercicio_data.series_config,
-            tiempo_ejercicio_segundos=ejercicio_data.tiempo_ejercicio_segundos,
-            tiempo_descanso_segundos=ejercicio_data.tiempo_descanso_segundos,
-            notas_ejercicio=ejercicio_data.notas_ejercicio
+    # Solo se tocan las filas que cambian: los completados de los ejercicios
+    # que siguen en el plan se conservan
+    if borrar:
+        await db.execute(
+            delete(models.EjercicioPlan).where(models.EjercicioPlan.id.in_(borrar))
+        )
+    if mover:
+        # Dos fases para no chocar con uq_plan_orden al intercambiar posiciones:
+        # primero un orden temporal negativo (único por id), luego el definitivo
+        await db.execute(
+            update(models.EjercicioPlan).where(
+                models.EjercicioPlan.id.in_(mover)
+            ).values(orden=-models.EjercicioPlan.id).execution_options(synchronize_session=False)
+        )
+    if actualizar:
+        await db.execute(update(models.EjercicioPlan), actualizar)
+    if insertar:
+        await db.execute(
+            insert(models.EjercicioPlan),
+            [{"plan_semanal_id": plan.id, **fila} for fila in insertar]
         )
-        db.add(nuevo_ejercicio)
 
-    db.commit()
-    db.refresh(plan)
+    await db.flush()
+    if borrar or insertar:
+        await db.execute(refrescar_resumenes(db.get_bind().dialect.name, [plan.id]))
+    if borrar:
+        await db.execute(borrar_volumen_sobrante([plan.id]))
+    # El volumen depende también de series_config y de las fechas del plan
+    await db.execute(refrescar_volumen(db.get_bind().dialect.name, [plan.id]))
+    # Las fechas pueden haber cambiado qué plan está vigente
+    await db.execute(refrescar_plan_actual([cliente_id]))
+    await db.commit()
+    cache_plan_activo.invalidar(cliente_id)
 
-    return plan
+    return await _obtener_plan_con_ejercicios(db, plan.id)
+
+@router.get("/cache/plan-activo")
+async def estadisticas_cache_plan_activo():
+    """Contadores de hits/misses de la cache del plan activo"""
+    return cache_plan_activo.estadisticas()
+
+@router.get("/db/pool")
+async def estado_pool_conexiones():
+    """Ocupación del pool de conexiones de este proceso (en uso, libres, esperando)"""
+    return estado_pool()
+
+@router.websocket("/cronometros")
+async def cronometros_en_vivo(websocket: WebSocket, cliente_id: Optional[List[int]] = Query(None)):
+    """
+    Panel de entrenador: instantánea de los cronómetros en curso y después cada
+    evento de los miembros (todos, o solo los ?cliente_id=...&cliente_id=...)
+    """
+    await websocket.accept()
+    filtro = set(cliente_id) if cliente_id else None
+    cola = centro_cronometros.suscribir(filtro)
+
+    async def enviar():
+        await websocket.send_json({"evento": "instantanea", "sesiones": centro_cronometros.instantanea(filtro)})
+        while True:
+            await websocket.send_json(await cola.get())
+
+    emisor = asyncio.create_task(enviar())
+    try:
+        # El panel no envía nada útil: se lee solo para detectar el cierre
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        centro_cronometros.desuscribir(cola)
+        emisor.cancel()
+        await asyncio.gather(emisor, return_exceptions=True)
 
 @router.get("/ejercicios-catalogo", response_model=List[schemas.EjercicioCatalogo])
-def listar_ejercicios_catalogo(db: Session = Depends(get_db)):
-    """Lista todos los ejercicios disponibles en el catálogo"""
-    return db.query(models.EjercicioCatalogo).all()
+async def listar_ejercicios_catalogo(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Lista todos los ejercicios disponibles en el catálogo
+    Se sirve desde un snapshot en memoria con ETag (304 si no cambió)
+    """
+    snapshot = snapshot_catalogo.obtener()
+    if snapshot is None:
+        version = snapshot_catalogo.version
+        ejercicios = await db.scalars(select(models.EjercicioCatalogo).order_by(models.EjercicioCatalogo.id))
+        snapshot = snapshot_catalogo.guardar(
+            [schemas.EjercicioCatalogo.model_validate(ejercicio).model_dump() for ejercicio in ejercicios],
+            version
+        )
+
+    if etag_coincide(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers={"ETag": snapshot.etag})
+
+    return Response(content=snapshot.contenido, media_type="application/json", headers={"ETag": snapshot.etag})
 
 @router.post("/ejercicios-catalogo", response_model=schemas.EjercicioCatalogo)
-def crear_ejercicio_catalogo(
+async def crear_ejercicio_catalogo(
     ejercicio: schemas.EjercicioCatalogoCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Crea un nuevo ejercicio en el catálogo"""
     nuevo_ejercicio = models.EjercicioCatalogo(
@@ -194,6 +524,7 @@ def crear_ejercicio_catalogo(
         grupo_muscular=ejercicio.grupo_muscular
     )
     db.add(nuevo_ejercicio)
-    db.commit()
-    db.refresh(nuevo_ejercicio)
+    await db.commit()
+    snapshot_catalogo.nueva_version()
+    await db.refresh(nuevo_ejercicio)
     return nuevo_ejercicio
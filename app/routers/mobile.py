@@ -1,161 +1,300 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from typing import List
-from datetime import date
-from app.database import get_db
+from app.database import get_db, sesion_db
+from app.cache import cache_plan_activo, calcular_etag, etag_coincide
+from app.cronometros import SesionCronometro, centro_cronometros
+from app.eventos_cronometro import buffer_eventos
+from app.plan_actual import plan_activo_id
+from app.completados import upsert_completado, upsert_completados, valores_completado
+from app.resumenes import planes_de_ejercicios, refrescar_resumenes
+from app.respuestas import RespuestaORJSON
+from app.volumen import refrescar_volumen
 from app import models, schemas
 
 router = APIRouter()
 
+def _filtro_plan_activo(cliente_id: int):
+    """Condiciones del plan activo: por clave primaria vía clientes.plan_actual_id (o por fechas si no vale)"""
+    return (
+        models.PlanSemanal.id == plan_activo_id(cliente_id),
+    )
+
+def _etag_plan(plan_id: int, updated_at, ultimo_completado, completados: int) -> str:
+    return calcular_etag("plan", plan_id, updated_at, ultimo_completado, completados)
+
+def _consulta_plan_actual(cliente_id: int):
+    """
+    Plan activo, nombre del cliente, ejercicios con su nombre de catálogo y
+    estado de completado en una sola sentencia (una fila por ejercicio)
+    """
+    return select(
+        models.PlanSemanal.id.label("plan_id"),
+        models.PlanSemanal.updated_at,
+        models.PlanSemanal.numero_semana,
+        models.PlanSemanal.fecha_inicio,
+        models.PlanSemanal.fecha_fin,
+        models.Cliente.nombre.label("cliente_nombre"),
+        models.EjercicioPlan.id.label("ejercicio_id"),
+        models.EjercicioCatalogo.nombre.label("ejercicio_nombre"),
+        models.EjercicioPlan.orden,
+        models.EjercicioPlan.series_config,
+        models.EjercicioPlan.tiempo_ejercicio_segundos,
+        models.EjercicioPlan.tiempo_descanso_segundos,
+        models.EjercicioPlan.notas_ejercicio,
+        models.EjercicioCompletado.id.label("completado_id"),
+        models.EjercicioCompletado.series_completadas,
+        models.EjercicioCompletado.fecha_completado
+    ).join(
+        models.Cliente, models.Cliente.id == models.PlanSemanal.cliente_id
+    ).outerjoin(
+        models.EjercicioPlan, models.EjercicioPlan.plan_semanal_id == models.PlanSemanal.id
+    ).outerjoin(
+        models.EjercicioCatalogo, models.EjercicioCatalogo.id == models.EjercicioPlan.ejercicio_catalogo_id
+    ).outerjoin(
+        models.EjercicioCompletado, models.EjercicioCompletado.ejercicio_plan_id == models.EjercicioPlan.id
+    ).where(
+        *_filtro_plan_activo(cliente_id)
+    ).order_by(
+        models.PlanSemanal.id,
+        models.EjercicioPlan.orden
+    )
+
+def _consulta_version_plan_actual(cliente_id: int):
+    """Solo lo necesario para el ETag del plan activo (sin construir el payload)"""
+    return select(
+        models.PlanSemanal.id,
+        models.PlanSemanal.updated_at,
+        func.max(models.EjercicioCompletado.fecha_completado),
+        func.count(models.EjercicioCompletado.id)
+    ).outerjoin(
+        models.EjercicioPlan, models.EjercicioPlan.plan_semanal_id == models.PlanSemanal.id
+    ).outerjoin(
+        models.EjercicioCompletado, models.EjercicioCompletado.ejercicio_plan_id == models.EjercicioPlan.id
+    ).where(
+        *_filtro_plan_activo(cliente_id)
+    ).group_by(
+        models.PlanSemanal.id,
+        models.PlanSemanal.updated_at
+    ).order_by(
+        models.PlanSemanal.id
+    ).limit(1)
+
 @router.get("/cliente/{cliente_id}/plan-actual", response_model=schemas.PlanSemanalMovil)
-def obtener_plan_actual(cliente_id: int, db: Session = Depends(get_db)):
+async def obtener_plan_actual(
+    cliente_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
     """
     Obtiene el plan de entrenamiento actual del cliente
     Incluye configuración de cronómetros para cada ejercicio
+    Admite If-None-Match: responde 304 si el plan y sus completados no cambiaron
     """
-    # Buscar plan activo (fecha actual entre fecha_inicio y fecha_fin)
-    plan = db.query(models.PlanSemanal).filter(
-        models.PlanSemanal.cliente_id == cliente_id,
-        models.PlanSemanal.fecha_inicio <= date.today(),
-        models.PlanSemanal.fecha_fin >= date.today()
-    ).first()
-
-    if not plan:
+    if_none_match = request.headers.get("if-none-match")
+
+    entrada = cache_plan_activo.obtener(cliente_id)
+    if entrada is not None:
+        if etag_coincide(if_none_match, entrada["etag"]):
+            return Response(status_code=304, headers={"ETag": entrada["etag"]})
+        # El payload de la cache ya se validó al construirlo: va directo a orjson
+        return RespuestaORJSON(entrada["payload"], headers={"ETag": entrada["etag"]})
+
+    if if_none_match:
+        # Validar la versión es una consulta agregada pequeña, sin armar el plan
+        version = (await db.execute(_consulta_version_plan_actual(cliente_id))).first()
+        if version is not None:
+            etag = _etag_plan(*version)
+            if etag_coincide(if_none_match, etag):
+                return Response(status_code=304, headers={"ETag": etag})
+
+    filas = (await db.execute(_consulta_plan_actual(cliente_id))).all()
+
+    if not filas:
         raise HTTPException(status_code=404, detail="No hay plan activo para esta semana")
 
-    # Obtener ejercicios con información completa
-    ejercicios = db.query(
-        models.EjercicioPlan,
-        models.EjercicioCatalogo.nombre
-    ).join(
-        models.EjercicioCatalogo
-    ).filter(
-        models.EjercicioPlan.plan_semanal_id == plan.id
-    ).order_by(
-        models.EjercicioPlan.orden
-    ).all()
-
-    # Formatear ejercicios con cronómetros
-    ejercicios_formateados = []
-    for ejercicio_plan, ejercicio_nombre in ejercicios:
-        # Verificar si ya fue completado
-        completado = db.query(models.EjercicioCompletado).filter(
-            models.EjercicioCompletado.ejercicio_plan_id == ejercicio_plan.id
-        ).first()
-
-        ejercicios_formateados.append({
-            "id": ejercicio_plan.id,
-            "nombre": ejercicio_nombre,
-            "orden": ejercicio_plan.orden,
-            "series_config": ejercicio_plan.series_config,
-            "tiempo_ejercicio_segundos": ejercicio_plan.tiempo_ejercicio_segundos,
-            "tiempo_descanso_segundos": ejercicio_plan.tiempo_descanso_segundos,
-            "notas": ejercicio_plan.notas_ejercicio,
-            "completado": completado is not None,
-            "series_completadas": completado.series_completadas if completado else []
-        })
-
-    return schemas.PlanSemanalMovil(
-        plan_id=plan.id,
-        cliente_nombre=plan.cliente.nombre,
+    # Si se solapan varios planes nos quedamos con el primero
+    plan = filas[0]
+
+    # Ejercicios tipados construidos desde las filas (sin objetos ORM)
+    ejercicios = []
+    fechas_completado = []
+    for fila in filas:
+        if fila.plan_id != plan.plan_id:
+            break
+        if fila.ejercicio_id is None:
+            # Plan sin ejercicios (fila del outer join)
+            continue
+        if fila.completado_id is not None:
+            fechas_completado.append(fila.fecha_completado)
+
+        ejercicios.append(schemas.EjercicioMovil(
+            id=fila.ejercicio_id,
+            nombre=fila.ejercicio_nombre,
+            orden=fila.orden,
+            series_config=fila.series_config,
+            tiempo_ejercicio_segundos=fila.tiempo_ejercicio_segundos,
+            tiempo_descanso_segundos=fila.tiempo_descanso_segundos,
+            notas=fila.notas_ejercicio,
+            completado=fila.completado_id is not None,
+            series_completadas=fila.series_completadas if fila.completado_id is not None else []
+        ))
+
+    plan_movil = schemas.PlanSemanalMovil(
+        plan_id=plan.plan_id,
+        cliente_nombre=plan.cliente_nombre,
         numero_semana=plan.numero_semana,
         fecha_inicio=plan.fecha_inicio,
         fecha_fin=plan.fecha_fin,
-        ejercicios=ejercicios_formateados
+        ejercicios=ejercicios
+    )
+    etag = _etag_plan(
+        plan.plan_id,
+        plan.updated_at,
+        max((f for f in fechas_completado if f is not None), default=None),
+        len(fechas_completado)
     )
+    payload = plan_movil.model_dump(mode="json")
+    cache_plan_activo.guardar(cliente_id, payload, etag)
+
+    return RespuestaORJSON(payload, headers={"ETag": etag})
+
+async def _guardar_completado(db: AsyncSession, data: schemas.EjercicioCompletadoCreate):
+    """Upsert del completado con sus resúmenes y volumen; None si el ejercicio no existe"""
+    # Upsert atómico: valida el ejercicio, inserta o actualiza y devuelve el id en una sentencia
+    dialecto = db.get_bind().dialect.name
+    completado = (await db.execute(upsert_completado(dialecto, data))).first()
+    if not completado:
+        return None
+
+    await db.execute(
+        refrescar_resumenes(dialecto, planes_de_ejercicios([data.ejercicio_plan_id]))
+    )
+    await db.execute(
+        refrescar_volumen(dialecto, planes_de_ejercicios([data.ejercicio_plan_id]))
+    )
+    await db.commit()
+    cache_plan_activo.invalidar(completado.cliente_id)
+    return completado
 
 @router.post("/ejercicio/completar")
-def completar_ejercicio(
+async def completar_ejercicio(
     data: schemas.EjercicioCompletadoCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Registra la completación de un ejercicio
     Incluye tiempos reales de ejercicio y descanso del cronómetro
     """
-    # Verificar que el ejercicio existe
-    ejercicio_plan = db.query(models.EjercicioPlan).filter(
-        models.EjercicioPlan.id == data.ejercicio_plan_id
-    ).first()
+    completado = await _guardar_completado(db, data)
 
-    if not ejercicio_plan:
+    if not completado:
         raise HTTPException(status_code=404, detail="Ejercicio no encontrado")
 
-    # Verificar si ya fue completado anteriormente
-    completado_existente = db.query(models.EjercicioCompletado).filter(
-        models.EjercicioCompletado.ejercicio_plan_id == data.ejercicio_plan_id
-    ).first()
-
-    if completado_existente:
-        # Actualizar registro existente
-        completado_existente.series_completadas = [s.model_dump() for s in data.series_completadas]
-        completado_existente.tiempo_ejercicio_real_segundos = data.tiempo_ejercicio_real_segundos
-        completado_existente.tiempo_descanso_real_segundos = data.tiempo_descanso_real_segundos
-        completado_existente.completado_totalmente = data.completado_totalmente
-        completado_existente.notas_cliente = data.notas_cliente
-        completado_existente.fecha_completado = func.now()
-
-        db.commit()
-        db.refresh(completado_existente)
-        return {"message": "Ejercicio actualizado", "id": completado_existente.id}
-
-    # Crear nuevo registro
-    nuevo_completado = models.EjercicioCompletado(
-        ejercicio_plan_id=data.ejercicio_plan_id,
-        series_completadas=[s.model_dump() for s in data.series_completadas],
-        tiempo_ejercicio_real_segundos=data.tiempo_ejercicio_real_segundos,
-        tiempo_descanso_real_segundos=data.tiempo_descanso_real_segundos,
-        completado_totalmente=data.completado_totalmente,
-        notas_cliente=data.notas_cliente
-    )
+    if completado.insertado:
+        return {"message": "Ejercicio completado registrado", "id": completado.id}
+    return {"message": "Ejercicio actualizado", "id": completado.id}
 
-    db.add(nuevo_completado)
-    db.commit()
-    db.refresh(nuevo_completado)
+@router.post("/ejercicio/completar-lote", response_model=List[schemas.ResultadoCompletado])
+async def completar_ejercicios_lote(
+    items: List[schemas.EjercicioCompletadoCreate],
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Registra en bloque las completaciones acumuladas sin conexión
+    Valida todos los ejercicios con una consulta, hace un único upsert
+    multi-fila y un solo commit. Si un ejercicio llega repetido vale el último envío
+    """
+    if not items:
+        return []
+
+    ejercicios = dict((await db.execute(
+        select(
+            models.EjercicioPlan.id,
+            models.PlanSemanal.cliente_id
+        ).join(
+            models.PlanSemanal
+        ).where(
+            models.EjercicioPlan.id.in_({item.ejercicio_plan_id for item in items})
+        )
+    )).all())
+
+    ultimo_envio = {item.ejercicio_plan_id: indice for indice, item in enumerate(items)}
+
+    filas = [
+        valores_completado(items[indice])
+        for ejercicio_plan_id, indice in ultimo_envio.items()
+        if ejercicio_plan_id in ejercicios
+    ]
 
-    return {"message": "Ejercicio completado registrado", "id": nuevo_completado.id}
+    escritos = {}
+    if filas:
+        dialecto = db.get_bind().dialect.name
+        resultado = await db.execute(upsert_completados(dialecto, filas))
+        escritos = {fila.ejercicio_plan_id: fila for fila in resultado}
+        await db.execute(refrescar_resumenes(dialecto, planes_de_ejercicios(list(escritos))))
+        await db.execute(refrescar_volumen(dialecto, planes_de_ejercicios(list(escritos))))
+
+    await db.commit()
+    for cliente_id in {ejercicios[fila["ejercicio_plan_id"]] for fila in filas}:
+        cache_plan_activo.invalidar(cliente_id)
+
+    resultados = []
+    for indice, item in enumerate(items):
+        escrito = escritos.get(item.ejercicio_plan_id)
+        if escrito is None:
+            resultados.append({"ejercicio_plan_id": item.ejercicio_plan_id, "estado": "no_encontrado"})
+            continue
+        if ultimo_envio[item.ejercicio_plan_id] != indice:
+            estado = "sobrescrito"
+        elif escrito.insertado:
+            estado = "registrado"
+        else:
+            estado = "actualizado"
+        resultados.append({"ejercicio_plan_id": item.ejercicio_plan_id, "estado": estado, "id": escrito.id})
+
+    return resultados
 
 @router.get("/cliente/{cliente_id}/estadisticas", response_model=schemas.EstadisticasEntrenamiento)
-def obtener_estadisticas(cliente_id: int, db: Session = Depends(get_db)):
+async def obtener_estadisticas(cliente_id: int, db: AsyncSession = Depends(get_db)):
     """
     Obtiene estadísticas del entrenamiento actual del cliente
     """
-    # Buscar plan activo
-    plan = db.query(models.PlanSemanal).filter(
-        models.PlanSemanal.cliente_id == cliente_id,
-        models.PlanSemanal.fecha_inicio <= date.today(),
-        models.PlanSemanal.fecha_fin >= date.today()
-    ).first()
-
-    if not plan:
-        raise HTTPException(status_code=404, detail="No hay plan activo")
-
-    # Contar ejercicios totales
-    total_ejercicios = db.query(models.EjercicioPlan).filter(
-        models.EjercicioPlan.plan_semanal_id == plan.id
-    ).count()
-
-    # Contar ejercicios completados
-    ejercicios_completados = db.query(models.EjercicioCompletado).join(
-        models.EjercicioPlan
-    ).filter(
-        models.EjercicioPlan.plan_semanal_id == plan.id
-    ).count()
-
-    # Calcular porcentaje
-    porcentaje = (ejercicios_completados / total_ejercicios * 100) if total_ejercicios > 0 else 0
+    # Buscar plan activo (primero en la cache de plan-actual) y su resumen
+    entrada = cache_plan_activo.obtener(cliente_id)
+    if entrada is not None:
+        plan_id = entrada["payload"]["plan_id"]
+        resumen = await db.get(models.ResumenPlan, plan_id)
+    else:
+        fila = (await db.execute(
+            select(
+                models.PlanSemanal.id,
+                models.ResumenPlan
+            ).outerjoin(
+                models.ResumenPlan
+            ).where(
+                *_filtro_plan_activo(cliente_id)
+            ).limit(1)
+        )).first()
 
-    # Calcular tiempo total de entrenamiento
-    tiempos = db.query(
-        func.sum(models.EjercicioCompletado.tiempo_ejercicio_real_segundos)
-    ).join(
-        models.EjercicioPlan
-    ).filter(
-        models.EjercicioPlan.plan_semanal_id == plan.id
-    ).scalar()
+        if fila is None:
+            raise HTTPException(status_code=404, detail="No hay plan activo")
+        plan_id, resumen = fila
+
+    if resumen is None:
+        # Plan sin resumen todavía (anterior a la tabla de resúmenes): se calcula una vez
+        await db.execute(refrescar_resumenes(db.get_bind().dialect.name, [plan_id]))
+        await db.commit()
+        resumen = await db.get(models.ResumenPlan, plan_id)
 
-    tiempo_total = tiempos or 0
+    total_ejercicios = resumen.total_ejercicios
+    ejercicios_completados = resumen.ejercicios_completados
+    tiempo_total = resumen.tiempo_total_segundos
+
+    porcentaje = (ejercicios_completados / total_ejercicios * 100) if total_ejercicios > 0 else 0
     promedio = (tiempo_total / ejercicios_completados) if ejercicios_completados > 0 else 0
 
     return schemas.EstadisticasEntrenamiento(
@@ -167,24 +306,49 @@ def obtener_estadisticas(cliente_id: int, db: Session = Depends(get_db)):
     )
 
 @router.get("/ejercicio/{ejercicio_plan_id}/cronometro", response_model=schemas.CronometroConfig)
-def obtener_config_cronometro(ejercicio_plan_id: int, db: Session = Depends(get_db)):
+async def obtener_config_cronometro(
+    ejercicio_plan_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
     """
     Obtiene la configuración del cronómetro para un ejercicio específico
     Útil cuando la app necesita recargar un ejercicio en progreso
+    Admite If-None-Match: la configuración solo cambia al editar el plan
     """
-    ejercicio = db.query(
-        models.EjercicioPlan,
-        models.EjercicioCatalogo.nombre
-    ).join(
-        models.EjercicioCatalogo
-    ).filter(
-        models.EjercicioPlan.id == ejercicio_plan_id
-    ).first()
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        updated_at = await db.scalar(
+            select(models.PlanSemanal.updated_at).join(
+                models.EjercicioPlan
+            ).where(
+                models.EjercicioPlan.id == ejercicio_plan_id
+            )
+        )
+        etag = calcular_etag("cronometro", ejercicio_plan_id, updated_at)
+        if updated_at is not None and etag_coincide(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+    ejercicio = (await db.execute(
+        select(
+            models.EjercicioPlan,
+            models.EjercicioCatalogo.nombre,
+            models.PlanSemanal.updated_at
+        ).join(
+            models.EjercicioCatalogo
+        ).join(
+            models.PlanSemanal
+        ).where(
+            models.EjercicioPlan.id == ejercicio_plan_id
+        )
+    )).first()
 
     if not ejercicio:
         raise HTTPException(status_code=404, detail="Ejercicio no encontrado")
 
-    ejercicio_plan, ejercicio_nombre = ejercicio
+    ejercicio_plan, ejercicio_nombre, updated_at = ejercicio
+    response.headers["ETag"] = calcular_etag("cronometro", ejercicio_plan.id, updated_at)
 
     return schemas.CronometroConfig(
         ejercicio_plan_id=ejercicio_plan.id,
@@ -194,3 +358,129 @@ def obtener_config_cronometro(ejercicio_plan_id: int, db: Session = Depends(get_
         tiempo_ejercicio_segundos=ejercicio_plan.tiempo_ejercicio_segundos,
         tiempo_descanso_segundos=ejercicio_plan.tiempo_descanso_segundos
     )
+
+# ============================================
+# CRONÓMETRO EN VIVO (WEBSOCKET)
+# ============================================
+
+async def _abrir_sesion_cronometro(cliente_id: int, ejercicio_plan_id: int) -> SesionCronometro:
+    """Valida que el ejercicio sea de un plan del cliente y abre su cronómetro"""
+    sesion = centro_cronometros.sesion(cliente_id, ejercicio_plan_id)
+    if sesion is not None:
+        return sesion
+
+    async with sesion_db() as db:
+        series_config = await db.scalar(
+            select(models.EjercicioPlan.series_config).join(
+                models.PlanSemanal
+            ).where(
+                models.EjercicioPlan.id == ejercicio_plan_id,
+                models.PlanSemanal.cliente_id == cliente_id
+            )
+        )
+    if series_config is None:
+        raise LookupError("Ejercicio no encontrado")
+    return centro_cronometros.abrir(cliente_id, ejercicio_plan_id, series_config)
+
+def _sesion_en_curso(cliente_id: int, ejercicio_plan_id: int) -> SesionCronometro:
+    sesion = centro_cronometros.sesion(cliente_id, ejercicio_plan_id)
+    if sesion is None:
+        raise LookupError("No hay cronómetro en curso para este ejercicio")
+    return sesion
+
+async def _difundir(evento: str, sesion: SesionCronometro, **datos) -> dict:
+    """Publica el evento a los paneles y lo encola para eventos_cronometro (escritura por lotes)"""
+    mensaje = centro_cronometros.publicar_sesion(evento, sesion, **datos)
+    await buffer_eventos.encolar(mensaje)
+    return mensaje
+
+async def _mensaje_cronometro(cliente_id: int, mensaje: dict) -> dict:
+    """Aplica un mensaje de la app y devuelve el evento resultante (ya difundido a los entrenadores)"""
+    accion = mensaje.get("accion")
+
+    if accion == "estado":
+        return {"evento": "estado", "sesiones": [s.estado() for s in centro_cronometros.sesiones_de(cliente_id)]}
+
+    if accion == "iniciar":
+        datos = schemas.IniciarCronometro.model_validate(mensaje)
+        sesion = await _abrir_sesion_cronometro(cliente_id, datos.ejercicio_plan_id)
+        # Un solo cronómetro corriendo por miembro
+        for otra in centro_cronometros.sesiones_de(cliente_id):
+            if otra is not sesion and otra.corriendo is not None:
+                otra.pausar()
+                await _difundir("pausado", otra)
+        sesion.iniciar(datos.tipo)
+        return await _difundir("iniciado", sesion)
+
+    if accion == "pausar":
+        datos = schemas.PausarCronometro.model_validate(mensaje)
+        sesion = _sesion_en_curso(cliente_id, datos.ejercicio_plan_id)
+        sesion.pausar()
+        return await _difundir("pausado", sesion)
+
+    if accion == "registrar":
+        datos = schemas.RegistrarTiempo.model_validate(mensaje)
+        sesion = await _abrir_sesion_cronometro(cliente_id, datos.ejercicio_plan_id)
+        sesion.registrar(datos.tipo, datos.segundos_transcurridos)
+        return await _difundir("tiempo", sesion)
+
+    if accion == "serie":
+        datos = schemas.SerieCronometro.model_validate(mensaje)
+        sesion = await _abrir_sesion_cronometro(cliente_id, datos.ejercicio_plan_id)
+        sesion.marcar_serie(datos.serie, datos.reps_realizadas, datos.completada, datos.reps_objetivo)
+        return await _difundir("serie", sesion)
+
+    if accion == "finalizar":
+        datos = schemas.FinalizarCronometro.model_validate(mensaje)
+        sesion = _sesion_en_curso(cliente_id, datos.ejercicio_plan_id)
+        sesion.pausar()
+        segundos = sesion.segundos()
+        # Solo los totales llegan a la DB, igual que POST /ejercicio/completar
+        async with sesion_db() as db:
+            completado = await _guardar_completado(db, schemas.EjercicioCompletadoCreate(
+                ejercicio_plan_id=sesion.ejercicio_plan_id,
+                series_completadas=sesion.series_completadas(),
+                tiempo_ejercicio_real_segundos=segundos["ejercicio"],
+                tiempo_descanso_real_segundos=segundos["descanso"],
+                completado_totalmente=datos.completado_totalmente,
+                notas_cliente=datos.notas_cliente
+            ))
+        centro_cronometros.cerrar(sesion)
+        if not completado:
+            raise LookupError("Ejercicio no encontrado")
+        return await _difundir("finalizado", sesion, completado_id=completado.id)
+
+    raise ValueError(f"Acción desconocida: {accion!r}")
+
+@router.websocket("/cliente/{cliente_id}/cronometro")
+async def cronometro_en_vivo(websocket: WebSocket, cliente_id: int):
+    """
+    Cronómetro en vivo: una conexión por miembro en lugar de consultar /cronometro
+    El servidor lleva los tramos de ejercicio/descanso y las series, difunde cada
+    cambio a los paneles de entrenadores y al finalizar guarda solo los totales.
+    Mensajes JSON con "accion": iniciar, pausar, registrar, serie, finalizar o estado
+    """
+    await websocket.accept()
+    centro_cronometros.purgar_inactivas()
+    centro_cronometros.conexiones_miembros += 1
+    centro_cronometros.publicar("conectado", cliente_id)
+    try:
+        # Al reconectar la app recupera los cronómetros que seguían abiertos
+        await websocket.send_json(await _mensaje_cronometro(cliente_id, {"accion": "estado"}))
+        while True:
+            texto = await websocket.receive_text()
+            try:
+                mensaje = json.loads(texto)
+                if not isinstance(mensaje, dict):
+                    raise ValueError("Se esperaba un objeto JSON")
+                respuesta = await _mensaje_cronometro(cliente_id, mensaje)
+            except ValidationError as error:
+                respuesta = {"evento": "error", "detalle": error.errors(include_url=False, include_context=False)}
+            except (LookupError, ValueError) as error:
+                respuesta = {"evento": "error", "detalle": str(error)}
+            await websocket.send_json(respuesta)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        centro_cronometros.conexiones_miembros -= 1
+        centro_cronometros.publicar("desconectado", cliente_id)
@@ -1,7 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from app.database import get_db
+from app.cache import cache_plan_activo
+from app.cohortes import ProgresionNoAplicable, generar_semana_siguiente, guardar_proyeccion, info_progresion
+from app.resumenes import refrescar_resumenes
+from app.volumen import refrescar_volumen
 from app import models, schemas
+from datetime import date, timedelta
 from typing import List
 
 router = APIRouter()
@@ -85,20 +92,67 @@ def aplicar_multiples_progresiones(
 
     return nueva_config
 
+def proyectar_semanas(
+    ejercicios_base: List[models.EjercicioPlan],
+    semana_base: int,
+    fecha_inicio: date,
+    semanas: int,
+    progresiones: List[schemas.ReglaProgresion]
+) -> List[schemas.SemanaProyectada]:
+    """
+    Encadena las progresiones semana a semana en memoria (sin tocar la DB)
+    La semana k parte de la configuración calculada para la semana k - 1
+    """
+    reglas = {progresion.ejercicio_catalogo_id: progresion for progresion in progresiones}
+    configs = [list(ejercicio.series_config) for ejercicio in ejercicios_base]
+
+    proyeccion = []
+    for k in range(semanas):
+        inicio = fecha_inicio + timedelta(days=7 * k)
+        ejercicios = []
+        for i, ejercicio in enumerate(ejercicios_base):
+            regla = reglas.get(ejercicio.ejercicio_catalogo_id)
+            tipo_progresion, valor_progresion = 'ninguna', 0
+            if regla is not None:
+                configs[i] = aplicar_multiples_progresiones(configs[i], regla.tipos_progresion, regla.valores)
+                tipo_progresion, valor_progresion = info_progresion(regla.tipos_progresion, regla.valores)
+
+            ejercicios.append(schemas.EjercicioProyectado(
+                ejercicio_catalogo_id=ejercicio.ejercicio_catalogo_id,
+                orden=ejercicio.orden,
+                series_config=configs[i],
+                tiempo_ejercicio_segundos=ejercicio.tiempo_ejercicio_segundos,
+                tiempo_descanso_segundos=ejercicio.tiempo_descanso_segundos,
+                notas_ejercicio=ejercicio.notas_ejercicio,
+                tipo_progresion=tipo_progresion,
+                valor_progresion=valor_progresion
+            ))
+
+        proyeccion.append(schemas.SemanaProyectada(
+            numero_semana=semana_base + k + 1,
+            fecha_inicio=inicio,
+            fecha_fin=inicio + timedelta(days=6),
+            ejercicios=ejercicios
+        ))
+
+    return proyeccion
+
 @router.post("/crear-plan-con-progresiones")
-def crear_plan_con_progresiones(
+async def crear_plan_con_progresiones(
     data: schemas.CrearPlanDesdeSemanaAnterior,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Crea un nuevo plan basado en la semana anterior aplicando progresiones
     ESTE ES EL ENDPOINT CLAVE PARA LA DEMO
     """
     # Buscar plan de semana anterior
-    plan_anterior = db.query(models.PlanSemanal).filter(
-        models.PlanSemanal.cliente_id == data.cliente_id,
-        models.PlanSemanal.numero_semana == data.semana_anterior
-    ).first()
+    plan_anterior = await db.scalar(
+        select(models.PlanSemanal).where(
+            models.PlanSemanal.cliente_id == data.cliente_id,
+            models.PlanSemanal.numero_semana == data.semana_anterior
+        )
+    )
 
     if not plan_anterior:
         raise HTTPException(status_code=404, detail="Plan de semana anterior no encontrado")
@@ -113,12 +167,14 @@ def crear_plan_con_progresiones(
     )
 
     db.add(nuevo_plan)
-    db.flush()
+    await db.flush()
 
     # Obtener ejercicios de semana anterior
-    ejercicios_anteriores = db.query(models.EjercicioPlan).filter(
-        models.EjercicioPlan.plan_semanal_id == plan_anterior.id
-    ).order_by(models.EjercicioPlan.orden).all()
+    ejercicios_anteriores = (await db.scalars(
+        select(models.EjercicioPlan).where(
+            models.EjercicioPlan.plan_semanal_id == plan_anterior.id
+        ).order_by(models.EjercicioPlan.orden)
+    )).all()
 
     # Crear diccionario de progresiones a aplicar
     progresiones_dict = {
@@ -145,8 +201,7 @@ def crear_plan_con_progresiones(
             )
 
             # Guardar info de progresiones aplicadas (para tracking)
-            tipo_progresion = ', '.join(progresion.tipos_progresion) if progresion.tipos_progresion else 'ninguna'
-            valor_progresion = sum(progresion.valores.values()) if progresion.valores else 0
+            tipo_progresion, valor_progresion = info_progresion(progresion.tipos_progresion, progresion.valores)
 
         # Crear nuevo ejercicio
         nuevo_ejercicio = models.EjercicioPlan(
@@ -163,11 +218,143 @@ def crear_plan_con_progresiones(
 
         db.add(nuevo_ejercicio)
 
-    db.commit()
-    db.refresh(nuevo_plan)
+    await db.flush()
+    await db.execute(refrescar_resumenes(db.get_bind().dialect.name, [nuevo_plan.id]))
+    await db.execute(refrescar_volumen(db.get_bind().dialect.name, [nuevo_plan.id]))
+    await db.commit()
+    cache_plan_activo.invalidar(data.cliente_id)
 
     return {
         "message": "Plan creado con progresiones",
         "plan_id": nuevo_plan.id,
         "numero_semana": nuevo_plan.numero_semana
     }
+
+@router.post("/rollover-cohorte", response_model=schemas.ResumenRollover)
+async def rollover_cohorte(
+    data: schemas.RolloverCohorte,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Genera la semana siguiente para muchos clientes en una sola transacción
+    Parte del último plan de cada cliente (o de todos los activos si no se
+    indican cliente_ids) y aplica las progresiones por ejercicio del catálogo
+    """
+    try:
+        resumen, clientes = await db.run_sync(
+            generar_semana_siguiente,
+            data.fecha_inicio,
+            data.fecha_fin,
+            data.progresiones,
+            data.cliente_ids
+        )
+    except ProgresionNoAplicable as error:
+        # Se valida antes de escribir: no queda nada a medias en la transacción
+        raise HTTPException(status_code=422, detail=str(error))
+
+    await db.commit()
+    for cliente_id in clientes:
+        cache_plan_activo.invalidar(cliente_id)
+
+    return resumen
+
+@router.post("/proyeccion", response_model=schemas.ResultadoProyeccion)
+async def proyectar_periodizacion(
+    data: schemas.ProyeccionPeriodizacion,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Proyecta un bloque de K semanas encadenando las progresiones en memoria
+    Con persistir=false es solo una vista previa; con persistir=true guarda
+    todas las semanas en una transacción
+    """
+    consulta_base = select(models.PlanSemanal).options(
+        selectinload(models.PlanSemanal.ejercicios)
+    ).where(
+        models.PlanSemanal.cliente_id == data.cliente_id
+    )
+    if data.semana_base is not None:
+        consulta_base = consulta_base.where(models.PlanSemanal.numero_semana == data.semana_base)
+    else:
+        consulta_base = consulta_base.order_by(models.PlanSemanal.numero_semana.desc()).limit(1)
+
+    plan_base = await db.scalar(consulta_base)
+    if not plan_base:
+        raise HTTPException(status_code=404, detail="Plan base no encontrado")
+
+    proyeccion = proyectar_semanas(
+        plan_base.ejercicios,
+        plan_base.numero_semana,
+        data.fecha_inicio,
+        data.semanas,
+        data.progresiones
+    )
+
+    if data.persistir:
+        ocupadas = (await db.scalars(
+            select(models.PlanSemanal.numero_semana).where(
+                models.PlanSemanal.cliente_id == data.cliente_id,
+                models.PlanSemanal.numero_semana.between(
+                    proyeccion[0].numero_semana, proyeccion[-1].numero_semana
+                )
+            )
+        )).all()
+        if ocupadas:
+            raise HTTPException(
+                status_code=409,
+                detail=f"El cliente ya tiene planes para las semanas {sorted(ocupadas)}"
+            )
+
+        await db.run_sync(guardar_proyeccion, data.cliente_id, proyeccion)
+        await db.commit()
+        cache_plan_activo.invalidar(data.cliente_id)
+
+    return schemas.ResultadoProyeccion(
+        cliente_id=data.cliente_id,
+        semana_base=plan_base.numero_semana,
+        persistido=data.persistir,
+        semanas=proyeccion
+    )
+
+@router.get("/cliente/{cliente_id}/reglas", response_model=List[schemas.ReglaProgresion])
+async def listar_reglas_cliente(cliente_id: int, db: AsyncSession = Depends(get_db)):
+    """Progresiones que el rollover semanal aplica a este cliente"""
+    return (await db.scalars(
+        select(models.ReglaProgresionCliente).where(
+            models.ReglaProgresionCliente.cliente_id == cliente_id
+        ).order_by(models.ReglaProgresionCliente.ejercicio_catalogo_id)
+    )).all()
+
+@router.put("/cliente/{cliente_id}/reglas", response_model=List[schemas.ReglaProgresion])
+async def guardar_reglas_cliente(
+    cliente_id: int,
+    reglas: List[schemas.ReglaProgresion],
+    db: AsyncSession = Depends(get_db)
+):
+    """Reemplaza las progresiones del cliente (lista vacía = sin progresiones)"""
+    if await db.get(models.Cliente, cliente_id) is None:
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+
+    # Si un ejercicio viene repetido gana la última regla
+    por_ejercicio = {regla.ejercicio_catalogo_id: regla for regla in reglas}
+    await db.execute(
+        delete(models.ReglaProgresionCliente).where(models.ReglaProgresionCliente.cliente_id == cliente_id)
+    )
+    db.add_all(
+        models.ReglaProgresionCliente(
+            cliente_id=cliente_id,
+            ejercicio_catalogo_id=regla.ejercicio_catalogo_id,
+            tipos_progresion=regla.tipos_progresion,
+            valores=regla.valores
+        )
+        for regla in por_ejercicio.values()
+    )
+    await db.commit()
+    return list(por_ejercicio.values())
+
+@router.get("/rollover/ejecuciones", response_model=List[schemas.EjecucionRollover])
+async def listar_ejecuciones_rollover(limite: int = 10, db: AsyncSession = Depends(get_db)):
+    """Últimas ejecuciones del rollover semanal (la más reciente primero) con su progreso"""
+    return (await db.scalars(
+        select(models.EjecucionRollover).order_by(models.EjecucionRollover.fecha_inicio.desc()).limit(limite)
+    )).all()
@@ -78,13 +78,30 @@ class CronometroConfig(BaseModel):
 class IniciarCronometro(BaseModel):
     """Request para iniciar cronómetro"""
     ejercicio_plan_id: int
-    tipo: str = Field(..., description="'ejercicio' o 'descanso'")
+    tipo: str = Field(..., pattern="^(ejercicio|descanso)$", description="'ejercicio' o 'descanso'")
 
 class RegistrarTiempo(BaseModel):
     """Request para registrar tiempo transcurrido"""
     ejercicio_plan_id: int
-    tipo: str = Field(..., description="'ejercicio' o 'descanso'")
-    segundos_transcurridos: int
+    tipo: str = Field(..., pattern="^(ejercicio|descanso)$", description="'ejercicio' o 'descanso'")
+    segundos_transcurridos: int = Field(..., ge=0)
+
+class PausarCronometro(BaseModel):
+    ejercicio_plan_id: int
+
+class SerieCronometro(BaseModel):
+    """Serie marcada durante el cronómetro en vivo (reps_objetivo sale de series_config si se omite)"""
+    ejercicio_plan_id: int
+    serie: int = Field(..., ge=1)
+    reps_objetivo: Optional[int] = None
+    reps_realizadas: int
+    completada: bool = True
+
+class FinalizarCronometro(BaseModel):
+    """Cierra el cronómetro en vivo y guarda los tiempos totales en ejercicios_completados"""
+    ejercicio_plan_id: int
+    completado_totalmente: bool = False
+    notas_cliente: Optional[str] = None
 
 # ============================================
 # SCHEMAS PARA SERIES COMPLETADAS
@@ -104,6 +121,12 @@ class EjercicioCompletadoCreate(BaseModel):
     completado_totalmente: bool = False
     notas_cliente: Optional[str] = None
 
+class ResultadoCompletado(BaseModel):
+    """Resultado por item de una sincronización en lote"""
+    ejercicio_plan_id: int
+    estado: str = Field(..., description="'registrado', 'actualizado', 'sobrescrito' o 'no_encontrado'")
+    id: Optional[int] = None
+
 class EjercicioCompletado(BaseModel):
     id: int
     ejercicio_plan_id: int
@@ -166,10 +189,101 @@ class CrearPlanDesdeSemanaAnterior(BaseModel):
     fecha_fin: date
     progresiones: List[AplicarProgresion] = []  # Lista de progresiones a aplicar
 
+class ReglaProgresion(BaseModel):
+    """Progresión de un ejercicio del catálogo, común a toda la cohorte"""
+    ejercicio_catalogo_id: int
+    tipos_progresion: List[str] = []
+    valores: dict = {}
+
+class RolloverCohorte(BaseModel):
+    cliente_ids: Optional[List[int]] = None  # None = todos los clientes activos
+    fecha_inicio: date
+    fecha_fin: date
+    progresiones: List[ReglaProgresion] = []
+
+class ResumenRollover(BaseModel):
+    planes_creados: int
+    ejercicios_creados: int
+    clientes_sin_plan: List[int] = []  # Sin ninguna semana de la que partir
+    clientes_ya_generados: List[int] = []  # Su último plan ya empieza en fecha_inicio o después
+
+class EjecucionRollover(BaseModel):
+    """Progreso del rollover semanal que corre en el worker (app.worker)"""
+    id: int
+    fecha_inicio: date
+    fecha_fin: date
+    estado: str  # 'en_curso', 'completada', 'fallida'
+    total_clientes: int
+    clientes_procesados: int
+    planes_creados: int
+    ejercicios_creados: int
+    clientes_fallidos: List[int] = []
+    error: Optional[str] = None
+    iniciada_en: Optional[datetime] = None
+    actualizada_en: Optional[datetime] = None
+    terminada_en: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ProyeccionPeriodizacion(BaseModel):
+    cliente_id: int
+    semana_base: Optional[int] = None  # None = último plan del cliente
+    semanas: int = Field(default=12, ge=1, le=52, description="Semanas a proyectar tras semana_base")
+    fecha_inicio: date  # Inicio de la primera semana proyectada; las demás van cada 7 días
+    progresiones: List[ReglaProgresion] = []
+    persistir: bool = False  # False = vista previa, no escribe en la DB
+
+class EjercicioProyectado(EjercicioPlanBase):
+    tipo_progresion: str
+    valor_progresion: int
+
+class SemanaProyectada(BaseModel):
+    numero_semana: int
+    fecha_inicio: date
+    fecha_fin: date
+    plan_id: Optional[int] = None  # Solo si se persistió
+    ejercicios: List[EjercicioProyectado]
+
+class ResultadoProyeccion(BaseModel):
+    cliente_id: int
+    semana_base: int
+    persistido: bool
+    semanas: List[SemanaProyectada]
+
+# ============================================
+# SCHEMAS PARA ANALÍTICA (WEB ADMIN)
+# ============================================
+
+class VolumenSemanal(BaseModel):
+    """Volumen de un ejercicio del catálogo en una semana (objetivo vs realizado)"""
+    fecha_inicio: date
+    plan_semanal_id: int
+    ejercicio_catalogo_id: int
+    ejercicio_nombre: str
+    series_objetivo: int
+    series_completadas: int
+    reps_objetivo: int
+    reps_realizadas: int
+    tiempo_real_segundos: int
+
+    model_config = ConfigDict(from_attributes=True)
+
 # ============================================
 # SCHEMAS PARA APP MÓVIL
 # ============================================
 
+class EjercicioMovil(BaseModel):
+    """Ejercicio del plan activo con su cronómetro y estado de completado"""
+    id: int
+    nombre: str
+    orden: int
+    series_config: List[int]
+    tiempo_ejercicio_segundos: Optional[int] = None  # Columnas nullable en ejercicios_plan
+    tiempo_descanso_segundos: Optional[int] = None
+    notas: Optional[str] = None
+    completado: bool
+    series_completadas: List[dict] = []  # JSON guardado tal cual (puede traer claves extra)
+
 class PlanSemanalMovil(BaseModel):
     """Plan semanal optimizado para app móvil con cronómetros"""
     plan_id: int
@@ -177,7 +291,7 @@ class PlanSemanalMovil(BaseModel):
     numero_semana: int
     fecha_inicio: date
     fecha_fin: date
-    ejercicios: List[dict]  # Lista de ejercicios con toda la info necesaria
+    ejercicios: List[EjercicioMovil]
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -0,0 +1,167 @@
+"""
+Volumen semanal por cliente y ejercicio del catálogo (reps y series objetivo vs realizadas)
+
+Los números viven dentro del JSON de series_config / series_completadas; aquí
+se agregan en SQL (json_each en SQLite, json_array_elements en PostgreSQL) y se
+guardan en volumen_semanal al escribir, así un gráfico de años es un rango
+sobre el índice (cliente_id, ejercicio_catalogo_id, fecha_inicio).
+
+Uso desde consola:
+    python -m app.volumen reconstruir [--lote 2000]  # carga masiva por rangos de planes
+    python -m app.volumen verificar                  # compara con un recálculo completo
+"""
+import argparse
+from sqlalchemy import and_, delete, exists, func, literal_column, select
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, insert_upsert
+from app import models
+
+PLANES_POR_LOTE = 2000
+
+COLUMNAS = (
+    "plan_semanal_id", "ejercicio_catalogo_id", "cliente_id", "fecha_inicio",
+    "series_objetivo", "series_completadas", "reps_objetivo", "reps_realizadas", "tiempo_real_segundos",
+)
+
+def _expresiones_json(dialecto: str) -> dict:
+    """Totales de las series de una fila de ejercicios_plan / ejercicios_completados"""
+    if dialecto == "postgresql":
+        # CAST a json: vale igual si la columna es json o jsonb
+        config = "CAST(ejercicios_plan.series_config AS json)"
+        series = "CAST(ejercicios_completados.series_completadas AS json)"
+        return {
+            "series_objetivo": f"json_array_length({config})",
+            "reps_objetivo": f"(SELECT COALESCE(SUM(CAST(r AS integer)), 0) FROM json_array_elements_text({config}) AS e(r))",
+            "series_completadas": f"(SELECT COUNT(*) FROM json_array_elements({series}) AS e(s) WHERE CAST(s->>'completada' AS boolean))",
+            "reps_realizadas": f"(SELECT COALESCE(SUM(CAST(s->>'reps_realizadas' AS integer)), 0) FROM json_array_elements({series}) AS e(s))",
+        }
+    config = "ejercicios_plan.series_config"
+    series = "ejercicios_completados.series_completadas"
+    return {
+        "series_objetivo": f"json_array_length({config})",
+        "reps_objetivo": f"(SELECT COALESCE(SUM(value), 0) FROM json_each({config}))",
+        "series_completadas": f"(SELECT COUNT(*) FROM json_each({series}) WHERE json_extract(value, '$.completada'))",
+        "reps_realizadas": f"(SELECT COALESCE(SUM(json_extract(value, '$.reps_realizadas')), 0) FROM json_each({series}))",
+    }
+
+def _totales_por_ejercicio(dialecto: str, plan_ids=None):
+    """Totales calculados desde las tablas de origen, una fila por plan y ejercicio del catálogo"""
+    expresiones = _expresiones_json(dialecto)
+    por_fila = select(
+        models.EjercicioPlan.plan_semanal_id,
+        models.EjercicioPlan.ejercicio_catalogo_id,
+        *(literal_column(sql).label(nombre) for nombre, sql in expresiones.items()),
+        func.coalesce(models.EjercicioCompletado.tiempo_ejercicio_real_segundos, 0).label("tiempo_real_segundos")
+    ).outerjoin(
+        models.EjercicioCompletado, models.EjercicioCompletado.ejercicio_plan_id == models.EjercicioPlan.id
+    )
+    if plan_ids is not None:
+        por_fila = por_fila.where(models.EjercicioPlan.plan_semanal_id.in_(plan_ids))
+    por_fila = por_fila.subquery()
+
+    return select(
+        por_fila.c.plan_semanal_id,
+        por_fila.c.ejercicio_catalogo_id,
+        models.PlanSemanal.cliente_id,
+        models.PlanSemanal.fecha_inicio,
+        *(func.sum(por_fila.c[nombre]).label(nombre) for nombre in COLUMNAS[4:])
+    ).join(
+        models.PlanSemanal, models.PlanSemanal.id == por_fila.c.plan_semanal_id
+    ).group_by(
+        por_fila.c.plan_semanal_id,
+        por_fila.c.ejercicio_catalogo_id,
+        models.PlanSemanal.cliente_id,
+        models.PlanSemanal.fecha_inicio
+    )
+
+def refrescar_volumen(dialecto: str, plan_ids):
+    """
+    Sentencia única que recalcula y guarda el volumen de los planes indicados
+    plan_ids puede ser una lista o un select que devuelva ids de plan
+    """
+    stmt = insert_upsert(dialecto)(models.VolumenSemanal).from_select(
+        list(COLUMNAS), _totales_por_ejercicio(dialecto, plan_ids)
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[models.VolumenSemanal.plan_semanal_id, models.VolumenSemanal.ejercicio_catalogo_id],
+        set_={
+            **{columna: stmt.excluded[columna] for columna in COLUMNAS[2:]},
+            "updated_at": func.now()
+        }
+    )
+
+def borrar_volumen_sobrante(plan_ids):
+    """Quita las filas de ejercicios del catálogo que ya no están en el plan"""
+    volumen = models.VolumenSemanal
+    return delete(volumen).where(
+        volumen.plan_semanal_id.in_(plan_ids),
+        ~exists().where(
+            models.EjercicioPlan.plan_semanal_id == volumen.plan_semanal_id,
+            models.EjercicioPlan.ejercicio_catalogo_id == volumen.ejercicio_catalogo_id
+        )
+    )
+
+def verificar(db: Session) -> list:
+    """(plan, ejercicio del catálogo) cuyo volumen guardado no coincide con un recálculo completo"""
+    recalculados = _totales_por_ejercicio(db.get_bind().dialect.name).subquery()
+    guardados = models.VolumenSemanal
+    distintos = select(
+        recalculados.c.plan_semanal_id, recalculados.c.ejercicio_catalogo_id
+    ).outerjoin(
+        guardados,
+        and_(
+            guardados.plan_semanal_id == recalculados.c.plan_semanal_id,
+            guardados.ejercicio_catalogo_id == recalculados.c.ejercicio_catalogo_id
+        )
+    ).where(
+        (guardados.plan_semanal_id.is_(None))
+        | (guardados.fecha_inicio != recalculados.c.fecha_inicio)
+        | (guardados.series_objetivo != recalculados.c.series_objetivo)
+        | (guardados.series_completadas != recalculados.c.series_completadas)
+        | (guardados.reps_objetivo != recalculados.c.reps_objetivo)
+        | (guardados.reps_realizadas != recalculados.c.reps_realizadas)
+        | (guardados.tiempo_real_segundos != recalculados.c.tiempo_real_segundos)
+    )
+    sobrantes = select(
+        guardados.plan_semanal_id, guardados.ejercicio_catalogo_id
+    ).where(
+        ~exists().where(
+            models.EjercicioPlan.plan_semanal_id == guardados.plan_semanal_id,
+            models.EjercicioPlan.ejercicio_catalogo_id == guardados.ejercicio_catalogo_id
+        )
+    )
+    return sorted(tuple(fila) for fila in db.execute(distintos.union_all(sobrantes)))
+
+def reconstruir(db: Session, lote: int = PLANES_POR_LOTE) -> int:
+    """
+    Recalcula todo el volumen por rangos de ids de plan, con un commit por rango
+    (transacciones cortas aunque el historial sea grande); devuelve las filas
+    """
+    dialecto = db.get_bind().dialect.name
+    minimo, maximo = db.execute(select(func.min(models.PlanSemanal.id), func.max(models.PlanSemanal.id))).one()
+    if minimo is not None:
+        db.execute(delete(models.VolumenSemanal).where(
+            ~exists().where(models.PlanSemanal.id == models.VolumenSemanal.plan_semanal_id)
+        ))
+        for desde in range(minimo, maximo + 1, lote):
+            planes = select(models.PlanSemanal.id).where(models.PlanSemanal.id.between(desde, desde + lote - 1))
+            db.execute(borrar_volumen_sobrante(planes))
+            db.execute(refrescar_volumen(dialecto, planes))
+            db.commit()
+    return db.scalar(select(func.count()).select_from(models.VolumenSemanal))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantenimiento del volumen semanal por ejercicio")
+    parser.add_argument("accion", choices=["verificar", "reconstruir"])
+    parser.add_argument("--lote", type=int, default=PLANES_POR_LOTE, help="Planes por transacción al reconstruir")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.accion == "verificar":
+            inconsistentes = verificar(db)
+            print(f"Filas de volumen inconsistentes: {len(inconsistentes)}")
+            if inconsistentes:
+                print(", ".join(f"{plan_id}/{catalogo_id}" for plan_id, catalogo_id in inconsistentes[:50]))
+                raise SystemExit(1)
+        else:
+            print(f"Filas de volumen reconstruidas: {reconstruir(db, args.lote)}")
@@ -0,0 +1,242 @@
+"""
+Worker del rollover semanal: crea la semana siguiente a los clientes cuyo último plan ya terminó
+
+Cada pasada toma la semana (lunes a domingo) que contiene la fecha de hoy; son
+pendientes los clientes activos cuyo último plan termina antes de ese lunes.
+Las progresiones salen de reglas_progresion (por cliente y ejercicio del
+catálogo). Los clientes se recorren por lotes en orden de id; cada lote
+escribe planes, ejercicios y el progreso de la ejecución en una transacción,
+así que si el proceso se corta la siguiente pasada continúa donde quedó. Una
+vez completada, cada pasada vuelve a empezar por el menor id para recoger a
+los clientes que pasaron a pendientes después (altas, reactivados).
+
+Uso (proceso aparte, ver Procfile):
+    python -m app.worker [--intervalo 900] [--lote 500] [--procesos 4]
+    python -m app.worker --una-vez [--fecha-inicio 2026-10-19]   # una pasada (cron)
+"""
+import argparse
+import math
+import time
+import traceback
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import date, timedelta
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+from app.cache import cache_plan_activo
+from app.cohortes import generar_semana_siguiente
+from app.database import SessionLocal
+from app.motor_progresiones import aplicar_progresiones_cohorte
+from app.plan_actual import refrescar_plan_actual
+from app import models
+
+CLIENTES_POR_LOTE = 500
+
+def semana_objetivo(hoy: date) -> Tuple[date, date]:
+    lunes = hoy - timedelta(days=hoy.weekday())
+    return lunes, lunes + timedelta(days=6)
+
+def _clientes_pendientes(fecha_inicio: date, despues_de: int = 0):
+    """Clientes activos (id > despues_de) cuyo último plan termina antes de fecha_inicio"""
+    con_plan_vencido = select(
+        models.PlanSemanal.cliente_id
+    ).group_by(
+        models.PlanSemanal.cliente_id
+    ).having(
+        func.max(models.PlanSemanal.fecha_fin) < fecha_inicio
+    )
+    return select(models.Cliente.id).where(
+        models.Cliente.activo == True,
+        models.Cliente.id > despues_de,
+        models.Cliente.id.in_(con_plan_vencido)
+    ).order_by(models.Cliente.id)
+
+def motor_en_procesos(pool: Optional[Executor], procesos: int) -> Callable[..., List[List[int]]]:
+    """
+    aplicar_progresiones_cohorte con las filas de cada lote repartidas en un
+    trozo por proceso del pool. El cálculo es puro (listas y reglas entran y
+    salen por pickle); sin pool se calcula en el proceso actual
+    """
+    def calcular(configs, reglas, regla_por_fila):
+        if pool is None or procesos <= 1 or len(configs) <= 1:
+            return aplicar_progresiones_cohorte(configs, reglas, regla_por_fila)
+        filas_por_tarea = math.ceil(len(configs) / procesos)
+        inicios = range(0, len(configs), filas_por_tarea)
+        trozos = pool.map(
+            aplicar_progresiones_cohorte,
+            [configs[i:i + filas_por_tarea] for i in inicios],
+            [reglas] * len(inicios),
+            [regla_por_fila[i:i + filas_por_tarea] for i in inicios]
+        )
+        return [config for trozo in trozos for config in trozo]
+    return calcular
+
+def _reglas_de(db: Session, cliente_ids: List[int]) -> dict:
+    return {
+        (regla.cliente_id, regla.ejercicio_catalogo_id): (regla.tipos_progresion, regla.valores)
+        for regla in db.scalars(
+            select(models.ReglaProgresionCliente).where(models.ReglaProgresionCliente.cliente_id.in_(cliente_ids))
+        )
+    }
+
+def obtener_ejecucion(db: Session, fecha_inicio: date, fecha_fin: date) -> models.EjecucionRollover:
+    """La ejecución de la semana (se crea con el total de pendientes la primera vez)"""
+    ejecucion = db.scalar(
+        select(models.EjecucionRollover).where(models.EjecucionRollover.fecha_inicio == fecha_inicio)
+    )
+    if ejecucion is None:
+        ejecucion = models.EjecucionRollover(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            estado="en_curso",
+            total_clientes=db.scalar(select(func.count()).select_from(_clientes_pendientes(fecha_inicio).subquery())),
+            clientes_fallidos=[]
+        )
+        db.add(ejecucion)
+        db.commit()
+    return ejecucion
+
+def _generar_lote(
+    db: Session,
+    ejecucion: models.EjecucionRollover,
+    cliente_ids: List[int],
+    calcular,
+    informar: Callable[[str], None]
+) -> Tuple[int, int, List[int], List[int]]:
+    """Planes y ejercicios creados, clientes con plan nuevo y clientes fallidos del lote"""
+    reglas = _reglas_de(db, cliente_ids)
+    try:
+        with db.begin_nested():
+            resumen, clientes = generar_semana_siguiente(
+                db, ejecucion.fecha_inicio, ejecucion.fecha_fin, [], cliente_ids, reglas, calcular
+            )
+        return resumen.planes_creados, resumen.ejercicios_creados, clientes, []
+    except (OperationalError, InterfaceError):
+        # Conexión o DB caída: la pasada se corta y la siguiente reanuda desde el último lote
+        raise
+    except Exception as error:
+        informar(
+            f"Rollover {ejecucion.fecha_inicio}: lote {cliente_ids[0]}-{cliente_ids[-1]} fallido: {error!r}; "
+            "se genera cliente por cliente"
+        )
+
+    # Algún cliente no se puede generar (p. ej. una regla que el motor no sabe
+    # aplicar): uno por uno, para que ese cliente no frene al resto del lote
+    planes = ejercicios = 0
+    con_plan, fallidos = [], []
+    for cliente_id in cliente_ids:
+        try:
+            with db.begin_nested():
+                resumen, clientes = generar_semana_siguiente(
+                    db, ejecucion.fecha_inicio, ejecucion.fecha_fin, [], [cliente_id], reglas, calcular
+                )
+        except (OperationalError, InterfaceError):
+            raise
+        except Exception as error:
+            informar(f"Rollover {ejecucion.fecha_inicio}: cliente {cliente_id} fallido: {error!r}")
+            fallidos.append(cliente_id)
+            continue
+        planes += resumen.planes_creados
+        ejercicios += resumen.ejercicios_creados
+        con_plan += clientes
+    return planes, ejercicios, con_plan, fallidos
+
+def ejecutar_rollover(
+    db: Session,
+    fecha_inicio: date,
+    fecha_fin: date,
+    lote: int = CLIENTES_POR_LOTE,
+    calcular: Callable[..., List[List[int]]] = aplicar_progresiones_cohorte,
+    informar: Callable[[str], None] = print
+) -> models.EjecucionRollover:
+    """Crea (o reanuda) la ejecución de la semana y la lleva hasta el final, lote a lote"""
+    ejecucion = obtener_ejecucion(db, fecha_inicio, fecha_fin)
+    # Completada: otra vuelta desde el principio, un cliente que pasó a pendiente
+    # después puede tener un id menor que el último procesado
+    desde = 0 if ejecucion.estado == "completada" else ejecucion.ultimo_cliente_id
+
+    while True:
+        pendientes = _clientes_pendientes(fecha_inicio, desde)
+        if ejecucion.clientes_fallidos:
+            # Los fallidos no se reintentan en cada pasada
+            pendientes = pendientes.where(models.Cliente.id.not_in(ejecucion.clientes_fallidos))
+        cliente_ids = list(db.scalars(pendientes.limit(lote)))
+        if not cliente_ids:
+            break
+        if ejecucion.estado != "en_curso":
+            if ejecucion.estado == "completada":
+                ejecucion.total_clientes = ejecucion.clientes_procesados + db.scalar(
+                    select(func.count()).select_from(pendientes.subquery())
+                )
+            # Reanudación tras un fallo o clientes nuevos tras completarla
+            ejecucion.estado = "en_curso"
+            ejecucion.error = None
+
+        planes, ejercicios, con_plan, fallidos = _generar_lote(db, ejecucion, cliente_ids, calcular, informar)
+        if con_plan:
+            # El plan nuevo puede ser ya el vigente
+            db.execute(refrescar_plan_actual(con_plan))
+
+        # El progreso se guarda en la misma transacción que los planes del lote
+        desde = ejecucion.ultimo_cliente_id = cliente_ids[-1]
+        ejecucion.clientes_procesados += len(cliente_ids)
+        ejecucion.planes_creados += planes
+        ejecucion.ejercicios_creados += ejercicios
+        if fallidos:
+            ejecucion.clientes_fallidos = ejecucion.clientes_fallidos + fallidos
+        db.commit()
+
+        # Solo llega a la web con un backend compartido (CACHE_PLAN_BACKEND=redis). Con
+        # el de memoria no hace falta: un cliente pendiente no tiene plan que cubra la
+        # semana nueva, y la cache solo sirve planes vigentes hoy (el resto expira por TTL)
+        for cliente_id in con_plan:
+            cache_plan_activo.invalidar(cliente_id)
+        informar(
+            f"Rollover {fecha_inicio}: {ejecucion.clientes_procesados}/{ejecucion.total_clientes} clientes, "
+            f"{ejecucion.planes_creados} planes, {len(ejecucion.clientes_fallidos)} fallidos"
+        )
+
+    if ejecucion.estado != "completada":
+        ejecucion.estado = "completada"
+        ejecucion.terminada_en = func.now()
+        db.commit()
+    return ejecucion
+
+def _pasada(fecha_inicio: date, fecha_fin: date, lote: int, calcular) -> None:
+    with SessionLocal() as db:
+        try:
+            ejecutar_rollover(db, fecha_inicio, fecha_fin, lote, calcular, informar=lambda texto: print(texto, flush=True))
+        except Exception:
+            # Queda 'fallida' con el error; la siguiente pasada la reanuda desde el último lote guardado
+            db.rollback()
+            error = traceback.format_exc()
+            print(error, flush=True)
+            ejecucion = db.scalar(
+                select(models.EjecucionRollover).where(models.EjecucionRollover.fecha_inicio == fecha_inicio)
+            )
+            if ejecucion is not None:
+                ejecucion.estado = "fallida"
+                ejecucion.error = error
+                db.commit()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker del rollover semanal de planes")
+    parser.add_argument("--una-vez", action="store_true", help="Una sola pasada y salir (para cron)")
+    parser.add_argument("--intervalo", type=int, default=900, help="Segundos entre pasadas")
+    parser.add_argument("--fecha-inicio", type=date.fromisoformat, help="Lunes de la semana a generar (por defecto la actual)")
+    parser.add_argument("--lote", type=int, default=CLIENTES_POR_LOTE, help="Clientes por transacción")
+    parser.add_argument("--procesos", type=int, default=0, help="Procesos para calcular progresiones (0 = en este proceso)")
+    args = parser.parse_args()
+
+    # El pool se crea antes de abrir conexiones: los procesos hijos no heredan ninguna
+    with (ProcessPoolExecutor(args.procesos) if args.procesos > 1 else nullcontext()) as pool:
+        calcular = motor_en_procesos(pool, args.procesos)
+        while True:
+            fecha_inicio, fecha_fin = semana_objetivo(args.fecha_inicio or date.today())
+            _pasada(fecha_inicio, fecha_fin, args.lote, calcular)
+            if args.una_vez:
+                break
+            time.sleep(args.intervalo)
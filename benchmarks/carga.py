@@ -0,0 +1,226 @@
+"""
+Prueba de carga de la API con httpx; informa p50/p95/p99 y throughput en JSON
+
+Por defecto ejecuta la app en el mismo proceso (ASGITransport), así que basta
+con DATABASE_URL apuntando a una base sembrada con benchmarks.sembrar. Con
+--url se mide un servidor ya levantado (uvicorn/gunicorn).
+
+Uso:
+    python -m benchmarks.carga [--url http://localhost:8000] [--concurrencia 32] [--peticiones 5000]
+        [--mezcla plan-actual=50,completar=20,estadisticas=15,planes=10,progresiones=5] [--salida resultado.json]
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+import httpx
+
+MEZCLA_POR_DEFECTO = "plan-actual=50,completar=20,estadisticas=15,planes=10,progresiones=5"
+
+def percentil(valores: List[float], p: float) -> Optional[float]:
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not valores:
+        return None
+    indice = max(int(round(p / 100 * len(valores) + 0.5)) - 1, 0)
+    return valores[min(indice, len(valores) - 1)]
+
+class Escenarios:
+    """
+    Operaciones medidas contra la API. Los datos auxiliares (ejercicios del
+    plan activo, última semana) se consultan una vez por cliente fuera de la medición
+    """
+
+    def __init__(self, cliente: httpx.AsyncClient, cliente_ids: List[int], rng: random.Random):
+        self.http = cliente
+        self.cliente_ids = cliente_ids
+        self.rng = rng
+        self._ejercicios: Dict[int, List[int]] = {}
+        # Cada cliente recibe a lo sumo una progresión por ejecución
+        self._sin_progresion = list(cliente_ids)
+        rng.shuffle(self._sin_progresion)
+
+    def _cliente(self) -> int:
+        return self.rng.choice(self.cliente_ids)
+
+    async def _medir(self, metodo: str, url: str, **kwargs):
+        inicio = time.perf_counter()
+        respuesta = await self.http.request(metodo, url, **kwargs)
+        return time.perf_counter() - inicio, respuesta.status_code < 400
+
+    async def plan_actual(self):
+        return await self._medir("GET", f"/api/mobile/cliente/{self._cliente()}/plan-actual")
+
+    async def estadisticas(self):
+        return await self._medir("GET", f"/api/mobile/cliente/{self._cliente()}/estadisticas")
+
+    async def planes(self):
+        return await self._medir("GET", f"/api/admin/cliente/{self._cliente()}/planes", params={"limit": 4})
+
+    async def completar(self):
+        cliente_id = self._cliente()
+        if cliente_id not in self._ejercicios:
+            plan = (await self.http.get(f"/api/mobile/cliente/{cliente_id}/plan-actual")).json()
+            self._ejercicios[cliente_id] = [e["id"] for e in plan.get("ejercicios", [])]
+        if not self._ejercicios[cliente_id]:
+            return await self.plan_actual()
+
+        reps = self.rng.choice((8, 10, 12))
+        return await self._medir("POST", "/api/mobile/ejercicio/completar", json={
+            "ejercicio_plan_id": self.rng.choice(self._ejercicios[cliente_id]),
+            "series_completadas": [
+                {"serie": i, "reps_objetivo": reps, "reps_realizadas": reps, "completada": True} for i in range(1, 4)
+            ],
+            "tiempo_ejercicio_real_segundos": self.rng.randint(40, 90),
+            "tiempo_descanso_real_segundos": self.rng.randint(60, 120),
+            "completado_totalmente": True
+        })
+
+    async def progresiones(self):
+        if not self._sin_progresion:
+            return await self.planes()
+        cliente_id = self._sin_progresion.pop()
+        ultimo = (await self.http.get(
+            f"/api/admin/cliente/{cliente_id}/planes", params={"limit": 1, "solo_encabezados": True}
+        )).json()
+        if not ultimo:
+            return await self.planes()
+
+        inicio = date.fromisoformat(ultimo[0]["fecha_inicio"]) + timedelta(days=7)
+        return await self._medir("POST", "/api/progresiones/crear-plan-con-progresiones", json={
+            "cliente_id": cliente_id,
+            "semana_anterior": ultimo[0]["numero_semana"],
+            "fecha_inicio": str(inicio),
+            "fecha_fin": str(inicio + timedelta(days=6)),
+            "progresiones": []
+        })
+
+ESCENARIOS = {
+    "plan-actual": Escenarios.plan_actual,
+    "completar": Escenarios.completar,
+    "estadisticas": Escenarios.estadisticas,
+    "planes": Escenarios.planes,
+    "progresiones": Escenarios.progresiones,
+}
+
+def _parsear_mezcla(texto: str) -> Dict[str, int]:
+    mezcla = {}
+    for parte in texto.split(","):
+        nombre, peso = parte.split("=")
+        if nombre not in ESCENARIOS:
+            raise SystemExit(f"Escenario desconocido: {nombre} (opciones: {', '.join(ESCENARIOS)})")
+        mezcla[nombre] = int(peso)
+    return mezcla
+
+async def _obtener_clientes(http: httpx.AsyncClient, maximo: int) -> List[int]:
+    ids, cursor = [], None
+    while len(ids) < maximo:
+        params = {"limit": min(500, maximo - len(ids))}
+        if cursor:
+            params["cursor"] = cursor
+        respuesta = await http.get("/api/admin/clientes", params=params)
+        ids += [cliente["id"] for cliente in respuesta.json()]
+        cursor = respuesta.headers.get("X-Siguiente-Cursor")
+        if not cursor:
+            break
+    return ids
+
+def _crear_cliente_http(url: Optional[str], concurrencia: int) -> httpx.AsyncClient:
+    limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+    if url:
+        return httpx.AsyncClient(base_url=url, limits=limites, timeout=60)
+    from app.main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+async def ejecutar(args) -> dict:
+    mezcla = _parsear_mezcla(args.mezcla)
+    rng = random.Random(args.semilla)
+    nombres = list(mezcla)
+    pesos = [mezcla[nombre] for nombre in nombres]
+    plan = [rng.choices(nombres, pesos)[0] for _ in range(args.peticiones)]
+
+    async with _crear_cliente_http(args.url, args.concurrencia) as http:
+        cliente_ids = await _obtener_clientes(http, args.clientes)
+        if not cliente_ids:
+            raise SystemExit("No hay clientes: siembra antes con python -m benchmarks.sembrar")
+        escenarios = Escenarios(http, cliente_ids, rng)
+
+        latencias: Dict[str, List[float]] = {nombre: [] for nombre in mezcla}
+        errores: Dict[str, int] = {nombre: 0 for nombre in mezcla}
+        pendientes = iter(plan)
+
+        async def trabajador():
+            for nombre in pendientes:
+                duracion, ok = await ESCENARIOS[nombre](escenarios)
+                latencias[nombre].append(duracion)
+                if not ok:
+                    errores[nombre] += 1
+
+        # Calentamiento: no se mide (primeras conexiones, caches)
+        for nombre in nombres[:1] * min(args.calentamiento, len(cliente_ids)):
+            await ESCENARIOS[nombre](escenarios)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajador() for _ in range(args.concurrencia)))
+        total_segundos = time.perf_counter() - inicio
+
+    if not args.url:
+        from app import database
+        if database.async_engine is not None:
+            # Cerrar las conexiones async (aiosqlite mantiene hilos vivos)
+            await database.async_engine.dispose()
+
+    def resumen(valores: List[float], fallos: int, segundos: float) -> dict:
+        ordenados = sorted(valores)
+        ms = lambda v: round(v * 1000, 2) if v is not None else None
+        return {
+            "peticiones": len(ordenados),
+            "errores": fallos,
+            "p50_ms": ms(percentil(ordenados, 50)),
+            "p95_ms": ms(percentil(ordenados, 95)),
+            "p99_ms": ms(percentil(ordenados, 99)),
+            "max_ms": ms(ordenados[-1] if ordenados else None),
+            "throughput_rps": round(len(ordenados) / segundos, 1) if segundos else None
+        }
+
+    todas = [v for valores in latencias.values() for v in valores]
+    return {
+        "configuracion": {
+            "destino": args.url or "in-process",
+            "concurrencia": args.concurrencia,
+            "peticiones": args.peticiones,
+            "mezcla": mezcla,
+            "clientes": len(cliente_ids),
+            "semilla": args.semilla,
+            "python": platform.python_version()
+        },
+        "total": resumen(todas, sum(errores.values()), total_segundos),
+        "escenarios": {
+            nombre: resumen(latencias[nombre], errores[nombre], total_segundos) for nombre in mezcla
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API")
+    parser.add_argument("--url", help="Servidor a medir (por defecto, la app en el mismo proceso)")
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--mezcla", default=MEZCLA_POR_DEFECTO, help="escenario=peso separados por comas")
+    parser.add_argument("--clientes", type=int, default=1000, help="Clientes sobre los que repartir la carga")
+    parser.add_argument("--calentamiento", type=int, default=20, help="Peticiones previas sin medir")
+    parser.add_argument("--semilla", type=int, default=23)
+    parser.add_argument("--salida", help="Guardar el JSON en este archivo además de imprimirlo")
+    args = parser.parse_args()
+
+    resultado = asyncio.run(ejecutar(args))
+    texto = json.dumps(resultado, indent=2)
+    print(texto)
+    if args.salida:
+        with open(args.salida, "w") as archivo:
+            archivo.write(texto + "\n")
+
+if __name__ == "__main__":
+    main()
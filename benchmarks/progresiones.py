@@ -0,0 +1,90 @@
+"""
+Compara el motor vectorizado de progresiones con aplicar_multiples_progresiones
+
+Antes de medir verifica con entradas aleatorias (incluye listas vacías, de
+una y dos series y valores negativos) que ambos caminos dan lo mismo.
+
+Uso:
+    python -m benchmarks.progresiones [--ejercicios 20000] [--casos 5000] [--repeticiones 5]
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.motor_progresiones import ORDEN_APLICACION, aplicar_progresiones_cohorte
+from app.routers.progresiones import aplicar_multiples_progresiones
+
+def _regla_aleatoria(rng: random.Random):
+    tipos = rng.sample(ORDEN_APLICACION, rng.randint(0, len(ORDEN_APLICACION)))
+    valores = {tipo: rng.randint(-2, 4) for tipo in tipos if rng.random() < 0.9}
+    return tipos, valores
+
+def _cohorte_aleatoria(rng: random.Random, ejercicios: int, num_reglas: int = 40):
+    """Configs, tabla de reglas (una por ejercicio del catálogo) y regla de cada fila"""
+    reglas = [_regla_aleatoria(rng) for _ in range(num_reglas)]
+    configs, regla_por_fila = [], []
+    for _ in range(ejercicios):
+        config = [rng.randint(1, 20) for _ in range(rng.choice([0, 1, 2, 3, 3, 4, 4, 5, 6, 8]))]
+        regla = rng.randrange(-1, num_reglas)
+        if not config and regla >= 0 and 'ondulante_series' in reglas[regla][0]:
+            regla = -1  # La función por lista falla con una lista vacía
+        configs.append(config)
+        regla_por_fila.append(regla)
+    return configs, reglas, regla_por_fila
+
+def _por_lista(configs, reglas, regla_por_fila):
+    return [
+        aplicar_multiples_progresiones(config, *reglas[regla]) if regla >= 0 else config.copy()
+        for config, regla in zip(configs, regla_por_fila)
+    ]
+
+def verificar_equivalencia(casos: int, semilla: int) -> None:
+    rng = random.Random(semilla)
+    verificados = 0
+    while verificados < casos:
+        # Cohortes de todos los tamaños: las chicas pueden no tener ninguna fila de 3 o más series
+        configs, reglas, regla_por_fila = _cohorte_aleatoria(rng, rng.choice([1, 2, 3, 5, 20, 500]))
+        verificados += len(configs)
+        esperado = _por_lista(configs, reglas, regla_por_fila)
+        obtenido = aplicar_progresiones_cohorte(configs, reglas, regla_por_fila)
+        for config, regla, a, b in zip(configs, regla_por_fila, esperado, obtenido):
+            if a != b:
+                raise AssertionError(f"Diferencia para {config} con {reglas[regla]}: {a} != {b}")
+
+def _medir(fn, repeticiones: int) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ejercicios", type=int, default=20000, help="Ejercicios de la cohorte (p. ej. 500 clientes x 40)")
+    parser.add_argument("--casos", type=int, default=5000, help="Entradas aleatorias de la verificación")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--semilla", type=int, default=23)
+    args = parser.parse_args()
+
+    verificar_equivalencia(args.casos, args.semilla)
+
+    cohorte = _cohorte_aleatoria(random.Random(args.semilla + 1), args.ejercicios)
+
+    por_lista = _medir(lambda: _por_lista(*cohorte), args.repeticiones)
+    vectorizado = _medir(lambda: aplicar_progresiones_cohorte(*cohorte), args.repeticiones)
+
+    print(json.dumps({
+        "ejercicios": args.ejercicios,
+        "casos_verificados": args.casos,
+        "por_lista_ms": round(por_lista * 1000, 2),
+        "vectorizado_ms": round(vectorizado * 1000, 2),
+        "aceleracion": round(por_lista / vectorizado, 2)
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Siembra un gimnasio sintético en la base de DATABASE_URL (PostgreSQL o SQLite)
+
+N clientes × W semanas × E ejercicios por plan, con una fracción de
+ejercicios completados. La última semana es la actual (plan activo), así que
+plan-actual, completar y estadisticas tienen datos reales con los que trabajar.
+
+Las filas se generan por lotes de clientes y se envían sin pasar por el ORM:
+COPY FROM STDIN en PostgreSQL (el CSV se produce a medida que el servidor lo
+lee) y executemany en SQLite. La memoria depende de --lote, no del total.
+
+Uso:
+    python -m benchmarks.sembrar --clientes 1000 --semanas 8 --ejercicios 6 [--completados 0.7] [--reiniciar]
+    python -m benchmarks.sembrar --clientes 25000 --semanas 8 --ejercicios 8 --lote 2000   # ~1M completados
+"""
+import argparse
+import csv
+import io
+import json
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, Sequence
+from sqlalchemy import func, select, text
+from app.database import Base, SessionLocal, engine
+from app.plan_actual import refrescar_plan_actual
+from app.resumenes import refrescar_resumenes
+from app.volumen import refrescar_volumen
+from app import models
+
+CLIENTES_POR_LOTE = 1000
+
+# Orden de columnas de las tuplas que genera filas_cliente
+COLUMNAS = {
+    "clientes": ("id", "nombre", "email", "activo"),
+    "planes_semanales": ("id", "cliente_id", "numero_semana", "fecha_inicio", "fecha_fin", "notas"),
+    "ejercicios_plan": (
+        "id", "plan_semanal_id", "ejercicio_catalogo_id", "orden", "series_config",
+        "tiempo_ejercicio_segundos", "tiempo_descanso_segundos", "tipo_progresion", "valor_progresion"
+    ),
+    "ejercicios_completados": (
+        "id", "ejercicio_plan_id", "series_completadas", "tiempo_ejercicio_real_segundos",
+        "tiempo_descanso_real_segundos", "completado_totalmente", "fecha_completado", "created_at"
+    ),
+}
+
+class _FlujoCsv(io.RawIOBase):
+    """Archivo de solo lectura que produce CSV bajo demanda (para copy_expert)"""
+
+    def __init__(self, filas: Iterable[Sequence]):
+        self._filas = iter(filas)
+        self._buffer = io.StringIO()
+        self._escritor = csv.writer(self._buffer, lineterminator="\n")
+        self._pendiente = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, tamano: int = -1) -> bytes:
+        while tamano < 0 or len(self._pendiente) < tamano:
+            # Unas cientos de filas por vuelta: menos llamadas a csv sin crecer en memoria
+            self._buffer.seek(0)
+            self._buffer.truncate()
+            for _, fila in zip(range(500), self._filas):
+                self._escritor.writerow(fila)
+            bloque = self._buffer.getvalue()
+            if not bloque:
+                break
+            self._pendiente += bloque.encode()
+        if tamano < 0:
+            tamano = len(self._pendiente)
+        resultado, self._pendiente = self._pendiente[:tamano], self._pendiente[tamano:]
+        return resultado
+
+class Escritor:
+    """Envía tuplas en el orden de COLUMNAS; COPY en PostgreSQL y executemany en el resto"""
+
+    def __init__(self, db):
+        self.db = db
+        dialecto = db.get_bind().dialect
+        self.copy = dialecto.name == "postgresql"
+        self.marcador = "?" if dialecto.paramstyle == "qmark" else "%s"
+
+    def escribir(self, tabla: str, filas: Sequence[Sequence]) -> None:
+        if not filas:
+            return
+        columnas = COLUMNAS[tabla]
+        # La conexión de la sesión cambia tras cada commit
+        conexion = self.db.connection()
+        if self.copy:
+            cursor = conexion.connection.dbapi_connection.cursor()
+            try:
+                cursor.copy_expert(
+                    f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)", _FlujoCsv(filas)
+                )
+            finally:
+                cursor.close()
+        else:
+            marcadores = ", ".join([self.marcador] * len(columnas))
+            conexion.exec_driver_sql(
+                f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({marcadores})", list(filas)
+            )
+
+def _siguiente_id(db, modelo) -> int:
+    return (db.scalar(select(func.max(modelo.id))) or 0) + 1
+
+def _asegurar_catalogo(db, cantidad: int) -> list:
+    """Ids de `cantidad` ejercicios del catálogo, creando los que falten"""
+    ids = list(db.scalars(select(models.EjercicioCatalogo.id).order_by(models.EjercicioCatalogo.id).limit(cantidad)))
+    faltan = cantidad - len(ids)
+    if faltan > 0:
+        inicio = _siguiente_id(db, models.EjercicioCatalogo)
+        db.execute(models.EjercicioCatalogo.__table__.insert(), [
+            {"id": inicio + i, "nombre": f"Ejercicio sintético {inicio + i}", "grupo_muscular": "general"}
+            for i in range(faltan)
+        ])
+        ids += list(range(inicio, inicio + faltan))
+    return ids
+
+def filas_cliente(rng: random.Random, ids: dict, cliente_id: int, catalogo: list, args, lunes: date) -> Iterator[tuple]:
+    """
+    (tabla, tupla) de todos los planes, ejercicios y completados de un cliente
+    `ids` lleva el siguiente id de cada tabla. Fechas y JSON van ya como texto
+    para que valgan tanto para COPY como para executemany
+    """
+    elegidos = rng.sample(catalogo, args.ejercicios)
+    configs = [[rng.choice((8, 10, 12))] * rng.choice((3, 4)) for _ in elegidos]
+
+    for semana in range(1, args.semanas + 1):
+        inicio = lunes - timedelta(days=7 * (args.semanas - semana))
+        actual = semana == args.semanas
+        plan_id = ids["planes_semanales"]
+        ids["planes_semanales"] += 1
+        yield "planes_semanales", (
+            plan_id, cliente_id, semana, inicio.isoformat(), (inicio + timedelta(days=6)).isoformat(), "Plan sintético"
+        )
+
+        for orden, (catalogo_id, config) in enumerate(zip(elegidos, configs), start=1):
+            ejercicio_id = ids["ejercicios_plan"]
+            ids["ejercicios_plan"] += 1
+            yield "ejercicios_plan", (
+                ejercicio_id, plan_id, catalogo_id, orden, json.dumps(config), 60, 90,
+                "lineal_reps" if semana > 1 else "ninguna", 1 if semana > 1 else 0
+            )
+
+            # La semana actual va a medias
+            if rng.random() < (args.completados / 2 if actual else args.completados):
+                realizadas = [max(reps - rng.choice((0, 0, 0, 1, 2)), 0) for reps in config]
+                fecha = (
+                    datetime.combine(inicio + timedelta(days=rng.randrange(7 if not actual else 1)), datetime.min.time())
+                    + timedelta(hours=rng.randrange(6, 22))
+                ).isoformat(" ")
+                yield "ejercicios_completados", (
+                    ids["ejercicios_completados"], ejercicio_id,
+                    json.dumps([
+                        {"serie": i, "reps_objetivo": reps, "reps_realizadas": hechas, "completada": hechas >= reps}
+                        for i, (reps, hechas) in enumerate(zip(config, realizadas), start=1)
+                    ]),
+                    rng.randint(40, 90), rng.randint(60, 120), realizadas == config, fecha, fecha
+                )
+                ids["ejercicios_completados"] += 1
+
+        # Progresión lineal de reps para la semana siguiente
+        configs = [[reps + 1 for reps in config] for config in configs]
+
+def _ajustar_secuencias(db) -> None:
+    """Con ids explícitos, las secuencias de PostgreSQL deben avanzar hasta el máximo"""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for modelo in (models.EjercicioCatalogo, models.Cliente, models.PlanSemanal, models.EjercicioPlan, models.EjercicioCompletado):
+        tabla = modelo.__tablename__
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), COALESCE((SELECT MAX(id) FROM {tabla}), 1))"
+        ))
+
+def sembrar(args) -> dict:
+    if args.reiniciar:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    rng = random.Random(args.semilla)
+    hoy = date.today()
+    lunes = hoy - timedelta(days=hoy.weekday())
+    totales = {tabla: 0 for tabla in COLUMNAS}
+    inicio = time.perf_counter()
+
+    with SessionLocal() as db:
+        catalogo = _asegurar_catalogo(db, max(args.ejercicios, 20))
+        ids = {
+            "clientes": _siguiente_id(db, models.Cliente),
+            "planes_semanales": _siguiente_id(db, models.PlanSemanal),
+            "ejercicios_plan": _siguiente_id(db, models.EjercicioPlan),
+            "ejercicios_completados": _siguiente_id(db, models.EjercicioCompletado)
+        }
+        primer_plan = ids["planes_semanales"]
+        escritor = Escritor(db)
+
+        restantes = args.clientes
+        while restantes > 0:
+            lote = min(restantes, args.lote)
+            filas = {tabla: [] for tabla in COLUMNAS}
+            primer_plan_lote = ids["planes_semanales"]
+            for cliente_id in range(ids["clientes"], ids["clientes"] + lote):
+                filas["clientes"].append((cliente_id, f"Cliente {cliente_id}", f"cliente{cliente_id}@gym.test", True))
+                for tabla, fila in filas_cliente(rng, ids, cliente_id, catalogo, args, lunes):
+                    filas[tabla].append(fila)
+            ids["clientes"] += lote
+
+            # Orden de las claves foráneas
+            for tabla, nuevas in filas.items():
+                escritor.escribir(tabla, nuevas)
+                totales[tabla] += len(nuevas)
+            db.execute(refrescar_volumen(
+                db.get_bind().dialect.name,
+                select(models.PlanSemanal.id).where(models.PlanSemanal.id >= primer_plan_lote)
+            ))
+            db.execute(refrescar_plan_actual(
+                select(models.Cliente.id).where(models.Cliente.id >= ids["clientes"] - lote)
+            ))
+            db.commit()
+            restantes -= lote
+            print(f"{args.clientes - restantes}/{args.clientes} clientes, "
+                  f"{totales['ejercicios_completados']} completados", file=sys.stderr)
+
+        _ajustar_secuencias(db)
+        db.execute(refrescar_resumenes(
+            db.get_bind().dialect.name, select(models.PlanSemanal.id).where(models.PlanSemanal.id >= primer_plan)
+        ))
+        db.commit()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "clientes": totales["clientes"],
+        "planes": totales["planes_semanales"],
+        "ejercicios": totales["ejercicios_plan"],
+        "completados": totales["ejercicios_completados"],
+        "segundos": round(segundos, 2),
+        "filas_por_segundo": round(sum(totales.values()) / segundos) if segundos else None
+    }
+
+def parser_argumentos() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Siembra un gimnasio sintético para benchmarks")
+    parser.add_argument("--clientes", type=int, default=1000)
+    parser.add_argument("--semanas", type=int, default=8)
+    parser.add_argument("--ejercicios", type=int, default=6, help="Ejercicios por plan")
+    parser.add_argument("--completados", type=float, default=0.7, help="Fracción de ejercicios completados en semanas pasadas")
+    parser.add_argument("--lote", type=int, default=CLIENTES_POR_LOTE, help="Clientes por lote (acota la memoria)")
+    parser.add_argument("--semilla", type=int, default=23)
+    parser.add_argument("--reiniciar", action="store_true", help="Borra y recrea todas las tablas antes de sembrar")
+    return parser
+
+if __name__ == "__main__":
+    print(json.dumps(sembrar(parser_argumentos().parse_args()), indent=2))
@@ -0,0 +1,150 @@
+"""
+Compara la serialización del plan activo móvil: dicts re-validados por FastAPI vs modelos tipados + orjson
+
+El camino anterior armaba los ejercicios como dicts, FastAPI los validaba otra
+vez contra response_model, pasaba por jsonable_encoder y json.dumps. El nuevo
+construye EjercicioMovil desde las filas y devuelve RespuestaORJSON. También
+mide el acierto de cache (payload ya en dict): re-validar vs solo orjson.
+
+Uso:
+    python -m benchmarks.serializacion [--planes 2000] [--ejercicios 8] [--repeticiones 5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from app.respuestas import RespuestaORJSON
+from app import schemas
+
+# Forma de las filas de la consulta de plan-actual
+Fila = namedtuple("Fila", [
+    "plan_id", "numero_semana", "fecha_inicio", "fecha_fin", "ejercicio_id", "ejercicio_nombre",
+    "orden", "series_config", "tiempo_ejercicio_segundos", "tiempo_descanso_segundos",
+    "notas_ejercicio", "completado_id", "series_completadas",
+])
+
+class _PlanMovilAnterior(schemas.PlanSemanalMovil):
+    ejercicios: List[dict]
+
+CAMPO_ANTERIOR = create_model_field(name="respuesta", type_=_PlanMovilAnterior, mode="serialization")
+
+def _planes_aleatorios(rng: random.Random, planes: int, ejercicios: int):
+    resultado = []
+    for plan_id in range(1, planes + 1):
+        inicio = date(2025, 1, 6) + timedelta(weeks=rng.randint(0, 100))
+        filas = []
+        for orden in range(1, ejercicios + 1):
+            config = [rng.randint(6, 15) for _ in range(rng.randint(3, 5))]
+            completado = rng.random() < 0.5
+            series = [
+                {"serie": i + 1, "reps_objetivo": reps, "reps_realizadas": reps - rng.randint(0, 2), "completada": True}
+                for i, reps in enumerate(config)
+            ] if completado else None
+            filas.append(Fila(
+                plan_id, rng.randint(1, 52), inicio, inicio + timedelta(days=6), plan_id * 100 + orden,
+                f"Ejercicio {rng.randint(1, 60)}", orden, config, 60, 90,
+                "Controlar la bajada" if rng.random() < 0.3 else None,
+                orden if completado else None, series,
+            ))
+        resultado.append(filas)
+    return resultado
+
+def _ejercicio_dict(fila):
+    return {
+        "id": fila.ejercicio_id,
+        "nombre": fila.ejercicio_nombre,
+        "orden": fila.orden,
+        "series_config": fila.series_config,
+        "tiempo_ejercicio_segundos": fila.tiempo_ejercicio_segundos,
+        "tiempo_descanso_segundos": fila.tiempo_descanso_segundos,
+        "notas": fila.notas_ejercicio,
+        "completado": fila.completado_id is not None,
+        "series_completadas": fila.series_completadas if fila.completado_id is not None else []
+    }
+
+def _ejercicio_movil(fila):
+    return schemas.EjercicioMovil(**_ejercicio_dict(fila))
+
+def _plan(filas, ejercicios, clase=schemas.PlanSemanalMovil):
+    plan = filas[0]
+    return clase(
+        plan_id=plan.plan_id, cliente_nombre="Cliente", numero_semana=plan.numero_semana,
+        fecha_inicio=plan.fecha_inicio, fecha_fin=plan.fecha_fin, ejercicios=ejercicios
+    )
+
+async def _anterior(planes) -> List[bytes]:
+    cuerpos = []
+    for filas in planes:
+        plan = _plan(filas, [_ejercicio_dict(f) for f in filas], _PlanMovilAnterior)
+        contenido = await serialize_response(field=CAMPO_ANTERIOR, response_content=plan)
+        cuerpos.append(JSONResponse(contenido).body)
+    return cuerpos
+
+def _nuevo(planes) -> List[bytes]:
+    return [
+        RespuestaORJSON(_plan(filas, [_ejercicio_movil(f) for f in filas]).model_dump(mode="json")).body
+        for filas in planes
+    ]
+
+async def _cache_anterior(payloads) -> List[bytes]:
+    cuerpos = []
+    for payload in payloads:
+        contenido = await serialize_response(field=CAMPO_ANTERIOR, response_content=payload)
+        cuerpos.append(JSONResponse(contenido).body)
+    return cuerpos
+
+def _cache_nuevo(payloads) -> List[bytes]:
+    return [RespuestaORJSON(payload).body for payload in payloads]
+
+def _medir(fn, repeticiones: int) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--planes", type=int, default=2000)
+    parser.add_argument("--ejercicios", type=int, default=8, help="Ejercicios por plan")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--semilla", type=int, default=23)
+    args = parser.parse_args()
+
+    planes = _planes_aleatorios(random.Random(args.semilla), args.planes, args.ejercicios)
+    payloads = [json.loads(cuerpo) for cuerpo in _nuevo(planes)]
+
+    # Mismo JSON por ambos caminos antes de medir
+    for a, b in zip(asyncio.run(_anterior(planes)), _nuevo(planes)):
+        if json.loads(a) != json.loads(b):
+            raise AssertionError(f"Respuestas distintas:\n{a}\n{b}")
+
+    tiempos = {
+        "anterior": _medir(lambda: asyncio.run(_anterior(planes)), args.repeticiones),
+        "nuevo": _medir(lambda: _nuevo(planes), args.repeticiones),
+        "cache_anterior": _medir(lambda: asyncio.run(_cache_anterior(payloads)), args.repeticiones),
+        "cache_nuevo": _medir(lambda: _cache_nuevo(payloads), args.repeticiones),
+    }
+
+    print(json.dumps({
+        "planes": args.planes,
+        "ejercicios_por_plan": args.ejercicios,
+        **{f"{nombre}_us_por_plan": round(t / args.planes * 1e6, 1) for nombre, t in tiempos.items()},
+        "aceleracion": round(tiempos["anterior"] / tiempos["nuevo"], 2),
+        "aceleracion_cache": round(tiempos["cache_anterior"] / tiempos["cache_nuevo"], 2)
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
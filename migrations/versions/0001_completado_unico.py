@@ -0,0 +1,38 @@
+"""Un único ejercicio completado por ejercicio del plan
+
+Elimina duplicados (se conserva el registro más reciente) y añade la
+restricción única que permite el upsert con ON CONFLICT
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Borrar un registro si existe otro del mismo ejercicio más reciente
+    # (o igual de reciente y con id menor)
+    op.execute("""
+        DELETE FROM ejercicios_completados
+        WHERE EXISTS (
+            SELECT 1 FROM ejercicios_completados otro
+            WHERE otro.ejercicio_plan_id = ejercicios_completados.ejercicio_plan_id
+              AND (
+                COALESCE(otro.fecha_completado, '1970-01-01') > COALESCE(ejercicios_completados.fecha_completado, '1970-01-01')
+                OR (COALESCE(otro.fecha_completado, '1970-01-01') = COALESCE(ejercicios_completados.fecha_completado, '1970-01-01')
+                    AND otro.id < ejercicios_completados.id)
+              )
+        )
+    """)
+
+    with op.batch_alter_table("ejercicios_completados") as batch_op:
+        batch_op.create_unique_constraint("uq_completado_ejercicio_plan", ["ejercicio_plan_id"])
+
+def downgrade():
+    with op.batch_alter_table("ejercicios_completados") as batch_op:
+        batch_op.drop_constraint("uq_completado_ejercicio_plan", type_="unique")
@@ -0,0 +1,41 @@
+"""Tabla de resúmenes por plan para las estadísticas
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "resumenes_plan",
+        sa.Column("plan_semanal_id", sa.Integer(), sa.ForeignKey("planes_semanales.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("total_ejercicios", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("ejercicios_completados", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("tiempo_total_segundos", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    # Carga inicial desde los datos existentes
+    op.execute("""
+        INSERT INTO resumenes_plan (plan_semanal_id, total_ejercicios, ejercicios_completados, tiempo_total_segundos)
+        SELECT
+            p.id,
+            (SELECT COUNT(*) FROM ejercicios_plan ep WHERE ep.plan_semanal_id = p.id),
+            (SELECT COUNT(*) FROM ejercicios_completados ec
+                JOIN ejercicios_plan ep ON ep.id = ec.ejercicio_plan_id
+                WHERE ep.plan_semanal_id = p.id),
+            (SELECT COALESCE(SUM(ec.tiempo_ejercicio_real_segundos), 0) FROM ejercicios_completados ec
+                JOIN ejercicios_plan ep ON ep.id = ec.ejercicio_plan_id
+                WHERE ep.plan_semanal_id = p.id)
+        FROM planes_semanales p
+    """)
+
+def downgrade():
+    op.drop_table("resumenes_plan")
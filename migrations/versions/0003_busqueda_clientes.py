@@ -0,0 +1,35 @@
+"""Índices para la búsqueda de clientes por nombre/email
+
+En PostgreSQL usa pg_trgm (GIN) para que ILIKE 'abc%' y '%abc%' usen índice;
+en otros motores crea índices normales
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.create_index(
+            "ix_clientes_nombre_trgm", "clientes", ["nombre"],
+            postgresql_using="gin", postgresql_ops={"nombre": "gin_trgm_ops"}
+        )
+        op.create_index(
+            "ix_clientes_email_trgm", "clientes", ["email"],
+            postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}
+        )
+        return
+
+    op.create_index("ix_clientes_nombre_trgm", "clientes", ["nombre"])
+    op.create_index("ix_clientes_email_trgm", "clientes", ["email"])
+
+def downgrade():
+    op.drop_index("ix_clientes_email_trgm", table_name="clientes")
+    op.drop_index("ix_clientes_nombre_trgm", table_name="clientes")
@@ -0,0 +1,40 @@
+"""Tabla de volumen semanal por cliente y ejercicio del catálogo
+
+La carga inicial no se hace aquí (expande el JSON de todo el historial en una
+transacción); después de migrar ejecutar:
+    python -m app.volumen reconstruir
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "volumen_semanal",
+        sa.Column("plan_semanal_id", sa.Integer(), sa.ForeignKey("planes_semanales.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("ejercicio_catalogo_id", sa.Integer(), sa.ForeignKey("ejercicios_catalogo.id"), primary_key=True),
+        sa.Column("cliente_id", sa.Integer(), sa.ForeignKey("clientes.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("fecha_inicio", sa.Date(), nullable=False),
+        sa.Column("series_objetivo", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("series_completadas", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("reps_objetivo", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("reps_realizadas", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("tiempo_real_segundos", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index(
+        "ix_volumen_cliente_ejercicio_fecha", "volumen_semanal",
+        ["cliente_id", "ejercicio_catalogo_id", "fecha_inicio"]
+    )
+
+def downgrade():
+    op.drop_index("ix_volumen_cliente_ejercicio_fecha", table_name="volumen_semanal")
+    op.drop_table("volumen_semanal")
@@ -0,0 +1,34 @@
+"""Índice del plan activo por fechas y puntero clientes.plan_actual_id
+
+Después de migrar (y una vez al día) ejecutar:
+    python -m app.plan_actual refrescar
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index(
+        "ix_planes_cliente_fechas", "planes_semanales",
+        ["cliente_id", "fecha_fin", "fecha_inicio"]
+    )
+    with op.batch_alter_table("clientes") as batch:
+        batch.add_column(sa.Column("plan_actual_id", sa.Integer(), nullable=True))
+        batch.create_foreign_key(
+            "fk_clientes_plan_actual", "planes_semanales",
+            ["plan_actual_id"], ["id"], ondelete="SET NULL"
+        )
+
+def downgrade():
+    with op.batch_alter_table("clientes") as batch:
+        batch.drop_constraint("fk_clientes_plan_actual", type_="foreignkey")
+        batch.drop_column("plan_actual_id")
+    op.drop_index("ix_planes_cliente_fechas", table_name="planes_semanales")
@@ -0,0 +1,35 @@
+"""Registro append-only de eventos del cronómetro en vivo
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "eventos_cronometro",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True),
+        sa.Column("cliente_id", sa.Integer(), nullable=False),
+        sa.Column("ejercicio_plan_id", sa.Integer(), nullable=False),
+        sa.Column("evento", sa.String(20), nullable=False),
+        sa.Column("tipo", sa.String(20)),
+        sa.Column("segundos_ejercicio", sa.Integer(), nullable=False),
+        sa.Column("segundos_descanso", sa.Integer(), nullable=False),
+        sa.Column("series_completadas", sa.Integer(), nullable=False),
+        sa.Column("registrado_en", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        "ix_eventos_cronometro_cliente_fecha", "eventos_cronometro",
+        ["cliente_id", "registrado_en"]
+    )
+
+def downgrade():
+    op.drop_index("ix_eventos_cronometro_cliente_fecha", table_name="eventos_cronometro")
+    op.drop_table("eventos_cronometro")
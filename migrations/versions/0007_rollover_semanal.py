@@ -0,0 +1,44 @@
+"""Reglas de progresión por cliente y ejecuciones del rollover semanal
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "reglas_progresion",
+        sa.Column("cliente_id", sa.Integer(), sa.ForeignKey("clientes.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("ejercicio_catalogo_id", sa.Integer(), sa.ForeignKey("ejercicios_catalogo.id"), primary_key=True),
+        sa.Column("tipos_progresion", sa.JSON(), nullable=False),
+        sa.Column("valores", sa.JSON(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "ejecuciones_rollover",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("fecha_inicio", sa.Date(), nullable=False, unique=True),
+        sa.Column("fecha_fin", sa.Date(), nullable=False),
+        sa.Column("estado", sa.String(20), nullable=False),
+        sa.Column("total_clientes", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("clientes_procesados", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("planes_creados", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("ejercicios_creados", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("ultimo_cliente_id", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("clientes_fallidos", sa.JSON(), nullable=False),
+        sa.Column("error", sa.Text()),
+        sa.Column("iniciada_en", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("actualizada_en", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("terminada_en", sa.DateTime(timezone=True)),
+    )
+
+def downgrade():
+    op.drop_table("ejecuciones_rollover")
+    op.drop_table("reglas_progresion")
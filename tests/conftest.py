@@ -0,0 +1,91 @@
+import os
+import tempfile
+from datetime import date, timedelta
+
+# La app lee la configuración al importarse: DB SQLite temporal antes de importar app.*
+_directorio = tempfile.mkdtemp(prefix="gym-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_directorio}/gym.db"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import database, models
+from app.cache import BackendMemoria, cache_plan_activo, snapshot_catalogo
+from app.cronometros import centro_cronometros
+from app.database import Base, SessionLocal, engine
+
+Base.metadata.create_all(bind=engine)
+
+@pytest.fixture(autouse=True)
+def _db_limpia(monkeypatch):
+    """Cada test parte de tablas vacías y de caches nuevas"""
+    monkeypatch.setattr(cache_plan_activo, "backend", BackendMemoria())
+    # Los ids se reutilizan tras vaciar las tablas: sin cronómetros de otro test
+    monkeypatch.setattr(centro_cronometros, "_sesiones", {})
+    yield
+    with engine.begin() as conexion:
+        for tabla in reversed(Base.metadata.sorted_tables):
+            conexion.execute(tabla.delete())
+    snapshot_catalogo.nueva_version()
+
+@pytest.fixture
+def db():
+    with SessionLocal() as sesion:
+        yield sesion
+
+@pytest.fixture
+def cliente_http():
+    from app.main import app
+    with TestClient(app) as cliente:
+        yield cliente
+
+@pytest.fixture
+def sentencias():
+    """Sentencias SQL ejecutadas mientras dura el test (lista de SQL)"""
+    ejecutadas = []
+    engine_peticiones = database.async_engine.sync_engine if database.async_engine is not None else engine
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        ejecutadas.append(statement)
+
+    event.listen(engine_peticiones, "before_cursor_execute", registrar)
+    yield ejecutadas
+    event.remove(engine_peticiones, "before_cursor_execute", registrar)
+
+def crear_cliente(db, nombre: str = "Ana", activo: bool = True) -> models.Cliente:
+    cliente = models.Cliente(nombre=nombre, email=f"{nombre.lower()}@gym.test", activo=activo)
+    db.add(cliente)
+    db.flush()
+    return cliente
+
+def crear_catalogo(db, cantidad: int = 3):
+    ejercicios = [models.EjercicioCatalogo(nombre=f"Ejercicio {i}") for i in range(1, cantidad + 1)]
+    db.add_all(ejercicios)
+    db.flush()
+    return ejercicios
+
+def crear_plan(db, cliente, catalogo, configs, numero_semana: int = 1, fecha_inicio: date = None) -> models.PlanSemanal:
+    """Plan de una semana (por defecto la actual) con un ejercicio por config, en orden de catálogo"""
+    fecha_inicio = fecha_inicio or date.today() - timedelta(days=date.today().weekday())
+    plan = models.PlanSemanal(
+        cliente_id=cliente.id,
+        numero_semana=numero_semana,
+        fecha_inicio=fecha_inicio,
+        fecha_fin=fecha_inicio + timedelta(days=6)
+    )
+    db.add(plan)
+    db.flush()
+    for orden, (ejercicio, config) in enumerate(zip(catalogo, configs), 1):
+        db.add(models.EjercicioPlan(
+            plan_semanal_id=plan.id,
+            ejercicio_catalogo_id=ejercicio.id,
+            orden=orden,
+            series_config=config,
+            tiempo_ejercicio_segundos=45,
+            tiempo_descanso_segundos=90,
+            tipo_progresion="ninguna",
+            valor_progresion=0
+        ))
+    db.flush()
+    return plan
@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from app import models
+from app.routers.admin import _explain
+from conftest import crear_catalogo, crear_cliente, crear_plan
+
+def test_planes_cliente_pagina_por_defecto(db, cliente_http):
+    cliente = crear_cliente(db)
+    catalogo = crear_catalogo(db, 1)
+    inicio = date(2025, 1, 6)
+    for semana in range(1, 26):
+        crear_plan(db, cliente, catalogo, [[10, 10]], semana, inicio + timedelta(weeks=semana))
+    db.commit()
+
+    respuesta = cliente_http.get(f"/api/admin/cliente/{cliente.id}/planes")
+    assert respuesta.status_code == 200
+    planes = respuesta.json()
+    assert [plan["numero_semana"] for plan in planes] == list(range(25, 5, -1))
+    assert all(len(plan["ejercicios"]) == 1 for plan in planes)
+    assert respuesta.headers["X-Siguiente-Cursor"] == "6"
+
+    resto = cliente_http.get(f"/api/admin/cliente/{cliente.id}/planes", params={"cursor": 6})
+    assert [plan["numero_semana"] for plan in resto.json()] == [5, 4, 3, 2, 1]
+    assert "X-Siguiente-Cursor" not in resto.headers
+
+def test_planes_cliente_limite_maximo(cliente_http):
+    assert cliente_http.get("/api/admin/cliente/1/planes", params={"limit": 201}).status_code == 422
+
+def test_clientes_pagina_por_defecto(db, cliente_http):
+    for numero in range(1, 61):
+        crear_cliente(db, f"Cliente{numero:02d}", activo=numero != 10)
+    db.commit()
+
+    respuesta = cliente_http.get("/api/admin/clientes")
+    clientes = respuesta.json()
+    assert len(clientes) == 50
+    assert "Cliente10" not in [cliente["nombre"] for cliente in clientes]
+
+    resto = cliente_http.get("/api/admin/clientes", params={"cursor": respuesta.headers["X-Siguiente-Cursor"]})
+    assert len(resto.json()) == 9
+    assert "X-Siguiente-Cursor" not in resto.headers
+
+def test_clientes_limite_maximo(cliente_http):
+    assert cliente_http.get("/api/admin/clientes", params={"limit": 501}).status_code == 422
+
+def test_clientes_con_total_y_caracteres_especiales(db, cliente_http):
+    for nombre in ("Ana:100%", "Ana:1000", "Ana 100%"):
+        crear_cliente(db, nombre)
+    db.commit()
+
+    respuesta = cliente_http.get("/api/admin/clientes", params={"q": "a:100%", "contiene": True, "con_total": True})
+
+    assert respuesta.status_code == 200
+    assert [cliente["nombre"] for cliente in respuesta.json()] == ["Ana:100%"]
+    assert respuesta.headers["X-Total-Estimado"] == "1"
+
+def test_explain_pasa_la_busqueda_como_parametro():
+    texto = "x'); DROP TABLE clientes; -- :cursor 100%"
+    sentencia = _explain(select(models.Cliente).where(models.Cliente.nombre.ilike(f"%{texto}%", escape="/")))
+
+    sql = str(sentencia)
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert texto not in sql
+    assert [parametro.value for parametro in sentencia._bindparams.values()] == [f"%{texto}%"]
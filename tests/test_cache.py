@@ -0,0 +1,59 @@
+import logging
+
+from app import cache
+from app.cache import BackendMemoria, BackendRedis, CachePlanActivo, RedisLocal, cache_plan_activo
+from conftest import crear_catalogo, crear_cliente, crear_plan
+
+def test_backend_por_defecto_segun_workers(monkeypatch, caplog):
+    monkeypatch.setattr(cache.settings, "cache_plan_backend", None)
+    monkeypatch.setattr(cache.settings, "redis_url", "redis://cache:6379/0")
+    monkeypatch.setattr(cache.settings, "web_concurrency", 1)
+    assert cache._nombre_backend() == "memoria"
+
+    monkeypatch.setattr(cache.settings, "web_concurrency", 4)
+    assert cache._nombre_backend() == "redis"
+
+    # Varios workers sin Redis: sigue en memoria pero lo avisa
+    monkeypatch.setattr(cache.settings, "redis_url", None)
+    with caplog.at_level(logging.WARNING, logger="app.cache"):
+        assert isinstance(cache._crear_backend(), BackendMemoria)
+    assert "CACHE_PLAN_BACKEND=redis" in caplog.text
+
+def test_backend_explicito(monkeypatch):
+    monkeypatch.setattr(cache.settings, "cache_plan_backend", "redis_local")
+    monkeypatch.setattr(cache.settings, "web_concurrency", 4)
+    assert isinstance(cache._crear_backend(), BackendRedis)
+
+def test_invalidacion_visible_desde_otro_worker():
+    """Dos procesos con el mismo backend compartido: la edición en uno invalida al otro"""
+    compartido = BackendRedis(RedisLocal())
+    worker_a, worker_b = CachePlanActivo(compartido), CachePlanActivo(compartido)
+    payload = {"plan_id": 1, "fecha_inicio": "2000-01-01", "fecha_fin": "2999-12-31"}
+    worker_a.guardar(1, payload, '"v1"')
+    assert worker_b.obtener(1)["etag"] == '"v1"'
+    worker_a.invalidar(1)
+    assert worker_b.obtener(1) is None
+
+def test_edicion_invalida_plan_actual(db, cliente_http):
+    cliente = crear_cliente(db)
+    catalogo = crear_catalogo(db, 1)
+    plan = crear_plan(db, cliente, catalogo, [[10, 10]])
+    db.commit()
+    url = f"/api/mobile/cliente/{cliente.id}/plan-actual"
+
+    antes = cliente_http.get(url).json()
+    assert cache_plan_activo.obtener(cliente.id) is not None
+
+    respuesta = cliente_http.put(f"/api/admin/cliente/{cliente.id}/plan/{plan.id}", json={
+        "fecha_inicio": plan.fecha_inicio.isoformat(),
+        "fecha_fin": plan.fecha_fin.isoformat(),
+        "ejercicios": [{
+            "ejercicio_catalogo_id": catalogo[0].id, "orden": 1, "series_config": [12, 12],
+            "tiempo_ejercicio_segundos": 45, "tiempo_descanso_segundos": 90
+        }]
+    })
+    assert respuesta.status_code == 200
+
+    despues = cliente_http.get(url).json()
+    assert antes["ejercicios"][0]["series_config"] == [10, 10]
+    assert despues["ejercicios"][0]["series_config"] == [12, 12]
@@ -0,0 +1,40 @@
+from app.cache import SnapshotCatalogo
+from conftest import crear_catalogo
+
+def test_catalogo_304_con_etag(db, cliente_http, sentencias):
+    crear_catalogo(db, 2)
+    db.commit()
+
+    primera = cliente_http.get("/api/admin/ejercicios-catalogo")
+    etag = primera.headers["etag"]
+    assert [ejercicio["nombre"] for ejercicio in primera.json()] == ["Ejercicio 1", "Ejercicio 2"]
+
+    sentencias.clear()
+    segunda = cliente_http.get("/api/admin/ejercicios-catalogo", headers={"If-None-Match": etag})
+    assert segunda.status_code == 304
+    assert segunda.headers["etag"] == etag
+    assert sentencias == []
+
+def test_alta_invalida_el_etag(db, cliente_http):
+    crear_catalogo(db, 1)
+    db.commit()
+    etag = cliente_http.get("/api/admin/ejercicios-catalogo").headers["etag"]
+
+    alta = cliente_http.post("/api/admin/ejercicios-catalogo", json={"nombre": "Remo"})
+    assert alta.status_code == 200
+
+    respuesta = cliente_http.get("/api/admin/ejercicios-catalogo", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["etag"] != etag
+    assert [ejercicio["nombre"] for ejercicio in respuesta.json()] == ["Ejercicio 1", "Remo"]
+
+def test_etag_depende_solo_del_contenido():
+    """Dos workers con versiones distintas sirven el mismo ETag para el mismo catálogo"""
+    ejercicios = [{"id": 1, "nombre": "Sentadilla"}]
+    worker_a, worker_b = SnapshotCatalogo(), SnapshotCatalogo()
+    worker_b.nueva_version()
+    worker_b.nueva_version()
+
+    etag_a = worker_a.guardar(ejercicios, worker_a.version).etag
+    assert worker_b.guardar(ejercicios, worker_b.version).etag == etag_a
+    assert worker_a.guardar([{"id": 1, "nombre": "Remo"}], worker_a.version).etag != etag_a
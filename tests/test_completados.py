@@ -0,0 +1,166 @@
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from app import models, schemas
+from app.completados import upsert_completado
+from conftest import crear_catalogo, crear_cliente, crear_plan
+
+DIALECTOS = {"postgresql": postgresql.dialect(), "sqlite": sqlite.dialect()}
+
+def _series(*reps):
+    return [
+        {"serie": i, "reps_objetivo": 10, "reps_realizadas": realizadas, "completada": realizadas >= 10}
+        for i, realizadas in enumerate(reps, 1)
+    ]
+
+def _completado(ejercicio_plan_id, *reps, **extra):
+    return {
+        "ejercicio_plan_id": ejercicio_plan_id,
+        "series_completadas": _series(*reps),
+        "tiempo_ejercicio_real_segundos": 60,
+        "tiempo_descanso_real_segundos": 90,
+        **extra
+    }
+
+def _ejercicios(db, cantidad: int = 3):
+    cliente = crear_cliente(db)
+    plan = crear_plan(db, cliente, crear_catalogo(db, cantidad), [[10, 10]] * cantidad)
+    db.commit()
+    return [ejercicio.id for ejercicio in sorted(plan.ejercicios, key=lambda ejercicio: ejercicio.orden)]
+
+def test_lote_estados_por_item(db, cliente_http):
+    primero, segundo, tercero = _ejercicios(db)
+    assert cliente_http.post("/api/mobile/ejercicio/completar", json=_completado(segundo, 8, 8)).status_code == 200
+
+    respuesta = cliente_http.post("/api/mobile/ejercicio/completar-lote", json=[
+        _completado(primero, 10, 10),
+        _completado(segundo, 10, 10),
+        _completado(tercero, 5, 5),
+        _completado(999999, 10, 10),
+        _completado(tercero, 10, 9, notas_cliente="último envío")
+    ])
+
+    assert respuesta.status_code == 200
+    estados = [(item["ejercicio_plan_id"], item["estado"]) for item in respuesta.json()]
+    assert estados == [
+        (primero, "registrado"),
+        (segundo, "actualizado"),
+        (tercero, "sobrescrito"),
+        (999999, "no_encontrado"),
+        (tercero, "registrado")
+    ]
+    assert respuesta.json()[3]["id"] is None
+
+    filas = {
+        fila.ejercicio_plan_id: fila for fila in db.scalars(select(models.EjercicioCompletado))
+    }
+    assert sorted(filas) == [primero, segundo, tercero]
+    assert filas[segundo].series_completadas == _series(10, 10)
+    assert filas[tercero].notas_cliente == "último envío"
+    assert respuesta.json()[1]["id"] == filas[segundo].id
+
+def test_lote_vacio(cliente_http, sentencias):
+    assert cliente_http.post("/api/mobile/ejercicio/completar-lote", json=[]).json() == []
+    assert sentencias == []
+
+def test_lote_actualiza_estadisticas(db, cliente_http):
+    ejercicios = _ejercicios(db)
+    cliente_id = db.scalar(select(func.min(models.Cliente.id)))
+    cliente_http.post("/api/mobile/ejercicio/completar-lote", json=[_completado(e, 10, 10) for e in ejercicios[:2]])
+
+    estadisticas = cliente_http.get(f"/api/mobile/cliente/{cliente_id}/estadisticas").json()
+    assert estadisticas["ejercicios_completados"] == 2
+    assert estadisticas["total_ejercicios"] == 3
+
+def test_repetir_completado_actualiza_la_misma_fila(db, cliente_http):
+    ejercicio, _, _ = _ejercicios(db)
+
+    primera = cliente_http.post("/api/mobile/ejercicio/completar", json=_completado(ejercicio, 8, 8))
+    segunda = cliente_http.post("/api/mobile/ejercicio/completar", json=_completado(ejercicio, 10, 10, completado_totalmente=True))
+
+    assert primera.json()["message"] == "Ejercicio completado registrado"
+    assert segunda.json()["message"] == "Ejercicio actualizado"
+    assert segunda.json()["id"] == primera.json()["id"]
+    fila = db.scalar(select(models.EjercicioCompletado))
+    assert db.scalar(select(func.count()).select_from(models.EjercicioCompletado)) == 1
+    assert fila.series_completadas == _series(10, 10)
+    assert fila.completado_totalmente is True
+
+def test_completado_de_ejercicio_inexistente(cliente_http):
+    assert cliente_http.post("/api/mobile/ejercicio/completar", json=_completado(999999, 10)).status_code == 404
+
+def test_envios_concurrentes_del_mismo_ejercicio(db, cliente_http):
+    ejercicio, _, _ = _ejercicios(db)
+
+    with ThreadPoolExecutor(8) as pool:
+        respuestas = list(pool.map(
+            lambda reps: cliente_http.post("/api/mobile/ejercicio/completar", json=_completado(ejercicio, reps)),
+            range(8)
+        ))
+
+    assert {respuesta.status_code for respuesta in respuestas} == {200}
+    mensajes = sorted(respuesta.json()["message"] for respuesta in respuestas)
+    assert mensajes == ["Ejercicio actualizado"] * 7 + ["Ejercicio completado registrado"]
+    assert len({respuesta.json()["id"] for respuesta in respuestas}) == 1
+    assert db.scalar(select(func.count()).select_from(models.EjercicioCompletado)) == 1
+
+@pytest.mark.parametrize("dialecto, insertado", [
+    ("postgresql", "xmax = 0"),
+    ("sqlite", "created_at = fecha_completado"),
+])
+def test_upsert_por_dialecto(dialecto, insertado):
+    """Una sola sentencia INSERT ... ON CONFLICT DO UPDATE ... RETURNING que distingue alta de edición"""
+    stmt = upsert_completado(dialecto, schemas.EjercicioCompletadoCreate(**_completado(1, 10)))
+    sql = str(stmt.compile(dialect=DIALECTOS[dialecto]))
+    assert sql.startswith("INSERT INTO ejercicios_completados")
+    assert "ON CONFLICT (ejercicio_plan_id) DO UPDATE SET" in sql
+    assert "RETURNING" in sql and insertado in sql
+
+def _cargar_migracion(nombre: str):
+    ruta = Path(__file__).resolve().parent.parent / "migrations" / "versions" / f"{nombre}.py"
+    spec = importlib.util.spec_from_file_location(f"migracion_{nombre}", ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+def test_migracion_conserva_el_completado_mas_reciente(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/migracion.db")
+    with engine.begin() as conexion:
+        # Tabla como antes de 0001: sin restricción única, con duplicados
+        conexion.exec_driver_sql("""
+            CREATE TABLE ejercicios_completados (
+                id INTEGER PRIMARY KEY,
+                ejercicio_plan_id INTEGER NOT NULL,
+                fecha_completado DATETIME,
+                notas_cliente TEXT
+            )
+        """)
+        conexion.exec_driver_sql("""
+            INSERT INTO ejercicios_completados (id, ejercicio_plan_id, fecha_completado, notas_cliente) VALUES
+                (1, 10, '2026-01-01 10:00:00', 'viejo'),
+                (2, 10, '2026-01-03 10:00:00', 'nuevo'),
+                (3, 10, '2026-01-02 10:00:00', 'medio'),
+                (4, 20, NULL, 'sin fecha'),
+                (5, 20, '2026-01-01 09:00:00', 'con fecha'),
+                (6, 30, '2026-01-05 08:00:00', 'empate, id menor'),
+                (7, 30, '2026-01-05 08:00:00', 'empate, id mayor'),
+                (8, 40, '2026-01-01 08:00:00', 'único')
+        """)
+        with Operations.context(MigrationContext.configure(conexion)):
+            _cargar_migracion("0001_completado_unico").upgrade()
+
+    with engine.connect() as conexion:
+        filas = conexion.exec_driver_sql(
+            "SELECT ejercicio_plan_id, notas_cliente FROM ejercicios_completados ORDER BY ejercicio_plan_id"
+        ).all()
+        assert filas == [(10, "nuevo"), (20, "con fecha"), (30, "empate, id menor"), (40, "único")]
+        with pytest.raises(IntegrityError):
+            conexion.exec_driver_sql("INSERT INTO ejercicios_completados (ejercicio_plan_id) VALUES (10)")
@@ -0,0 +1,119 @@
+import asyncio
+
+from sqlalchemy import select
+
+from app import models
+from app.cronometros import CentroCronometros
+from conftest import crear_catalogo, crear_cliente, crear_plan
+
+def _plan(db):
+    cliente = crear_cliente(db)
+    plan = crear_plan(db, cliente, crear_catalogo(db, 2), [[10, 8], [12]])
+    db.commit()
+    return cliente, [ejercicio.id for ejercicio in sorted(plan.ejercicios, key=lambda ejercicio: ejercicio.orden)]
+
+def _enviar(ws, **mensaje):
+    ws.send_json(mensaje)
+    return ws.receive_json()
+
+def test_ciclo_completo_del_cronometro(db, cliente_http):
+    cliente, ids = _plan(db)
+
+    with cliente_http.websocket_connect(f"/api/mobile/cliente/{cliente.id}/cronometro") as ws:
+        assert ws.receive_json() == {"evento": "estado", "sesiones": []}
+
+        iniciado = _enviar(ws, accion="iniciar", ejercicio_plan_id=ids[0], tipo="ejercicio")
+        assert (iniciado["evento"], iniciado["corriendo"]) == ("iniciado", "ejercicio")
+
+        serie = _enviar(ws, accion="serie", ejercicio_plan_id=ids[0], serie=1, reps_realizadas=9, completada=False)
+        assert serie["series_completadas"] == [{"serie": 1, "reps_objetivo": 10, "reps_realizadas": 9, "completada": False}]
+
+        tiempo = _enviar(ws, accion="registrar", ejercicio_plan_id=ids[0], tipo="ejercicio", segundos_transcurridos=42)
+        assert tiempo["evento"] == "tiempo"
+        assert tiempo["segundos"]["ejercicio"] == 42
+
+        descanso = _enviar(ws, accion="iniciar", ejercicio_plan_id=ids[0], tipo="descanso")
+        assert descanso["corriendo"] == "descanso"
+        pausado = _enviar(ws, accion="pausar", ejercicio_plan_id=ids[0])
+        assert (pausado["evento"], pausado["corriendo"]) == ("pausado", None)
+
+        estado = _enviar(ws, accion="estado")
+        assert [sesion["ejercicio_plan_id"] for sesion in estado["sesiones"]] == [ids[0]]
+
+        finalizado = _enviar(ws, accion="finalizar", ejercicio_plan_id=ids[0], completado_totalmente=False, notas_cliente="Pesado")
+        assert finalizado["evento"] == "finalizado"
+        assert _enviar(ws, accion="estado")["sesiones"] == []
+
+    completado = db.get(models.EjercicioCompletado, finalizado["completado_id"])
+    assert completado.ejercicio_plan_id == ids[0]
+    assert completado.tiempo_ejercicio_real_segundos == 42
+    assert completado.series_completadas == serie["series_completadas"]
+    assert completado.notas_cliente == "Pesado"
+
+def test_un_solo_cronometro_corriendo_y_panel(db, cliente_http):
+    cliente, ids = _plan(db)
+
+    with cliente_http.websocket_connect(f"/api/admin/cronometros?cliente_id={cliente.id}") as panel:
+        assert panel.receive_json() == {"evento": "instantanea", "sesiones": []}
+        with cliente_http.websocket_connect(f"/api/mobile/cliente/{cliente.id}/cronometro") as ws:
+            ws.receive_json()
+            _enviar(ws, accion="iniciar", ejercicio_plan_id=ids[0], tipo="ejercicio")
+            segundo = _enviar(ws, accion="iniciar", ejercicio_plan_id=ids[1], tipo="ejercicio")
+            assert segundo["ejercicio_plan_id"] == ids[1]
+
+            eventos = [panel.receive_json() for _ in range(4)]
+            assert [(evento["evento"], evento.get("ejercicio_plan_id")) for evento in eventos] == [
+                ("conectado", None), ("iniciado", ids[0]), ("pausado", ids[0]), ("iniciado", ids[1])
+            ]
+            estado = {sesion["ejercicio_plan_id"]: sesion["corriendo"] for sesion in _enviar(ws, accion="estado")["sesiones"]}
+            assert estado == {ids[0]: None, ids[1]: "ejercicio"}
+        assert panel.receive_json()["evento"] == "desconectado"
+
+def test_errores_no_cierran_la_conexion(db, cliente_http):
+    cliente, ids = _plan(db)
+    otro = crear_cliente(db, "Otro")
+    db.commit()
+
+    with cliente_http.websocket_connect(f"/api/mobile/cliente/{cliente.id}/cronometro") as ws:
+        ws.receive_json()
+
+        ws.send_text("no es json")
+        assert ws.receive_json()["evento"] == "error"
+        ws.send_text("[1, 2]")
+        assert ws.receive_json() == {"evento": "error", "detalle": "Se esperaba un objeto JSON"}
+        assert _enviar(ws, accion="saltar") == {"evento": "error", "detalle": "Acción desconocida: 'saltar'"}
+
+        invalido = _enviar(ws, accion="iniciar", ejercicio_plan_id=ids[0], tipo="carrera")
+        assert invalido["evento"] == "error"
+        assert invalido["detalle"][0]["loc"] == ["tipo"]
+
+        assert _enviar(ws, accion="pausar", ejercicio_plan_id=ids[0]) == {
+            "evento": "error", "detalle": "No hay cronómetro en curso para este ejercicio"
+        }
+        assert _enviar(ws, accion="finalizar", ejercicio_plan_id=ids[1])["evento"] == "error"
+
+        # El ejercicio no es de un plan de este cliente
+        with cliente_http.websocket_connect(f"/api/mobile/cliente/{otro.id}/cronometro") as ajeno:
+            ajeno.receive_json()
+            assert _enviar(ajeno, accion="iniciar", ejercicio_plan_id=ids[0], tipo="ejercicio") == {
+                "evento": "error", "detalle": "Ejercicio no encontrado"
+            }
+
+        # Tras los errores la conexión sigue sirviendo
+        assert _enviar(ws, accion="iniciar", ejercicio_plan_id=ids[0], tipo="ejercicio")["evento"] == "iniciado"
+
+    assert db.scalars(select(models.EjercicioCompletado)).all() == []
+
+def test_panel_solo_recibe_sus_clientes():
+    centro = CentroCronometros(max_cola=1)
+
+    async def escenario():
+        todos = centro.suscribir()
+        solo_uno = centro.suscribir({1})
+        centro.publicar("conectado", 1)
+        centro.publicar("conectado", 2)
+        return todos.qsize(), solo_uno.qsize()
+
+    # La cola de "todos" tiene sitio para uno: el segundo evento se descarta
+    assert asyncio.run(escenario()) == (1, 1)
+    assert (centro.eventos_publicados, centro.eventos_descartados) == (2, 1)
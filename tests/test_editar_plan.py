@@ -0,0 +1,92 @@
+from sqlalchemy import select
+
+from app import models
+from conftest import crear_catalogo, crear_cliente, crear_plan
+
+def _ejercicio(catalogo_id, orden, series):
+    return {"ejercicio_catalogo_id": catalogo_id, "orden": orden, "series_config": series,
+            "tiempo_ejercicio_segundos": 45, "tiempo_descanso_segundos": 90}
+
+def _editar(cliente_http, cliente, plan, ejercicios):
+    respuesta = cliente_http.put(f"/api/admin/cliente/{cliente.id}/plan/{plan.id}", json={
+        "fecha_inicio": plan.fecha_inicio.isoformat(),
+        "fecha_fin": plan.fecha_fin.isoformat(),
+        "ejercicios": ejercicios
+    })
+    assert respuesta.status_code == 200
+    return respuesta.json()
+
+def _completar(db, ejercicio_plan):
+    db.add(models.EjercicioCompletado(
+        ejercicio_plan_id=ejercicio_plan.id,
+        series_completadas=[],
+        tiempo_ejercicio_real_segundos=60,
+        completado_totalmente=True
+    ))
+
+def _plan(db):
+    cliente = crear_cliente(db)
+    catalogo = crear_catalogo(db, 3)
+    plan = crear_plan(db, cliente, catalogo, [[10, 10], [12], [15]])
+    ejercicios = sorted(plan.ejercicios, key=lambda ejercicio: ejercicio.orden)
+    for ejercicio in ejercicios:
+        _completar(db, ejercicio)
+    db.commit()
+    return cliente, catalogo, plan, [ejercicio.id for ejercicio in ejercicios]
+
+def _completados_por_catalogo(db, plan):
+    return dict(db.execute(
+        select(models.EjercicioPlan.ejercicio_catalogo_id, models.EjercicioCompletado.ejercicio_plan_id).join(
+            models.EjercicioCompletado
+        ).where(models.EjercicioPlan.plan_semanal_id == plan.id)
+    ).all())
+
+def test_editar_un_ejercicio_es_un_update(db, cliente_http, sentencias):
+    cliente, catalogo, plan, ids = _plan(db)
+    sentencias.clear()
+
+    _editar(cliente_http, cliente, plan, [
+        _ejercicio(catalogo[0].id, 1, [10, 10]),
+        _ejercicio(catalogo[1].id, 2, [14]),
+        _ejercicio(catalogo[2].id, 3, [15])
+    ])
+
+    sobre_ejercicios = [sql for sql in sentencias if sql.split("(")[0].split()[:3] in (
+        ["UPDATE", "ejercicios_plan", "SET"], ["DELETE", "FROM", "ejercicios_plan"], ["INSERT", "INTO", "ejercicios_plan"]
+    )]
+    assert len(sobre_ejercicios) == 1
+    assert sobre_ejercicios[0].startswith("UPDATE ejercicios_plan SET series_config")
+    assert db.scalar(select(models.EjercicioPlan.series_config).where(models.EjercicioPlan.id == ids[1])) == [14]
+    assert len(_completados_por_catalogo(db, plan)) == 3
+
+def test_intercambiar_orden_conserva_completados(db, cliente_http):
+    cliente, catalogo, plan, ids = _plan(db)
+    antes = _completados_por_catalogo(db, plan)
+
+    resultado = _editar(cliente_http, cliente, plan, [
+        _ejercicio(catalogo[1].id, 1, [12]),
+        _ejercicio(catalogo[0].id, 2, [10, 10]),
+        _ejercicio(catalogo[2].id, 3, [15])
+    ])
+
+    assert [(ejercicio["id"], ejercicio["orden"]) for ejercicio in resultado["ejercicios"]] == [
+        (ids[1], 1), (ids[0], 2), (ids[2], 3)
+    ]
+    assert _completados_por_catalogo(db, plan) == antes
+
+def test_reordenar_y_quitar_conserva_los_que_siguen(db, cliente_http):
+    cliente, catalogo, plan, ids = _plan(db)
+    nuevo = models.EjercicioCatalogo(nombre="Remo")
+    db.add(nuevo)
+    db.commit()
+
+    resultado = _editar(cliente_http, cliente, plan, [
+        _ejercicio(catalogo[2].id, 1, [15]),
+        _ejercicio(nuevo.id, 2, [8]),
+        _ejercicio(catalogo[0].id, 3, [10, 10])
+    ])
+
+    ejercicios = resultado["ejercicios"]
+    assert [ejercicio["id"] for ejercicio in ejercicios][::2] == [ids[2], ids[0]]
+    assert ejercicios[1]["id"] not in ids
+    assert _completados_por_catalogo(db, plan) == {catalogo[2].id: ids[2], catalogo[0].id: ids[0]}
@@ -0,0 +1,91 @@
+from app.cache import BackendMemoria, cache_plan_activo
+from conftest import crear_catalogo, crear_cliente, crear_plan
+
+def _plan(db):
+    cliente = crear_cliente(db)
+    catalogo = crear_catalogo(db, 2)
+    plan = crear_plan(db, cliente, catalogo, [[10, 10], [12]])
+    db.commit()
+    return cliente, catalogo, plan, sorted(plan.ejercicios, key=lambda ejercicio: ejercicio.orden)
+
+def _editar(cliente_http, cliente, catalogo, plan):
+    respuesta = cliente_http.put(f"/api/admin/cliente/{cliente.id}/plan/{plan.id}", json={
+        "fecha_inicio": plan.fecha_inicio.isoformat(),
+        "fecha_fin": plan.fecha_fin.isoformat(),
+        "notas": "Semana de descarga",
+        "ejercicios": [
+            {"ejercicio_catalogo_id": catalogo[0].id, "orden": 1, "series_config": [8, 8],
+             "tiempo_ejercicio_segundos": 45, "tiempo_descanso_segundos": 90},
+            {"ejercicio_catalogo_id": catalogo[1].id, "orden": 2, "series_config": [12],
+             "tiempo_ejercicio_segundos": 45, "tiempo_descanso_segundos": 90}
+        ]
+    })
+    assert respuesta.status_code == 200
+
+def test_plan_actual_304(db, cliente_http, sentencias):
+    cliente, _, _, _ = _plan(db)
+    url = f"/api/mobile/cliente/{cliente.id}/plan-actual"
+    etag = cliente_http.get(url).headers["etag"]
+
+    sentencias.clear()
+    respuesta = cliente_http.get(url, headers={"If-None-Match": etag})
+    assert respuesta.status_code == 304
+    assert respuesta.headers["etag"] == etag
+    assert sentencias == []
+
+def test_plan_actual_304_sin_cache(db, cliente_http, sentencias, monkeypatch):
+    """Otro worker (cache vacía) valida el ETag con la consulta de versión, sin armar el plan"""
+    cliente, _, _, _ = _plan(db)
+    url = f"/api/mobile/cliente/{cliente.id}/plan-actual"
+    etag = cliente_http.get(url).headers["etag"]
+    monkeypatch.setattr(cache_plan_activo, "backend", BackendMemoria())
+
+    sentencias.clear()
+    respuesta = cliente_http.get(url, headers={"If-None-Match": etag})
+    assert respuesta.status_code == 304
+    assert len(sentencias) == 1
+
+def test_completar_invalida_el_etag_del_plan(db, cliente_http):
+    cliente, _, _, ejercicios = _plan(db)
+    url = f"/api/mobile/cliente/{cliente.id}/plan-actual"
+    etag = cliente_http.get(url).headers["etag"]
+
+    cliente_http.post("/api/mobile/ejercicio/completar", json={
+        "ejercicio_plan_id": ejercicios[0].id, "series_completadas": [], "tiempo_ejercicio_real_segundos": 50
+    })
+
+    respuesta = cliente_http.get(url, headers={"If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["etag"] != etag
+    assert respuesta.json()["ejercicios"][0]["completado"] is True
+
+    # Con la cache vacía se llega al mismo ETag nuevo
+    cache_plan_activo.backend = BackendMemoria()
+    assert cliente_http.get(url, headers={"If-None-Match": etag}).headers["etag"] == respuesta.headers["etag"]
+
+def test_editar_plan_invalida_los_etag(db, cliente_http):
+    cliente, catalogo, plan, ejercicios = _plan(db)
+    url_plan = f"/api/mobile/cliente/{cliente.id}/plan-actual"
+    url_cronometro = f"/api/mobile/ejercicio/{ejercicios[0].id}/cronometro"
+    etag_plan = cliente_http.get(url_plan).headers["etag"]
+    etag_cronometro = cliente_http.get(url_cronometro).headers["etag"]
+    assert cliente_http.get(url_cronometro, headers={"If-None-Match": etag_cronometro}).status_code == 304
+
+    _editar(cliente_http, cliente, catalogo, plan)
+
+    respuesta = cliente_http.get(url_plan, headers={"If-None-Match": etag_plan})
+    assert respuesta.status_code == 200
+    assert respuesta.json()["ejercicios"][0]["series_config"] == [8, 8]
+    cronometro = cliente_http.get(url_cronometro, headers={"If-None-Match": etag_cronometro})
+    assert cronometro.status_code == 200
+    assert cronometro.headers["etag"] != etag_cronometro
+
+def test_cronometro_etag_desconocido_o_ejercicio_inexistente(db, cliente_http):
+    _, _, _, ejercicios = _plan(db)
+
+    assert cliente_http.get(
+        f"/api/mobile/ejercicio/{ejercicios[0].id}/cronometro", headers={"If-None-Match": '"otro"'}
+    ).status_code == 200
+    assert cliente_http.get(
+        "/api/mobile/ejercicio/999999/cronometro", headers={"If-None-Match": "*"}
+    ).status_code == 404
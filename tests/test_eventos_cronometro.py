@@ -0,0 +1,65 @@
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app import models
+from app.eventos_cronometro import buffer_eventos
+from app.main import app
+from conftest import crear_catalogo, crear_cliente, crear_plan
+
+def _eventos(db) -> list:
+    db.expire_all()
+    return db.scalars(select(models.EventoCronometro.evento).order_by(models.EventoCronometro.id)).all()
+
+def _plan(db):
+    cliente = crear_cliente(db)
+    plan = crear_plan(db, cliente, crear_catalogo(db, 1), [[10]])
+    db.commit()
+    return cliente, plan.ejercicios[0].id
+
+def test_apagar_vacia_la_cola(db, monkeypatch):
+    # Intervalo y lote grandes: sin el apagado los eventos seguirían en memoria
+    monkeypatch.setattr(buffer_eventos, "intervalo_segundos", 60)
+    monkeypatch.setattr(buffer_eventos, "lote", 500)
+    cliente, ejercicio_plan_id = _plan(db)
+
+    with TestClient(app) as cliente_http:
+        with cliente_http.websocket_connect(f"/api/mobile/cliente/{cliente.id}/cronometro") as ws:
+            ws.receive_json()
+            for mensaje in (
+                {"accion": "iniciar", "ejercicio_plan_id": ejercicio_plan_id, "tipo": "ejercicio"},
+                {"accion": "serie", "ejercicio_plan_id": ejercicio_plan_id, "serie": 1, "reps_realizadas": 10},
+                {"accion": "estado"},
+                {"accion": "pausar", "ejercicio_plan_id": ejercicio_plan_id}
+            ):
+                ws.send_json(mensaje)
+                ws.receive_json()
+        assert _eventos(db) == []
+        inicio = time.monotonic()
+
+    # Al apagar se escriben sin esperar al intervalo; estado no se registra
+    assert time.monotonic() - inicio < 5
+    assert _eventos(db) == ["iniciado", "serie", "pausado"]
+    fila = db.scalars(select(models.EventoCronometro).where(models.EventoCronometro.evento == "serie")).one()
+    assert (fila.cliente_id, fila.ejercicio_plan_id, fila.tipo, fila.series_completadas) == (
+        cliente.id, ejercicio_plan_id, "ejercicio", 1
+    )
+
+def test_escribe_por_lotes_sin_apagar(db, cliente_http, monkeypatch):
+    monkeypatch.setattr(buffer_eventos, "intervalo_segundos", 0.05)
+    cliente, ejercicio_plan_id = _plan(db)
+
+    with cliente_http.websocket_connect(f"/api/mobile/cliente/{cliente.id}/cronometro") as ws:
+        ws.receive_json()
+        for segundos in range(5):
+            ws.send_json({"accion": "registrar", "ejercicio_plan_id": ejercicio_plan_id, "tipo": "descanso", "segundos_transcurridos": segundos})
+            ws.receive_json()
+
+        # La tarea escribe al agotar el intervalo, con la app todavía en marcha
+        limite = time.monotonic() + 5
+        while len(_eventos(db)) < 5 and time.monotonic() < limite:
+            time.sleep(0.05)
+
+    assert _eventos(db) == ["tiempo"] * 5
+    assert db.scalar(select(func.max(models.EventoCronometro.segundos_descanso))) == 4
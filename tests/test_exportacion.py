@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from app import exportacion, models
+from conftest import crear_catalogo, crear_cliente, crear_plan
+
+def _historial(db):
+    catalogo = crear_catalogo(db, 2)
+    ana = crear_cliente(db, "Ana")
+    plan = crear_plan(db, ana, catalogo, [[10, 10], [12]])
+    primero = min(plan.ejercicios, key=lambda ejercicio: ejercicio.orden)
+    db.add(models.EjercicioCompletado(
+        ejercicio_plan_id=primero.id,
+        series_completadas=[{"serie": 1, "reps_objetivo": 10, "reps_realizadas": 10, "completada": True}],
+        tiempo_ejercicio_real_segundos=50,
+        completado_totalmente=True
+    ))
+    # Plan sin ejercicios: sale una vez con las columnas del ejercicio vacías
+    crear_plan(db, ana, catalogo, [], 2, plan.fecha_inicio + timedelta(weeks=1))
+    luis = crear_cliente(db, "Luis, Jr")
+    crear_plan(db, luis, catalogo, [[8]])
+    db.commit()
+    return ana, luis
+
+def test_exportar_cliente_ndjson(db, cliente_http):
+    ana, _ = _historial(db)
+
+    respuesta = cliente_http.get(f"/api/admin/cliente/{ana.id}/exportar")
+
+    assert respuesta.headers["content-type"] == "application/x-ndjson"
+    assert f'historial_cliente_{ana.id}.ndjson' in respuesta.headers["content-disposition"]
+    filas = [json.loads(linea) for linea in respuesta.text.splitlines()]
+    assert [(fila["numero_semana"], fila["orden"]) for fila in filas] == [(1, 1), (1, 2), (2, None)]
+    assert set(filas[0]) == set(exportacion.COLUMNAS)
+    assert filas[0]["series_config"] == [10, 10]
+    assert filas[0]["series_completadas"][0]["reps_realizadas"] == 10
+    assert filas[0]["completado_totalmente"] is True
+    assert filas[1]["fecha_completado"] is None
+    assert filas[2]["ejercicio_plan_id"] is None
+
+def test_exportar_gimnasio_csv(db, cliente_http, monkeypatch):
+    # Lotes pequeños: el export llega en varios trozos
+    monkeypatch.setattr(exportacion, "FILAS_POR_LOTE", 2)
+    ana, luis = _historial(db)
+
+    respuesta = cliente_http.get("/api/admin/exportar", params={"formato": "csv"})
+
+    assert respuesta.headers["content-type"] == "text/csv; charset=utf-8"
+    filas = list(csv.DictReader(io.StringIO(respuesta.text)))
+    assert [int(fila["cliente_id"]) for fila in filas] == [ana.id] * 3 + [luis.id]
+    assert filas[-1]["cliente_nombre"] == "Luis, Jr"
+    assert json.loads(filas[0]["series_config"]) == [10, 10]
+    assert json.loads(filas[0]["series_completadas"])[0]["completada"] is True
+    assert filas[2]["ejercicio"] == ""
+
+def test_exportar_errores(cliente_http):
+    assert cliente_http.get("/api/admin/cliente/999999/exportar").status_code == 404
+    assert cliente_http.get("/api/admin/exportar", params={"formato": "xml"}).status_code == 422
@@ -0,0 +1,67 @@
+import re
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.database import engine
+from app.metricas import Contador, Histograma
+from conftest import crear_catalogo, crear_cliente, crear_plan
+
+RUTA_PLAN = "/api/mobile/cliente/{cliente_id}/plan-actual"
+
+def _valor(cliente_http, serie: str) -> float:
+    """Valor de una serie en /metrics (0 si todavía no existe)"""
+    coincidencia = re.search(rf"^{re.escape(serie)} (\S+)$", cliente_http.get("/metrics").text, re.MULTILINE)
+    return float(coincidencia.group(1)) if coincidencia else 0
+
+def test_contador_exporta_por_etiquetas():
+    contador = Contador("prueba_total", "Ayuda")
+    contador.incrementar(ruta="/a")
+    contador.incrementar(2, ruta="/a")
+    contador.incrementar(ruta='/"b"')
+
+    assert contador.exportar() == [
+        "# HELP prueba_total Ayuda",
+        "# TYPE prueba_total counter",
+        'prueba_total{ruta="/\\"b\\""} 1',
+        'prueba_total{ruta="/a"} 3'
+    ]
+
+def test_histograma_acumula_buckets():
+    histograma = Histograma("prueba_segundos", "Ayuda", (0.1, 1.0))
+    for valor in (0.05, 0.1, 0.5, 3):
+        histograma.observar(valor)
+
+    assert histograma.exportar()[2:] == [
+        'prueba_segundos_bucket{le="0.1"} 2',
+        'prueba_segundos_bucket{le="1"} 3',
+        'prueba_segundos_bucket{le="+Inf"} 4',
+        "prueba_segundos_sum 3.65",
+        "prueba_segundos_count 4"
+    ]
+
+def test_sentencias_por_peticion(db, cliente_http):
+    cliente = crear_cliente(db)
+    crear_plan(db, cliente, crear_catalogo(db, 2), [[10], [12]])
+    db.commit()
+    series = [
+        f'sql_sentencias_por_peticion_count{{ruta="{RUTA_PLAN}"}}',
+        f'sql_sentencias_por_peticion_sum{{ruta="{RUTA_PLAN}"}}',
+        f'http_peticiones_total{{estado="200",metodo="GET",ruta="{RUTA_PLAN}"}}'
+    ]
+    antes = [_valor(cliente_http, serie) for serie in series]
+
+    cliente_http.get(f"/api/mobile/cliente/{cliente.id}/plan-actual")  # Miss: una sentencia
+    cliente_http.get(f"/api/mobile/cliente/{cliente.id}/plan-actual")  # Hit de la cache: ninguna
+
+    despues = [_valor(cliente_http, serie) for serie in series]
+    assert [b - a for a, b in zip(antes, despues)] == [2, 1, 2]
+
+def test_sentencia_fallida_no_descuadra_los_tiempos(cliente_http):
+    with engine.connect() as conexion:
+        with pytest.raises(OperationalError):
+            conexion.execute(text("SELECT * FROM tabla_inexistente"))
+        assert not conexion.info.get("inicio_sentencia")
+        conexion.execute(text("SELECT 1"))
+        assert not conexion.info.get("inicio_sentencia")
@@ -0,0 +1,115 @@
+from datetime import date, datetime, timedelta
+
+from app import models
+from conftest import crear_catalogo, crear_cliente, crear_plan
+
+def _payload_anterior(db, cliente_id: int) -> dict:
+    """Respuesta de plan-actual tal como la armaba la versión con una consulta por ejercicio"""
+    hoy = date.today()
+    plan = db.query(models.PlanSemanal).filter(
+        models.PlanSemanal.cliente_id == cliente_id,
+        models.PlanSemanal.fecha_inicio <= hoy,
+        models.PlanSemanal.fecha_fin >= hoy
+    ).first()
+    ejercicios = []
+    for ejercicio_plan, nombre in db.query(models.EjercicioPlan, models.EjercicioCatalogo.nombre).join(
+        models.EjercicioCatalogo
+    ).filter(
+        models.EjercicioPlan.plan_semanal_id == plan.id
+    ).order_by(models.EjercicioPlan.orden):
+        completado = db.query(models.EjercicioCompletado).filter(
+            models.EjercicioCompletado.ejercicio_plan_id == ejercicio_plan.id
+        ).first()
+        ejercicios.append({
+            "id": ejercicio_plan.id,
+            "nombre": nombre,
+            "orden": ejercicio_plan.orden,
+            "series_config": ejercicio_plan.series_config,
+            "tiempo_ejercicio_segundos": ejercicio_plan.tiempo_ejercicio_segundos,
+            "tiempo_descanso_segundos": ejercicio_plan.tiempo_descanso_segundos,
+            "notas": ejercicio_plan.notas_ejercicio,
+            "completado": completado is not None,
+            "series_completadas": completado.series_completadas if completado else []
+        })
+    return {
+        "plan_id": plan.id,
+        "cliente_nombre": plan.cliente.nombre,
+        "numero_semana": plan.numero_semana,
+        "fecha_inicio": plan.fecha_inicio.isoformat(),
+        "fecha_fin": plan.fecha_fin.isoformat(),
+        "ejercicios": ejercicios
+    }
+
+def _plan_con_completados(db):
+    cliente = crear_cliente(db)
+    catalogo = crear_catalogo(db, 3)
+    lunes = date.today() - timedelta(days=date.today().weekday())
+    crear_plan(db, cliente, catalogo, [[10, 10, 10]], 1, lunes - timedelta(weeks=1))
+    plan = crear_plan(db, cliente, catalogo, [[12, 10, 8], [15, 15], [20]], 2, lunes)
+    ejercicios = sorted(plan.ejercicios, key=lambda ejercicio: ejercicio.orden)
+    ejercicios[0].notas_ejercicio = "Controlar la bajada"
+    db.add_all([
+        models.EjercicioCompletado(
+            ejercicio_plan_id=ejercicios[0].id,
+            series_completadas=[
+                {"serie": 1, "reps_objetivo": 12, "reps_realizadas": 12, "completada": True},
+                {"serie": 2, "reps_objetivo": 10, "reps_realizadas": 9, "completada": False}
+            ],
+            tiempo_ejercicio_real_segundos=60,
+            tiempo_descanso_real_segundos=120,
+            completado_totalmente=False,
+            fecha_completado=datetime(2025, 1, 1, 10, 0)
+        ),
+        # JSON histórico con claves que SerieCompletada no declara: se devuelve tal cual
+        models.EjercicioCompletado(
+            ejercicio_plan_id=ejercicios[2].id,
+            series_completadas=[{"serie": 1, "reps_realizadas": 20, "completada": True, "peso_kg": 40}],
+            tiempo_ejercicio_real_segundos=30,
+            tiempo_descanso_real_segundos=0,
+            completado_totalmente=True,
+            fecha_completado=datetime(2025, 1, 1, 10, 5)
+        )
+    ])
+    db.commit()
+    return cliente
+
+def test_plan_actual_una_sentencia(db, cliente_http, sentencias):
+    cliente = _plan_con_completados(db)
+    esperado = _payload_anterior(db, cliente.id)
+
+    sentencias.clear()
+    respuesta = cliente_http.get(f"/api/mobile/cliente/{cliente.id}/plan-actual")
+
+    assert respuesta.status_code == 200
+    assert len(sentencias) == 1
+    assert respuesta.json() == esperado
+
+def test_plan_actual_desde_cache_sin_sentencias(db, cliente_http, sentencias):
+    cliente = _plan_con_completados(db)
+    primera = cliente_http.get(f"/api/mobile/cliente/{cliente.id}/plan-actual")
+
+    sentencias.clear()
+    segunda = cliente_http.get(f"/api/mobile/cliente/{cliente.id}/plan-actual")
+
+    assert sentencias == []
+    assert segunda.json() == primera.json()
+    assert segunda.headers["ETag"] == primera.headers["ETag"]
+
+def test_plan_actual_sin_plan(db, cliente_http):
+    cliente = crear_cliente(db)
+    db.commit()
+    assert cliente_http.get(f"/api/mobile/cliente/{cliente.id}/plan-actual").status_code == 404
+
+def test_plan_actual_con_tiempos_nulos(db, cliente_http):
+    cliente = crear_cliente(db)
+    plan = crear_plan(db, cliente, crear_catalogo(db, 1), [[10, 10]])
+    plan.ejercicios[0].tiempo_ejercicio_segundos = None
+    plan.ejercicios[0].tiempo_descanso_segundos = None
+    db.commit()
+    esperado = _payload_anterior(db, cliente.id)
+
+    respuesta = cliente_http.get(f"/api/mobile/cliente/{cliente.id}/plan-actual")
+
+    assert respuesta.status_code == 200
+    assert respuesta.json() == esperado
+    assert respuesta.json()["ejercicios"][0]["tiempo_descanso_segundos"] is None
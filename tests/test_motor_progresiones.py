@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from app.motor_progresiones import ORDEN_APLICACION, aplicar_progresiones_cohorte
+from app.routers.progresiones import aplicar_multiples_progresiones
+
+def _por_lista(configs, reglas, regla_por_fila):
+    return [
+        aplicar_multiples_progresiones(list(config), *reglas[regla]) if regla >= 0 else list(config)
+        for config, regla in zip(configs, regla_por_fila)
+    ]
+
+def _comparar(configs, reglas, regla_por_fila):
+    assert aplicar_progresiones_cohorte(configs, reglas, regla_por_fila) == _por_lista(configs, reglas, regla_por_fila)
+
+TODAS = [(list(ORDEN_APLICACION), {tipo: 2 for tipo in ORDEN_APLICACION})]
+
+@pytest.mark.parametrize("configs, reglas, regla_por_fila", [
+    ([[10, 10], [8, 8]], [(["lineal_reps"], {"lineal_reps": 2})], [0, 0]),
+    ([[7, 18], [3]], [], [-1, -1]),
+    ([[10]], [(["ondulante_reps"], {})], [0]),
+    ([[10, 12]], [(["ondulante_reps", "lineal_series"], {"lineal_series": 1})], [0]),
+    ([[10, 12, 14]], [(["ondulante_reps"], {})], [0]),
+    ([[5]], [(["ondulante_series"], {"ondulante_series": 3})], [0]),
+    ([[5, 9]], [(["ondulante_series"], {"ondulante_series": -1})], [0]),
+    ([[]], [(["lineal_series", "lineal_reps"], {"lineal_series": 2, "lineal_reps": 1})], [0]),
+    ([[], [4], [4, 6], [4, 6, 8, 10]], TODAS[:1] + [(["lineal_series"], {"lineal_series": 3})], [1, 0, 0, 0]),
+    ([[1], [2, 3], [4, 5, 6]], TODAS, [-1, 0, -1]),
+])
+def test_casos_limite(configs, reglas, regla_por_fila):
+    _comparar(configs, reglas, regla_por_fila)
+
+def test_cohorte_vacia():
+    assert aplicar_progresiones_cohorte([], [], []) == []
+
+def test_ondulante_series_sin_series_falla_como_por_lista():
+    with pytest.raises(IndexError):
+        aplicar_multiples_progresiones([], ["ondulante_series"], {"ondulante_series": 1})
+    with pytest.raises(IndexError):
+        aplicar_progresiones_cohorte([[10], []], [(["ondulante_series"], {"ondulante_series": 1})], [0, 0])
+
+def test_no_modifica_las_entradas():
+    configs = [[10, 10, 10], [8]]
+    aplicar_progresiones_cohorte(configs, TODAS, [0, 0])
+    assert configs == [[10, 10, 10], [8]]
+
+@pytest.mark.parametrize("semilla", range(20))
+def test_equivale_a_por_lista_en_cohortes_aleatorias(semilla):
+    """Propiedad: mismo resultado que aplicar_multiples_progresiones fila a fila"""
+    rng = random.Random(semilla)
+    for _ in range(100):
+        reglas = []
+        for _ in range(rng.randint(0, 4)):
+            tipos = rng.sample(ORDEN_APLICACION, rng.randint(0, len(ORDEN_APLICACION)))
+            reglas.append((tipos, {tipo: rng.randint(-2, 4) for tipo in tipos if rng.random() < 0.9}))
+        # Cohortes chicas y series cortas: con frecuencia ninguna fila llega a 3 series
+        ancho_maximo = rng.choice([0, 1, 2, 3, 6])
+        configs, regla_por_fila = [], []
+        for _ in range(rng.randint(1, 6)):
+            config = [rng.randint(1, 20) for _ in range(rng.randint(0, ancho_maximo))]
+            regla = rng.randrange(-1, len(reglas)) if reglas else -1
+            if not config and regla >= 0 and "ondulante_series" in reglas[regla][0]:
+                regla = -1  # Falla en ambos caminos (ver test anterior)
+            configs.append(config)
+            regla_por_fila.append(regla)
+        _comparar(configs, reglas, regla_por_fila)
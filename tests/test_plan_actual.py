@@ -0,0 +1,82 @@
+from datetime import date, timedelta
+
+from sqlalchemy import select, update
+
+from app import models
+from app.plan_actual import plan_activo_id, refrescar_todos
+from conftest import crear_catalogo, crear_cliente, crear_plan
+
+LUNES = date.today() - timedelta(days=date.today().weekday())
+
+def _puntero(db, cliente):
+    db.expire_all()
+    return db.scalar(select(models.Cliente.plan_actual_id).where(models.Cliente.id == cliente.id))
+
+def _plan_actual(cliente_http, cliente):
+    return cliente_http.get(f"/api/mobile/cliente/{cliente.id}/plan-actual")
+
+def test_crear_plan_apunta_el_puntero(db, cliente_http):
+    cliente = crear_cliente(db)
+    catalogo = crear_catalogo(db, 1)
+    db.commit()
+
+    plan = cliente_http.post(f"/api/admin/cliente/{cliente.id}/plan", json={
+        "cliente_id": cliente.id, "numero_semana": 1,
+        "fecha_inicio": LUNES.isoformat(), "fecha_fin": (LUNES + timedelta(days=6)).isoformat(),
+        "ejercicios": [{"ejercicio_catalogo_id": catalogo[0].id, "orden": 1, "series_config": [10]}]
+    }).json()
+
+    assert _puntero(db, cliente) == plan["id"]
+    assert _plan_actual(cliente_http, cliente).json()["plan_id"] == plan["id"]
+
+def test_puntero_desactualizado_cae_a_las_fechas(db, cliente_http):
+    cliente = crear_cliente(db)
+    catalogo = crear_catalogo(db, 1)
+    anterior = crear_plan(db, cliente, catalogo, [[10]], 1, LUNES - timedelta(weeks=1))
+    actual = crear_plan(db, cliente, catalogo, [[12]], 2, LUNES)
+    # El trabajo diario todavía no corrió: el puntero sigue en la semana pasada
+    db.execute(update(models.Cliente).values(plan_actual_id=anterior.id))
+    db.commit()
+
+    assert _plan_actual(cliente_http, cliente).json()["plan_id"] == actual.id
+
+    db.execute(update(models.Cliente).values(plan_actual_id=None))
+    db.commit()
+    assert db.scalar(select(plan_activo_id(cliente.id))) == actual.id
+
+def test_editar_fechas_mueve_el_puntero(db, cliente_http):
+    cliente = crear_cliente(db)
+    catalogo = crear_catalogo(db, 1)
+    plan = crear_plan(db, cliente, catalogo, [[10]])
+    db.execute(update(models.Cliente).values(plan_actual_id=plan.id))
+    db.commit()
+
+    siguiente = LUNES + timedelta(weeks=1)
+    cliente_http.put(f"/api/admin/cliente/{cliente.id}/plan/{plan.id}", json={
+        "fecha_inicio": siguiente.isoformat(), "fecha_fin": (siguiente + timedelta(days=6)).isoformat(),
+        "ejercicios": [{"ejercicio_catalogo_id": catalogo[0].id, "orden": 1, "series_config": [10],
+                        "tiempo_ejercicio_segundos": 45, "tiempo_descanso_segundos": 90}]
+    })
+
+    assert _puntero(db, cliente) is None
+    assert _plan_actual(cliente_http, cliente).status_code == 404
+
+def test_refrescar_todos_solo_escribe_los_que_cambian(db):
+    catalogo = crear_catalogo(db, 1)
+    clientes = [crear_cliente(db, f"Cliente{numero}") for numero in range(5)]
+    planes = {
+        cliente.id: [crear_plan(db, cliente, catalogo, [[10]], semana, LUNES + timedelta(weeks=semana)) for semana in range(2)]
+        for cliente in clientes[:4]
+    }
+    db.commit()
+
+    assert refrescar_todos(db, lote=2, hoy=LUNES) == 4
+    assert refrescar_todos(db, lote=2, hoy=LUNES) == 0
+    assert {cliente.id: _puntero(db, cliente) for cliente in clientes[:4]} == {
+        cliente_id: semanas[0].id for cliente_id, semanas in planes.items()
+    }
+    assert _puntero(db, clientes[4]) is None
+
+    # Una semana después todos pasan a su segundo plan
+    assert refrescar_todos(db, hoy=LUNES + timedelta(weeks=1, days=3)) == 4
+    assert _puntero(db, clientes[0]) == planes[clientes[0].id][1].id
@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy.pool import NullPool
+
+from app import database
+from app.database import _opciones_engine, estado_pool, settings
+from app.metricas import AsyncQueuePoolMedido, QueuePoolMedido
+
+def test_informe_del_pool(cliente_http):
+    cliente_http.get("/api/admin/clientes")
+
+    informe = cliente_http.get("/api/admin/db/pool").json()
+
+    clase = "AsyncQueuePoolMedido" if database.async_engine is not None else "QueuePoolMedido"
+    assert informe["clase"] == clase
+    assert informe["tamano"] == settings.db_pool_size
+    assert informe["max_overflow"] == settings.db_max_overflow
+    assert informe["timeout_segundos"] == settings.db_pool_timeout
+    # Una petición terminada no deja conexiones prestadas
+    assert informe["en_uso"] == 0
+    assert informe["esperando"] == 0
+
+@pytest.mark.skipif(database.async_engine is not None, reason="el pool de las peticiones es el async")
+def test_informe_cuenta_conexiones_en_uso():
+    with database.engine.connect():
+        estado = estado_pool()
+        assert estado["en_uso"] == 1
+    assert estado_pool()["en_uso"] == 0
+
+def test_perfil_con_pool(monkeypatch):
+    monkeypatch.setattr(settings, "db_pool_size", 7)
+    monkeypatch.setattr(settings, "db_max_overflow", 3)
+
+    assert _opciones_engine("postgresql://u@db/gym", modo_async=False)["poolclass"] is QueuePoolMedido
+    opciones = _opciones_engine("postgresql+asyncpg://u@db/gym", modo_async=True)
+    assert opciones["poolclass"] is AsyncQueuePoolMedido
+    assert (opciones["pool_size"], opciones["max_overflow"]) == (7, 3)
+
+def test_perfil_sin_pool_para_pgbouncer(monkeypatch):
+    monkeypatch.setattr(settings, "db_sin_pool", True)
+
+    opciones = _opciones_engine("postgresql+asyncpg://u@db/gym", modo_async=True)
+    assert opciones["poolclass"] is NullPool
+    assert "pool_size" not in opciones
+    assert opciones["connect_args"]["statement_cache_size"] == 0
+    assert opciones["connect_args"]["prepared_statement_name_func"]() != opciones["connect_args"]["prepared_statement_name_func"]()
+    assert "connect_args" not in _opciones_engine("sqlite:///gym.db", modo_async=False)
+
+def test_statement_timeout_por_driver(monkeypatch):
+    monkeypatch.setattr(settings, "db_statement_timeout_ms", 5000)
+
+    assert _opciones_engine("postgresql://u@db/gym", modo_async=False)["connect_args"] == {
+        "options": "-c statement_timeout=5000"
+    }
+    assert _opciones_engine("postgresql+asyncpg://u@db/gym", modo_async=True)["connect_args"] == {
+        "server_settings": {"statement_timeout": "5000"}
+    }
+    assert "connect_args" not in _opciones_engine("sqlite:///gym.db", modo_async=False)
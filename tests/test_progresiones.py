@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+
+from app import models
+from conftest import crear_catalogo, crear_cliente, crear_plan
+
+LUNES = date(2026, 3, 2)
+
+def _rollover(cliente_http, progresiones, cliente_ids=None):
+    return cliente_http.post("/api/progresiones/rollover-cohorte", json={
+        "cliente_ids": cliente_ids,
+        "fecha_inicio": LUNES.isoformat(),
+        "fecha_fin": (LUNES + timedelta(days=6)).isoformat(),
+        "progresiones": progresiones
+    })
+
+def _planes_nuevos(db) -> int:
+    return db.scalar(select(func.count()).where(models.PlanSemanal.fecha_inicio == LUNES))
+
+def test_rollover_cohorte_con_series_cortas(db, cliente_http):
+    catalogo = crear_catalogo(db, 2)
+    for numero in range(1, 4):
+        crear_plan(db, crear_cliente(db, f"Cliente{numero}"), catalogo, [[10, 10], [12]], 1, LUNES - timedelta(weeks=1))
+    db.commit()
+
+    respuesta = _rollover(cliente_http, [
+        {"ejercicio_catalogo_id": catalogo[0].id, "tipos_progresion": ["lineal_reps", "ondulante_reps"], "valores": {"lineal_reps": 2}},
+        {"ejercicio_catalogo_id": catalogo[1].id, "tipos_progresion": ["ondulante_series"], "valores": {"ondulante_series": 1}}
+    ])
+
+    assert respuesta.status_code == 200
+    assert respuesta.json()["planes_creados"] == 3
+    configs = db.scalars(
+        select(models.EjercicioPlan.series_config).join(models.PlanSemanal).where(
+            models.PlanSemanal.fecha_inicio == LUNES
+        ).order_by(models.PlanSemanal.cliente_id, models.EjercicioPlan.orden)
+    ).all()
+    assert configs == [[12, 12], [12, 12]] * 3
+
+def test_rollover_cohorte_ondulante_series_sin_series(db, cliente_http):
+    catalogo = crear_catalogo(db, 1)
+    crear_plan(db, crear_cliente(db, "Ana"), catalogo, [[10, 10]], 1, LUNES - timedelta(weeks=1))
+    vacio = crear_cliente(db, "Beto")
+    crear_plan(db, vacio, catalogo, [[]], 1, LUNES - timedelta(weeks=1))
+    db.commit()
+
+    respuesta = _rollover(cliente_http, [
+        {"ejercicio_catalogo_id": catalogo[0].id, "tipos_progresion": ["ondulante_series"], "valores": {"ondulante_series": 1}}
+    ])
+
+    assert respuesta.status_code == 422
+    assert str(vacio.id) in respuesta.json()["detail"]
+    assert _planes_nuevos(db) == 0
+
+def test_reglas_cliente(db, cliente_http):
+    cliente = crear_cliente(db)
+    catalogo = crear_catalogo(db, 2)
+    db.commit()
+    url = f"/api/progresiones/cliente/{cliente.id}/reglas"
+
+    assert cliente_http.put("/api/progresiones/cliente/999/reglas", json=[]).status_code == 404
+    regla = {"ejercicio_catalogo_id": catalogo[0].id, "tipos_progresion": ["lineal_reps"], "valores": {"lineal_reps": 2}}
+    assert cliente_http.put(url, json=[regla]).status_code == 200
+    otra = {"ejercicio_catalogo_id": catalogo[1].id, "tipos_progresion": ["lineal_series"], "valores": {"lineal_series": 1}}
+    assert cliente_http.put(url, json=[otra]).json() == [otra]
+    assert cliente_http.get(url).json() == [otra]
+
+def test_rollover_sin_cliente_ids_usa_los_activos(db, cliente_http, sentencias):
+    catalogo = crear_catalogo(db, 1)
+    con_plan = crear_cliente(db, "Activo")
+    crear_plan(db, con_plan, catalogo, [[10]], 1, LUNES - timedelta(weeks=1))
+    crear_plan(db, crear_cliente(db, "Inactivo", activo=False), catalogo, [[10]], 1, LUNES - timedelta(weeks=1))
+    ya_generado = crear_cliente(db, "Generado")
+    crear_plan(db, ya_generado, catalogo, [[10]], 2, LUNES)
+    sin_plan = crear_cliente(db, "Nuevo")
+    db.commit()
+    sentencias.clear()
+
+    respuesta = _rollover(cliente_http, [])
+
+    assert respuesta.status_code == 200
+    assert respuesta.json() == {
+        "planes_creados": 1,
+        "ejercicios_creados": 1,
+        "clientes_sin_plan": [sin_plan.id],
+        "clientes_ya_generados": [ya_generado.id]
+    }
+    assert db.scalars(select(models.PlanSemanal.cliente_id).where(
+        models.PlanSemanal.fecha_inicio == LUNES, models.PlanSemanal.numero_semana == 2
+    ).order_by(models.PlanSemanal.cliente_id)).all() == [con_plan.id, ya_generado.id]
+    # Los activos se filtran dentro de la consulta de planes, no en una lista previa
+    assert "activo" in next(sql for sql in sentencias if sql.startswith("SELECT planes_semanales.id"))
@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+
+from app import models
+from app.resumenes import verificar
+from conftest import crear_catalogo, crear_cliente, crear_plan
+
+LUNES = date(2026, 3, 2)
+
+def _proyectar(cliente_http, cliente_id, catalogo_id, **extra):
+    return cliente_http.post("/api/progresiones/proyeccion", json={
+        "cliente_id": cliente_id,
+        "semanas": 3,
+        "fecha_inicio": LUNES.isoformat(),
+        "progresiones": [{"ejercicio_catalogo_id": catalogo_id, "tipos_progresion": ["lineal_reps"], "valores": {"lineal_reps": 2}}],
+        **extra
+    })
+
+def _planes(db) -> int:
+    return db.scalar(select(func.count(models.PlanSemanal.id)))
+
+def _cliente_con_plan(db):
+    cliente = crear_cliente(db)
+    catalogo = crear_catalogo(db, 2)
+    crear_plan(db, cliente, catalogo, [[10, 10], [12]], 1, LUNES - timedelta(weeks=1))
+    db.commit()
+    return cliente, catalogo
+
+def test_vista_previa_encadena_semanas_sin_escribir(db, cliente_http):
+    cliente, catalogo = _cliente_con_plan(db)
+
+    respuesta = _proyectar(cliente_http, cliente.id, catalogo[0].id)
+
+    assert respuesta.status_code == 200
+    resultado = respuesta.json()
+    assert resultado["persistido"] is False
+    assert [semana["numero_semana"] for semana in resultado["semanas"]] == [2, 3, 4]
+    assert [semana["fecha_inicio"] for semana in resultado["semanas"]] == [
+        (LUNES + timedelta(weeks=k)).isoformat() for k in range(3)
+    ]
+    assert [semana["ejercicios"][0]["series_config"] for semana in resultado["semanas"]] == [[12, 12], [14, 14], [16, 16]]
+    # Sin regla el ejercicio se copia tal cual
+    assert {tuple(semana["ejercicios"][1]["series_config"]) for semana in resultado["semanas"]} == {(12,)}
+    assert all(semana["plan_id"] is None for semana in resultado["semanas"])
+    assert _planes(db) == 1
+
+def test_persistir_guarda_todas_las_semanas(db, cliente_http):
+    cliente, catalogo = _cliente_con_plan(db)
+
+    resultado = _proyectar(cliente_http, cliente.id, catalogo[0].id, persistir=True).json()
+
+    plan_ids = [semana["plan_id"] for semana in resultado["semanas"]]
+    guardados = db.scalars(select(models.PlanSemanal).where(models.PlanSemanal.id.in_(plan_ids))).all()
+    assert sorted(plan.numero_semana for plan in guardados) == [2, 3, 4]
+    ultima = db.scalars(
+        select(models.EjercicioPlan.series_config).where(models.EjercicioPlan.plan_semanal_id == plan_ids[-1])
+        .order_by(models.EjercicioPlan.orden)
+    ).all()
+    assert ultima == [[16, 16], [12]]
+    # Los resúmenes de las semanas nuevas coinciden con un recálculo completo
+    assert set(verificar(db)).isdisjoint(plan_ids)
+
+def test_persistir_sobre_semanas_ocupadas_409(db, cliente_http):
+    cliente, catalogo = _cliente_con_plan(db)
+    crear_plan(db, cliente, catalogo, [[10]], 3, LUNES + timedelta(weeks=1))
+    db.commit()
+
+    respuesta = _proyectar(cliente_http, cliente.id, catalogo[0].id, semana_base=1, persistir=True)
+
+    assert respuesta.status_code == 409
+    assert "[3]" in respuesta.json()["detail"]
+    assert _planes(db) == 2
+
+def test_plan_base_inexistente_404(db, cliente_http):
+    cliente, catalogo = _cliente_con_plan(db)
+
+    assert _proyectar(cliente_http, cliente.id, catalogo[0].id, semana_base=7).status_code == 404
+    assert _proyectar(cliente_http, cliente.id + 1, catalogo[0].id).status_code == 404
@@ -0,0 +1,83 @@
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from app import models
+from app.resumenes import reconstruir, verificar
+from conftest import crear_catalogo, crear_cliente, crear_plan
+
+LUNES = date.today() - timedelta(days=date.today().weekday())
+
+def _ejercicio(catalogo_id, orden, series):
+    return {"ejercicio_catalogo_id": catalogo_id, "orden": orden, "series_config": series}
+
+def _completar(cliente_http, ejercicio_plan_id, segundos):
+    respuesta = cliente_http.post("/api/mobile/ejercicio/completar", json={
+        "ejercicio_plan_id": ejercicio_plan_id,
+        "series_completadas": [{"serie": 1, "reps_objetivo": 10, "reps_realizadas": 10, "completada": True}],
+        "tiempo_ejercicio_real_segundos": segundos
+    })
+    assert respuesta.status_code == 200
+
+def test_resumenes_coinciden_con_recalculo(db, cliente_http):
+    cliente = crear_cliente(db)
+    catalogo = crear_catalogo(db, 4)
+    db.commit()
+    fechas = {"fecha_inicio": LUNES.isoformat(), "fecha_fin": (LUNES + timedelta(days=6)).isoformat()}
+
+    plan = cliente_http.post(f"/api/admin/cliente/{cliente.id}/plan", json={
+        "cliente_id": cliente.id, "numero_semana": 1, **fechas,
+        "ejercicios": [_ejercicio(c.id, orden, [10, 10]) for orden, c in enumerate(catalogo[:3], 1)]
+    }).json()
+    ids = [ejercicio["id"] for ejercicio in plan["ejercicios"]]
+
+    _completar(cliente_http, ids[0], 60)
+    _completar(cliente_http, ids[0], 75)  # Repetido: reemplaza el tiempo
+    cliente_http.post("/api/mobile/ejercicio/completar-lote", json=[{
+        "ejercicio_plan_id": ids[1], "series_completadas": [], "tiempo_ejercicio_real_segundos": 40
+    }])
+    # Editar: se quita el tercer ejercicio y se añade el cuarto
+    cliente_http.put(f"/api/admin/cliente/{cliente.id}/plan/{plan['id']}", json={
+        **fechas,
+        "ejercicios": [
+            {**_ejercicio(catalogo[0].id, 1, [10, 10]), "tiempo_ejercicio_segundos": 60, "tiempo_descanso_segundos": 90},
+            {**_ejercicio(catalogo[1].id, 2, [10, 10]), "tiempo_ejercicio_segundos": 60, "tiempo_descanso_segundos": 90},
+            {**_ejercicio(catalogo[3].id, 3, [8]), "tiempo_ejercicio_segundos": 60, "tiempo_descanso_segundos": 90}
+        ]
+    })
+
+    assert verificar(db) == []
+    resumen = db.get(models.ResumenPlan, plan["id"])
+    assert (resumen.total_ejercicios, resumen.ejercicios_completados, resumen.tiempo_total_segundos) == (3, 2, 115)
+
+    estadisticas = cliente_http.get(f"/api/mobile/cliente/{cliente.id}/estadisticas").json()
+    assert estadisticas == {
+        "total_ejercicios": 3,
+        "ejercicios_completados": 2,
+        "porcentaje_completado": 66.67,
+        "tiempo_total_entrenamiento_segundos": 115,
+        "promedio_tiempo_por_ejercicio_segundos": 57.5
+    }
+
+def test_plan_sin_resumen_se_calcula_al_leer(db, cliente_http):
+    cliente = crear_cliente(db)
+    crear_plan(db, cliente, crear_catalogo(db, 2), [[10], [12]])
+    db.commit()
+    assert verificar(db) != []
+
+    estadisticas = cliente_http.get(f"/api/mobile/cliente/{cliente.id}/estadisticas").json()
+
+    assert estadisticas["total_ejercicios"] == 2
+    assert estadisticas["ejercicios_completados"] == 0
+    assert verificar(db) == []
+
+def test_reconstruir(db):
+    cliente = crear_cliente(db)
+    catalogo = crear_catalogo(db, 2)
+    for semana in range(1, 4):
+        crear_plan(db, cliente, catalogo, [[10], [12]], semana, LUNES + timedelta(weeks=semana))
+    db.commit()
+
+    assert reconstruir(db) == 3
+    assert verificar(db) == []
+    assert db.scalars(select(models.ResumenPlan.total_ejercicios)).all() == [2, 2, 2]
@@ -0,0 +1,62 @@
+import csv
+import io
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+
+from app import models, resumenes, volumen
+from benchmarks.sembrar import _FlujoCsv, parser_argumentos, sembrar
+
+def _argumentos(*extra):
+    return parser_argumentos().parse_args(["--clientes", "5", "--semanas", "3", "--ejercicios", "2", "--lote", "2", *extra])
+
+def _contar(db, modelo) -> int:
+    return db.scalar(select(func.count()).select_from(modelo))
+
+def test_siembra_por_lotes(db):
+    resultado = sembrar(_argumentos())
+
+    assert (resultado["clientes"], resultado["planes"], resultado["ejercicios"]) == (5, 15, 30)
+    assert _contar(db, models.Cliente) == 5
+    assert _contar(db, models.PlanSemanal) == 15
+    assert _contar(db, models.EjercicioPlan) == 30
+    assert _contar(db, models.EjercicioCompletado) == resultado["completados"] > 0
+    # Las tablas derivadas quedan como un recálculo completo
+    assert resumenes.verificar(db) == []
+    assert volumen.verificar(db) == []
+
+    # La última semana es la actual y es el plan activo de cada cliente
+    lunes = date.today() - timedelta(days=date.today().weekday())
+    actuales = db.execute(
+        select(models.Cliente.plan_actual_id, models.PlanSemanal.fecha_inicio, models.PlanSemanal.numero_semana)
+        .join(models.PlanSemanal, models.PlanSemanal.id == models.Cliente.plan_actual_id)
+    ).all()
+    assert len(actuales) == 5
+    assert {(fila.fecha_inicio, fila.numero_semana) for fila in actuales} == {(lunes, 3)}
+
+    # series_config y series_completadas llegan como JSON, no como texto
+    completado = db.scalars(select(models.EjercicioCompletado)).first()
+    assert isinstance(completado.series_completadas, list)
+    assert isinstance(completado.ejercicio_plan.series_config, list)
+
+def test_segunda_siembra_continua_los_ids(db):
+    sembrar(_argumentos())
+    sembrar(_argumentos("--semilla", "7"))
+
+    assert _contar(db, models.Cliente) == 10
+    assert _contar(db, models.EjercicioCatalogo) == 20
+    assert resumenes.verificar(db) == []
+
+def test_flujo_csv_por_bloques():
+    filas = [(i, f"nombre, {i}", '{"a": "b"}') for i in range(1234)]
+    esperado = io.StringIO()
+    csv.writer(esperado, lineterminator="\n").writerows(filas)
+
+    flujo = _FlujoCsv(filas)
+    bloques = []
+    while bloque := flujo.read(1000):
+        assert len(bloque) <= 1000
+        bloques.append(bloque)
+
+    assert b"".join(bloques).decode() == esperado.getvalue()
+    assert _FlujoCsv(filas).read() == esperado.getvalue().encode()
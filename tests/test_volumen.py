@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+
+from sqlalchemy import delete, select
+
+from app import models, volumen
+from conftest import crear_catalogo, crear_cliente
+
+LUNES = date(2026, 3, 2)
+
+def _ejercicio(catalogo_id, orden, series):
+    return {"ejercicio_catalogo_id": catalogo_id, "orden": orden, "series_config": series,
+            "tiempo_ejercicio_segundos": 45, "tiempo_descanso_segundos": 90}
+
+def _crear_plan(cliente_http, cliente, semana, ejercicios):
+    inicio = LUNES + timedelta(weeks=semana - 1)
+    return cliente_http.post(f"/api/admin/cliente/{cliente.id}/plan", json={
+        "cliente_id": cliente.id, "numero_semana": semana, "ejercicios": ejercicios,
+        "fecha_inicio": inicio.isoformat(), "fecha_fin": (inicio + timedelta(days=6)).isoformat()
+    }).json()
+
+def _series(*reps_realizadas):
+    return [
+        {"serie": i, "reps_objetivo": 10, "reps_realizadas": reps, "completada": reps >= 10}
+        for i, reps in enumerate(reps_realizadas, 1)
+    ]
+
+def _volumen(cliente_http, cliente, **filtros):
+    return cliente_http.get(f"/api/admin/cliente/{cliente.id}/volumen", params=filtros).json()
+
+def test_volumen_tras_completar_y_editar(db, cliente_http):
+    cliente = crear_cliente(db)
+    catalogo = crear_catalogo(db, 3)
+    db.commit()
+    # El mismo ejercicio del catálogo dos veces en el plan se suma en una fila
+    plan = _crear_plan(cliente_http, cliente, 1, [
+        _ejercicio(catalogo[0].id, 1, [10, 10]),
+        _ejercicio(catalogo[1].id, 2, [12]),
+        _ejercicio(catalogo[0].id, 3, [8]),
+        _ejercicio(catalogo[2].id, 4, [15])
+    ])
+    ids = [ejercicio["id"] for ejercicio in plan["ejercicios"]]
+
+    cliente_http.post("/api/mobile/ejercicio/completar", json={
+        "ejercicio_plan_id": ids[0], "series_completadas": _series(10, 9), "tiempo_ejercicio_real_segundos": 70
+    })
+    cliente_http.post("/api/mobile/ejercicio/completar-lote", json=[
+        {"ejercicio_plan_id": ids[2], "series_completadas": _series(10), "tiempo_ejercicio_real_segundos": 30},
+        {"ejercicio_plan_id": ids[3], "series_completadas": _series(15), "tiempo_ejercicio_real_segundos": 20}
+    ])
+
+    filas = {fila["ejercicio_catalogo_id"]: fila for fila in _volumen(cliente_http, cliente)}
+    assert {
+        clave: filas[catalogo[0].id][clave]
+        for clave in ("series_objetivo", "series_completadas", "reps_objetivo", "reps_realizadas", "tiempo_real_segundos")
+    } == {"series_objetivo": 3, "series_completadas": 2, "reps_objetivo": 28, "reps_realizadas": 29, "tiempo_real_segundos": 100}
+    assert filas[catalogo[1].id]["reps_realizadas"] == 0
+    assert volumen.verificar(db) == []
+
+    # Editar: cambia una config y sale el tercer ejercicio del catálogo
+    cliente_http.put(f"/api/admin/cliente/{cliente.id}/plan/{plan['id']}", json={
+        "fecha_inicio": plan["fecha_inicio"], "fecha_fin": plan["fecha_fin"],
+        "ejercicios": [
+            _ejercicio(catalogo[0].id, 1, [10, 10, 10]),
+            _ejercicio(catalogo[1].id, 2, [12]),
+            _ejercicio(catalogo[0].id, 3, [8])
+        ]
+    })
+
+    filas = {fila["ejercicio_catalogo_id"]: fila for fila in _volumen(cliente_http, cliente)}
+    assert set(filas) == {catalogo[0].id, catalogo[1].id}
+    assert filas[catalogo[0].id]["reps_objetivo"] == 38
+    assert volumen.verificar(db) == []
+
+def test_filtros_del_volumen(db, cliente_http):
+    cliente = crear_cliente(db)
+    catalogo = crear_catalogo(db, 2)
+    db.commit()
+    for semana in range(1, 4):
+        _crear_plan(cliente_http, cliente, semana, [_ejercicio(catalogo[0].id, 1, [10]), _ejercicio(catalogo[1].id, 2, [12])])
+
+    assert len(_volumen(cliente_http, cliente)) == 6
+    solo_uno = _volumen(cliente_http, cliente, ejercicio_catalogo_id=catalogo[1].id)
+    assert [fila["fecha_inicio"] for fila in solo_uno] == [(LUNES + timedelta(weeks=k)).isoformat() for k in range(3)]
+    assert {fila["ejercicio_nombre"] for fila in solo_uno} == {"Ejercicio 2"}
+    rango = _volumen(cliente_http, cliente, desde=(LUNES + timedelta(weeks=1)).isoformat(), hasta=(LUNES + timedelta(weeks=1)).isoformat())
+    assert len(rango) == 2
+
+def test_reconstruir_volumen(db, cliente_http):
+    cliente = crear_cliente(db)
+    catalogo = crear_catalogo(db, 2)
+    db.commit()
+    for semana in range(1, 4):
+        _crear_plan(cliente_http, cliente, semana, [_ejercicio(catalogo[0].id, 1, [10]), _ejercicio(catalogo[1].id, 2, [12])])
+    db.execute(delete(models.VolumenSemanal).where(models.VolumenSemanal.ejercicio_catalogo_id == catalogo[0].id))
+    db.execute(models.VolumenSemanal.__table__.update().values(reps_objetivo=0))
+    db.commit()
+    assert len(volumen.verificar(db)) == 6
+
+    assert volumen.reconstruir(db, lote=2) == 6
+    assert volumen.verificar(db) == []
+    assert set(db.scalars(select(models.VolumenSemanal.reps_objetivo))) == {10, 12}
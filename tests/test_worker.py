@@ -0,0 +1,143 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app import models, worker
+from app.motor_progresiones import aplicar_progresiones_cohorte
+from conftest import crear_catalogo, crear_cliente, crear_plan
+
+LUNES = date(2026, 3, 2)
+DOMINGO = LUNES + timedelta(days=6)
+
+class Corte(Exception):
+    """Simula que el proceso del worker muere tras guardar un lote"""
+
+def _gimnasio(db, clientes: int = 6, sin_series: int = 3):
+    """Clientes con la semana anterior terminada; `sin_series` tiene un ejercicio vacío con ondulante_series"""
+    catalogo = crear_catalogo(db, 2)
+    for numero in range(1, clientes + 1):
+        cliente = crear_cliente(db, f"Cliente{numero}")
+        configs = [[10, 10, 10], [] if numero == sin_series else [8, 8]]
+        crear_plan(db, cliente, catalogo, configs, 1, LUNES - timedelta(weeks=1))
+        db.add_all([
+            models.ReglaProgresionCliente(
+                cliente_id=cliente.id, ejercicio_catalogo_id=catalogo[0].id,
+                tipos_progresion=["lineal_reps"], valores={"lineal_reps": 1}
+            ),
+            models.ReglaProgresionCliente(
+                cliente_id=cliente.id, ejercicio_catalogo_id=catalogo[1].id,
+                tipos_progresion=["ondulante_series"], valores={"ondulante_series": 1}
+            )
+        ])
+    db.commit()
+
+def _planes_nuevos(db):
+    return dict(db.execute(
+        select(models.PlanSemanal.cliente_id, func.count()).where(
+            models.PlanSemanal.fecha_inicio == LUNES
+        ).group_by(models.PlanSemanal.cliente_id)
+    ).all())
+
+def test_reanuda_ejecucion_con_cliente_fallido(db):
+    _gimnasio(db)
+
+    def cortar_tras_primer_lote(texto):
+        raise Corte(texto)
+
+    with pytest.raises(Corte):
+        worker.ejecutar_rollover(db, LUNES, DOMINGO, lote=2, informar=cortar_tras_primer_lote)
+    db.rollback()
+    ejecucion = db.scalar(select(models.EjecucionRollover))
+    assert (ejecucion.estado, ejecucion.clientes_procesados, ejecucion.ultimo_cliente_id) == ("en_curso", 2, 2)
+
+    # El lote siguiente contiene al cliente sin series: falla solo él y la ejecución termina
+    ejecucion = worker.ejecutar_rollover(db, LUNES, DOMINGO, lote=2, informar=lambda texto: None)
+    assert ejecucion.estado == "completada"
+    assert ejecucion.total_clientes == ejecucion.clientes_procesados == 6
+    assert ejecucion.clientes_fallidos == [3]
+    assert ejecucion.planes_creados == 5
+    ids = [cliente.id for cliente in db.scalars(select(models.Cliente).order_by(models.Cliente.id))]
+    assert _planes_nuevos(db) == {cliente_id: 1 for cliente_id in ids if cliente_id != ids[2]}
+
+    # Una pasada más no repite clientes ni vuelve a tocar la ejecución
+    assert worker.ejecutar_rollover(db, LUNES, DOMINGO, lote=2, informar=lambda texto: None).clientes_fallidos == [3]
+    assert sum(_planes_nuevos(db).values()) == 5
+
+def test_error_del_motor_aisla_al_cliente(db):
+    _gimnasio(db, sin_series=0)
+    cliente_malo = db.scalars(select(models.Cliente.id).order_by(models.Cliente.id)).all()[4]
+    malas = {
+        ejercicio.id for ejercicio in db.scalars(
+            select(models.EjercicioPlan).join(models.PlanSemanal).where(models.PlanSemanal.cliente_id == cliente_malo)
+        )
+    }
+    db.execute(
+        models.EjercicioPlan.__table__.update().where(models.EjercicioPlan.id.in_(malas)).values(series_config=[-1])
+    )
+    db.commit()
+
+    def calcular(configs, reglas, regla_por_fila):
+        if [-1] in configs:
+            raise ValueError("config inválida")
+        return aplicar_progresiones_cohorte(configs, reglas, regla_por_fila)
+
+    mensajes = []
+    ejecucion = worker.ejecutar_rollover(db, LUNES, DOMINGO, lote=4, calcular=calcular, informar=mensajes.append)
+
+    assert ejecucion.estado == "completada"
+    assert ejecucion.clientes_fallidos == [cliente_malo]
+    # El fallo del lote entero también queda informado, no solo el del cliente
+    assert any("lote" in mensaje and "config inválida" in mensaje for mensaje in mensajes)
+    assert cliente_malo not in _planes_nuevos(db)
+    assert len(_planes_nuevos(db)) == 5
+
+def test_progresiones_por_cliente(db):
+    _gimnasio(db, clientes=1, sin_series=0)
+    worker.ejecutar_rollover(db, LUNES, DOMINGO, informar=lambda texto: None)
+    configs = db.scalars(
+        select(models.EjercicioPlan.series_config).join(models.PlanSemanal).where(
+            models.PlanSemanal.fecha_inicio == LUNES
+        ).order_by(models.EjercicioPlan.orden)
+    ).all()
+    assert configs == [[11, 11, 11], [8, 8, 10]]
+
+def test_clientes_pendientes_despues_de_completar(db):
+    _gimnasio(db, clientes=4, sin_series=0)
+    reactivado = db.scalars(select(models.Cliente).order_by(models.Cliente.id)).first()
+    reactivado.activo = False
+    db.commit()
+    ejecucion = worker.ejecutar_rollover(db, LUNES, DOMINGO, lote=2, informar=lambda texto: None)
+    assert (ejecucion.estado, ejecucion.total_clientes, ejecucion.clientes_procesados) == ("completada", 3, 3)
+
+    # Se reactiva un cliente con id menor que el último procesado
+    reactivado.activo = True
+    db.commit()
+    ejecucion = worker.ejecutar_rollover(db, LUNES, DOMINGO, lote=2, informar=lambda texto: None)
+
+    assert ejecucion.estado == "completada"
+    assert ejecucion.total_clientes == ejecucion.clientes_procesados == 4
+    assert _planes_nuevos(db)[reactivado.id] == 1
+
+class PoolEspia:
+    """Executor que calcula en el hilo actual y guarda el tamaño de cada trozo"""
+
+    def __init__(self):
+        self.trozos = []
+
+    def map(self, funcion, *iterables):
+        iterables = [list(iterable) for iterable in iterables]
+        self.trozos += [len(configs) for configs in iterables[0]]
+        return map(funcion, *iterables)
+
+def test_motor_en_procesos_reparte_cada_lote():
+    configs = [[10, 10], [8], [12, 12, 12], [], [6], [9, 9], [15]]
+    reglas = [(["lineal_reps"], {"lineal_reps": 2}), (["ondulante_series"], {"ondulante_series": 1})]
+    regla_por_fila = [0, 1, -1, -1, 0, 1, 0]
+    pool = PoolEspia()
+
+    resultado = worker.motor_en_procesos(pool, 3)(configs, reglas, regla_por_fila)
+
+    assert pool.trozos == [3, 3, 1]
+    assert resultado == aplicar_progresiones_cohorte(configs, reglas, regla_por_fila)
+    assert worker.motor_en_procesos(None, 3)(configs, reglas, regla_por_fila) == resultado